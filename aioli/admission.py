@@ -0,0 +1,113 @@
+import asyncio
+
+from collections import deque
+from math import ceil
+from time import monotonic
+
+from .exceptions import AioliException
+
+
+# Priority classes of route handlers: critical bypasses concurrency limits, others are admitted in this order
+CRITICAL, HIGH, NORMAL, LOW = PRIORITIES = ("critical", "high", "normal", "low")
+
+
+class Overloaded(AioliException):
+    """Raised when a request can't be admitted in time, responded to with a Retry-After header
+
+    :param name: Limiter name
+    :param retry_after: Seconds after which clients may retry
+    """
+
+    def __init__(self, name, retry_after=1):
+        super(Overloaded, self).__init__(status=503, message=f"Service overloaded: {name}")
+        self.retry_after = retry_after
+
+
+class Limiter:
+    """Concurrency limit with a bounded wait queue.
+
+    Requests beyond the limit wait for a slot, up to their deadline, and are rejected right away if
+    `queue_size` requests are already waiting. Waiters are admitted by priority class, then in arrival order.
+
+    :param name: Limiter name, used in errors and metrics
+    :param limit: Max number of concurrently admitted requests
+    :param queue_size: Max number of waiting requests, 0 rejects requests beyond the limit right away
+    :param queue_timeout: Max number of seconds a request may wait, used for the Retry-After header
+
+    :var active: Number of admitted requests
+    :var admitted: Number of admitted requests, in total
+    :var rejected: Number of rejected requests, in total
+    """
+
+    def __init__(self, name, limit, queue_size=100, queue_timeout=1.0):
+        if limit < 1 or queue_size < 0:
+            raise Exception(f"Limiter {name}: invalid bounds: limit={limit}, queue_size={queue_size}")
+
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = max(ceil(queue_timeout), 1)
+        self.active = 0
+        self.admitted = self.rejected = 0
+        self._waiters = {priority: deque() for priority in PRIORITIES[1:]}
+
+    @property
+    def waiting(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def _reject(self):
+        self.rejected += 1
+        return Overloaded(self.name, self.retry_after)
+
+    async def acquire(self, priority=NORMAL, deadline=None):
+        """Waits for a slot, which must be released using `release`
+
+        :param priority: Priority class: high, normal or low
+        :param deadline: Monotonic time after which the request is rejected, defaults to now + `queue_timeout`
+        :raise Overloaded: Queue full, or no slot within the deadline
+        """
+
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if self.waiting >= self.queue_size:
+            raise self._reject()
+
+        if deadline is None:
+            deadline = monotonic() + self.queue_timeout
+
+        waiter = asyncio.get_event_loop().create_future()
+        waiters = self._waiters[priority]
+        waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter, max(deadline - monotonic(), 0))
+        except asyncio.TimeoutError:
+            raise self._reject()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot while being cancelled, pass it on
+                self.release()
+
+            raise
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+        self.admitted += 1
+
+    def release(self):
+        """Releases a slot, handing it over to the next waiter if any"""
+
+        for waiters in self._waiters.values():
+            while waiters:
+                waiter = waiters.popleft()
+
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+
+        self.active -= 1
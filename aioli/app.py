@@ -1,41 +1,65 @@
 from enum import Enum
 
+import asyncio
 import logging
 import logging.config
 import traceback
 
+from time import monotonic, perf_counter
+
 from json.decoder import JSONDecodeError
 from starlette.applications import Starlette
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.errors import ServerErrorMiddleware
+from starlette.responses import Response
 from marshmallow.exceptions import ValidationError
 
 from aioli.exceptions import HTTPException, AioliException
-from aioli.log import LOGGING_CONFIG_DEFAULTS
+from aioli.log import LOGGING_CONFIG_DEFAULTS, AccessLog
 from aioli.package import Package
 
+from .admission import Limiter
+from .batch import Batch
+from .codec import get_codec
+from .compression import CompressionMiddleware
 from .config import ApplicationConfigSchema
-from .utils import jsonify
-
-
-async def server_error(_, exc):
+from .executor import Executor
+from .hub import Hub
+from .controller.cache import ResponseCache
+from .controller.registry import RouteTable
+from .controller.schemas import JsonSerializer
+from .metrics import Metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .router import RadixRouter
+from .scheduler import Scheduler
+from .timing import Timing
+from .utils import format_path, jsonify
+
+
+async def server_error(request, exc):
     if isinstance(exc, NotImplementedError):
         message = "Not implemented"
     else:
         message = "Internal server error"
 
-    return jsonify({"message": message}, status=500)
+    return jsonify({"message": message}, status=500, codec=request.app.codec)
+
 
+async def validation_error(request, exc):
+    return jsonify({"message": exc.messages}, status=422, codec=request.app.codec)
 
-async def validation_error(_, exc):
-    return jsonify({"message": exc.messages}, status=422)
 
+async def decode_error(request, _):
+    return jsonify({"message": "Error decoding JSON"}, status=400, codec=request.app.codec)
 
-async def decode_error(*_):
-    return jsonify({"message": "Error decoding JSON"}, status=400)
 
+async def http_error(request, exc):
+    response = jsonify({"message": exc.detail}, status=exc.status_code, codec=request.app.codec)
+    retry_after = getattr(exc, "retry_after", None)
 
-async def http_error(_, exc):
-    return jsonify({"message": exc.detail}, status=exc.status_code)
+    if retry_after is not None:
+        response.headers["retry-after"] = str(retry_after)
+
+    return response
 
 
 class ComponentType(Enum):
@@ -44,12 +68,15 @@ class ComponentType(Enum):
 
 
 class ImportRegistry:
-    imported = []
     log = logging.getLogger("aioli.pkg")
 
     def __init__(self, modules, conf_full):
         self._conf_full = conf_full
         self._modules = set(modules)
+        self.imported = []
+        self.started = None
+        self.graph = None
+        self.usage = {}
 
     def _get_components(self, comp_type, pkg_name=None):
         comp_type = ComponentType(comp_type).name
@@ -67,7 +94,14 @@ class ImportRegistry:
     def get_services(self, pkg_name=None):
         return [(svc.__class__, svc) for svc in self._get_components("service", pkg_name)]
 
-    async def attach_to(self, app):
+    registered = False
+
+    async def register(self, app):
+        """Registers Packages and their Components with the Application
+
+        :param app: Application instance
+        """
+
         for module in self._modules:
             if not hasattr(module, "export"):
                 raise Exception(f"Missing export member of class {Package} in {module}")
@@ -85,9 +119,158 @@ class ImportRegistry:
 
             self.imported.append(module)
 
-        for module in self.imported:
-            await module.export.attach_controllers()
-            await module.export.attach_services()
+        app.route_table = RouteTable(
+            route
+            for module in self.imported
+            for ctrl in module.export.controllers
+            for route in ctrl.routes
+        )
+
+        self.registered = True
+
+    @property
+    def packages(self):
+        return {module.export.name: module.export for module in self.imported}
+
+    def use(self, pkg, dependency):
+        """Records usage of a Component belonging to another Package, warning if it hasn't started yet.
+        Usage is kept apart from the declared `dependencies`, and never affects the startup order.
+
+        :param pkg: Package using the Component
+        :param dependency: Package owning the Component
+        """
+
+        if dependency is pkg or dependency.name in pkg.dependencies:
+            return
+
+        used = self.usage.setdefault(pkg.name, set())
+
+        if dependency.name in used:
+            return
+
+        used.add(dependency.name)
+
+        if self.started is None or dependency.name in self.started:
+            return
+
+        if pkg.name in dependency.dependencies:
+            # Declaring the reverse dependency would make a cycle
+            self.log.warning(f"{pkg.name} uses {dependency.name}, which depends on it, before it has started")
+        else:
+            self.log.warning(
+                f"{pkg.name} uses {dependency.name} before it has started: "
+                f"add {dependency.name} to the dependencies of {pkg.name}"
+            )
+
+    def dependency_graph(self):
+        """Returns Package dependencies, in topological order
+
+        :return: Dictionary of {<name>: <set of dependency names>}
+        """
+
+        packages = self.packages
+        graph = {}
+
+        for name, pkg in packages.items():
+            missing = pkg.dependencies - packages.keys()
+
+            if missing:
+                raise Exception(f"Package {name} depends on unregistered Packages: {sorted(missing)}")
+
+        while len(graph) < len(packages):
+            ready = [
+                name for name, pkg in packages.items()
+                if name not in graph and pkg.dependencies <= graph.keys()
+            ]
+
+            if not ready:
+                cyclic = sorted(packages.keys() - graph.keys())
+                raise Exception(f"Circular dependency between Packages: {cyclic}")
+
+            for name in sorted(ready):
+                graph[name] = set(packages[name].dependencies)
+
+        return graph
+
+    async def _start(self, pkg, dependencies):
+        await asyncio.gather(*dependencies)
+
+        started = monotonic()
+        timeout = pkg.config["startup_timeout"]
+
+        try:
+            await asyncio.wait_for(pkg.attach(), timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Package {pkg.name} failed to start within {timeout} seconds")
+
+        self.started.add(pkg.name)
+        pkg.log.info(f"Started in {monotonic() - started:.3f}s")
+
+    async def attach_to(self, app):
+        """Calls `on_startup` hooks of all Components, concurrently for independent Packages
+
+        :param app: Application instance
+        """
+
+        if not self.registered:
+            await self.register(app)
+
+        packages = self.packages
+        tasks = {}
+        self.started = set()
+
+        # Kept for shutdown, which must not fail on Packages changed in the meantime
+        self.graph = self.dependency_graph()
+
+        for name, dependencies in self.graph.items():
+            tasks[name] = asyncio.ensure_future(
+                self._start(packages[name], [tasks[dependency] for dependency in dependencies])
+            )
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+
+            raise
+
+    async def _stop(self, pkg, dependents):
+        await asyncio.gather(*dependents, return_exceptions=True)
+
+        try:
+            await pkg.detach_services()
+        except Exception:
+            pkg.log.error(f"Error during shutdown: {traceback.format_exc()}")
+            raise
+
+    async def detach_from(self, app):
+        """Calls `on_shutdown` hooks of started Packages in reverse dependency order, as of startup,
+        concurrently for independent Packages
+
+        :param app: Application instance
+        """
+
+        if not self.started:
+            return
+
+        packages = self.packages
+        graph = {name: deps for name, deps in self.graph.items() if name in self.started}
+        dependents = {name: [] for name in graph}
+        tasks = {}
+
+        for name, dependencies in graph.items():
+            for dependency in dependencies & graph.keys():
+                dependents[dependency].append(name)
+
+        for name in reversed(list(graph)):
+            tasks[name] = asyncio.ensure_future(
+                self._stop(packages[name], [tasks[dependent] for dependent in dependents[name]])
+            )
+
+        # Errors are logged by each Package, and must not prevent others from shutting down
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        self.started = set()
 
 
 class Application(Starlette):
@@ -99,10 +282,30 @@ class Application(Starlette):
 
     :var log: Aioli Application logger
     :var packages: Packages registered with the Application
+    :var codec: JSON codec used for decoding requests and encoding responses
+    :var cache: Response cache used by route handlers decorated with @cached
+    :var metrics: Route handler metrics, or None if disabled
+    :var access_log: Structured access log of route handler requests, or None if disabled
+    :var timing: Per-request timelines of route handler requests, or None if disabled
+    :var admission: Application-wide concurrency Limiter of route handlers, or None if disabled
+    :var executor: Thread and process pools used for offloading CPU-heavy work
+    :var hub: Publish/subscribe hub of WebSocket connections
+    :var scheduler: Periodic jobs and work queues, started and stopped along with the Application
+    :var route_table: Routes registered by Controllers, available once Packages are registered
+    :var batch: Batch endpoint handler, or None if disabled
+    :var lean_routes: Call plans of lean route handlers with static paths: {<path>: {<method>: <plan>}}
+    :var closing: True once the Application has started shutting down
+    :var close_handlers: Functions called once the Application starts shutting down, before waiting for requests
+    :var inflight: Number of HTTP requests being processed
+    :var tasks: Background tasks created using `create_task`
     """
 
     log = logging.getLogger("aioli.core")
     packages = None
+    batch = None
+    closing = False
+    inflight = 0
+    _drained = None
     __state = {}
 
     def __init__(self, packages, **kwargs):
@@ -122,6 +325,47 @@ class Application(Starlette):
         except ValidationError as e:
             raise Exception(f"Configuration validation error: {e.messages}")
 
+        self.codec = get_codec(self.config["json_codec"])
+
+        # Schema.loads and Schema.dumps use the Application's codec as well
+        JsonSerializer.codec = self.codec
+        self.cache = ResponseCache(self.config["cache_max_size"])
+        self.metrics = Metrics() if self.config["metrics"] else None
+        self.access_log = None
+
+        if self.config["access_log"]:
+            self.access_log = AccessLog(self.codec, self.config["access_log_sample"], self.config["access_log_rate"])
+
+        self.timing = None
+
+        if self.config["timing"]:
+            self.timing = Timing(self.config["timing_sample"], self.config["timing_slow_threshold"])
+
+        self.admission = None
+
+        if self.config["max_concurrency"]:
+            self.admission = Limiter(
+                "global",
+                self.config["max_concurrency"],
+                self.config["admission_queue_size"],
+                self.config["admission_queue_timeout"],
+            )
+
+            if self.metrics:
+                self.metrics.limiters["global"] = self.admission
+
+        self.executor = Executor(
+            threads=self.config["executor_threads"],
+            processes=self.config["executor_processes"],
+            offload_size=self.config["offload_size"],
+        )
+        self.hub = Hub(self.codec, self.config["ws_queue_size"], self.config["ws_slow_policy"])
+        self.tasks = set()
+        self.scheduler = Scheduler(self)
+        self.close_handlers = []
+        self.route_table = RouteTable()
+        self.lean_routes = {}
+
         for name, logger in LOGGING_CONFIG_DEFAULTS['loggers'].items():
             self.log_level = logger['level'] = 'DEBUG' if self.config.get('debug') else 'INFO'
 
@@ -130,6 +374,12 @@ class Application(Starlette):
         # Apply known settings from environment or provided `config`
         super(Application, self).__init__(**kwargs)
 
+        if self.config["radix_router"]:
+            # Carries over lifespan handlers passed to Starlette, e.g. `on_startup`
+            router = self.router
+            self.router = RadixRouter(router.routes, router.redirect_slashes)
+            self.router.lifespan = router.lifespan
+
         # Lifespan handlers
         self.router.lifespan.add_event_handler("startup", self._startup)
         self.router.lifespan.add_event_handler("shutdown", self._shutdown)
@@ -144,6 +394,25 @@ class Application(Starlette):
         # Middleware
         self.add_middleware(CORSMiddleware, allow_origins=self.config["allow_origins"])
 
+        if self.config["compression"]:
+            self.add_middleware(
+                CompressionMiddleware,
+                min_size=self.config["compression_min_size"],
+                level=self.config["compression_level"],
+                offload_size=self.config["compression_offload_size"],
+                media_types=self.config["compression_types"],
+                cache_size=self.config["compression_cache_size"],
+                executor=self.executor,
+            )
+
+        if self.metrics and self.config["metrics_path"]:
+            self.add_route(self.config["metrics_path"], self._metrics, ["GET"], include_in_schema=False)
+
+        if self.config["batch_path"]:
+            batch_path = format_path(self.config["api_base"], self.config["batch_path"])
+            self.batch = Batch(self, batch_path, self.config["batch_max_items"])
+            self.add_route(batch_path, self.batch.endpoint, ["POST"], include_in_schema=False)
+
     def add_exception_handler(self, exception, handler):
         """Add a new exception handler
 
@@ -153,16 +422,122 @@ class Application(Starlette):
 
         return super(Application, self).add_exception_handler(exception, handler)
 
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await super(Application, self).__call__(scope, receive, send)
+
+        if self.closing:
+            response = jsonify({"message": "Service unavailable"}, status=503, codec=self.codec)
+            response.headers["connection"] = "close"
+            return await response(scope, receive, send)
+
+        if self.timing:
+            # Start of the routing span
+            scope["aioli.received"] = perf_counter()
+
+        self.inflight += 1
+
+        try:
+            methods = self.lean_routes.get(scope["path"])
+            plan = None
+
+            if methods:
+                method = scope["method"]
+                plan = methods.get("GET" if method == "HEAD" else method)
+
+            if plan is None:
+                await super(Application, self).__call__(scope, receive, send)
+            else:
+                scope["app"] = self
+
+                # Lean routes bypass middleware, but not the 500 fallback of errors escaping exception handlers
+                await ServerErrorMiddleware(plan, self.exception_handlers.get(Exception), self.debug)(
+                    scope, receive, send
+                )
+        finally:
+            self.inflight -= 1
+
+            if self._drained and not self.inflight:
+                self._drained.set()
+
+    def create_task(self, coro):
+        """Schedules a coroutine in the background, awaited by the Application upon shutdown
+
+        :param coro: Coroutine
+        :return: asyncio.Task
+        """
+
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        return task
+
+    async def _drain(self):
+        if self.inflight:
+            self._drained = asyncio.Event()
+            await self._drained.wait()
+
+        while self.tasks:
+            await asyncio.wait(list(self.tasks))
+
+    async def _metrics(self, _):
+        return Response(self.metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+    def preload(self):
+        """Registers Packages, Components and routes ahead of startup, without calling `on_startup` hooks.
+
+        Used by pre-forking servers for sharing the loaded Application between worker processes.
+        """
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(self.registry.register(self))
+        finally:
+            loop.close()
+
     async def _startup(self):
         try:
             self.log.info("Commencing countdown, engines on")
 
             await self.registry.attach_to(self)
+            self.scheduler.start()
             self.log.info(f"Loaded {len(self.registry.imported)} packages ~ Ready for action!")
         except Exception as e:
             self.log.critical(traceback.format_exc())
             raise e
 
     async def _shutdown(self):
-        for mod, pkg in self.packages.attached:
-            await pkg.detach_services()
+        self.closing = True
+        timeout = self.config["shutdown_timeout"]
+
+        self.log.info(f"Shutting down, waiting for {self.inflight} requests and {len(self.tasks)} tasks")
+        await self.hub.close()
+
+        for handler in self.close_handlers:
+            handler()
+
+        self.scheduler.stop()
+
+        drained = True
+
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            drained = False
+            self.log.warning(
+                f"Shutdown deadline of {timeout} seconds exceeded, cancelling {len(self.tasks)} tasks "
+                f"with {self.inflight} requests in flight"
+            )
+
+            for task in self.tasks:
+                task.cancel()
+
+        try:
+            await self.registry.detach_from(self)
+        finally:
+            # Pools are idle once drained, don't wait for work left behind by cancelled tasks otherwise
+            self.executor.shutdown(wait=drained)
+
+        self.log.info("Shutdown complete")
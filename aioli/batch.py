@@ -0,0 +1,182 @@
+import asyncio
+import traceback
+
+from urllib.parse import urlencode
+
+from marshmallow import ValidationError, fields, validate
+
+from aioli.controller.consts import Method
+from aioli.controller.schemas import Schema
+from aioli.exceptions import DecodeError
+from aioli.utils import jsonify
+
+
+# Request headers not forwarded to sub-requests
+EXCLUDED_HEADERS = {b"content-length", b"content-type", b"accept-encoding", b"transfer-encoding"}
+
+
+class BatchItemSchema(Schema):
+    method = fields.String(missing="GET", validate=validate.OneOf([method.value for method in Method]))
+    path = fields.String(required=True, validate=validate.Regexp(r"^/"))
+    query = fields.Dict(missing=dict)
+    body = fields.Raw(missing=None)
+    depends_on = fields.List(fields.Integer(), missing=list)
+
+
+class Batch:
+    """Dispatches a list of sub-requests in-process, through the Application's routes and
+    handler pipelines, responding with the list of their responses.
+
+    Items run concurrently, except for items listing the indexes of earlier items in
+    `depends_on`, which run once these have completed successfully.
+
+    :param app: Application instance
+    :param path: Full path of the batch endpoint
+    :param max_items: Max number of items per batch
+    """
+
+    def __init__(self, app, path, max_items):
+        self.app = app
+        self.path = path
+        self.max_items = max_items
+        self.schema = BatchItemSchema(many=True)
+
+    def load(self, data):
+        """Validates a batch
+
+        :param data: Decoded request body
+        :return: List of items
+        """
+
+        if not isinstance(data, list):
+            raise ValidationError("Expected a list of items")
+
+        if len(data) > self.max_items:
+            raise ValidationError(f"Too many items, the maximum is {self.max_items}")
+
+        items = self.schema.load(data)
+        errors = {}
+
+        for idx, item in enumerate(items):
+            if item["path"].split("?")[0] == self.path:
+                errors[idx] = {"path": ["Batches cannot be nested"]}
+            elif any(not 0 <= dependency < idx for dependency in item["depends_on"]):
+                errors[idx] = {"depends_on": ["Items may only depend on earlier items"]}
+
+        if errors:
+            raise ValidationError(errors)
+
+        return items
+
+    def make_scope(self, parent, item):
+        path, _, query_string = item["path"].partition("?")
+
+        if item["query"]:
+            query_string = "&".join(filter(None, [query_string, urlencode(item["query"], doseq=True)]))
+
+        headers = [(name, value) for name, value in parent["headers"] if name not in EXCLUDED_HEADERS]
+        body = b""
+
+        if item["body"] is not None:
+            body = self.app.codec.dumpb(item["body"])
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+        scope = dict(
+            parent,
+            method=item["method"],
+            path=path,
+            raw_path=path.encode(),
+            query_string=query_string.encode(),
+            headers=headers,
+        )
+
+        scope.pop("path_params", None)
+        scope.pop("endpoint", None)
+
+        return scope, body
+
+    async def call(self, parent, item):
+        """Dispatches a single item
+
+        :param parent: Batch request ASGI scope
+        :param item: Validated item
+        :return: Sub-response: {"status": <status>, "headers": <dict>, "body": <decoded body>}
+        """
+
+        scope, body = self.make_scope(parent, item)
+        response = {"status": 500, "headers": {}, "body": None}
+        chunks = []
+
+        received = False
+
+        async def receive():
+            nonlocal received
+
+            # Sub-requests are complete once dispatched: long-lived responses, such as SSE streams, end right away
+            if received:
+                return {"type": "http.disconnect"}
+
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {
+                    name.decode("latin-1"): value.decode("latin-1") for name, value in message.get("headers", [])
+                }
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # Unhandled errors are re-raised by Starlette once the error response has been sent
+            self.app.log.error(f"Batch item {item['method']} {item['path']} failed: {traceback.format_exc()}")
+
+        content = b"".join(chunks)
+        response["headers"].pop("content-length", None)
+
+        if response["headers"].get("content-type", "").startswith("application/json") and content:
+            try:
+                response["body"] = self.app.codec.loads(content)
+                return response
+            except self.app.codec.decode_errors:
+                # Malformed sub-response, returned as text rather than failing the whole batch
+                pass
+
+        response["body"] = content.decode("utf-8", "replace") or None
+
+        return response
+
+    async def run(self, parent, items):
+        """Runs items concurrently, taking dependencies into account
+
+        :param parent: Batch request ASGI scope
+        :param items: Validated items
+        :return: List of sub-responses
+        """
+
+        tasks = []
+
+        async def run_item(item):
+            dependencies = await asyncio.gather(*[tasks[idx] for idx in item["depends_on"]])
+
+            if any(dependency["status"] >= 400 for dependency in dependencies):
+                return {"status": 424, "headers": {}, "body": {"message": "Failed dependency"}}
+
+            return await self.call(parent, item)
+
+        for item in items:
+            tasks.append(asyncio.ensure_future(run_item(item)))
+
+        return await asyncio.gather(*tasks)
+
+    async def endpoint(self, request):
+        try:
+            data = self.app.codec.loads(await request.body())
+        except self.app.codec.decode_errors:
+            raise DecodeError
+
+        responses = await self.run(request.scope, self.load(data))
+        return jsonify(responses, codec=self.app.codec)
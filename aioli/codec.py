@@ -0,0 +1,120 @@
+import importlib
+import json
+
+
+class JsonCodec:
+    """Base JSON codec, used by the Application for decoding requests and encoding responses
+
+    :var name: Codec name
+    :var decode_errors: Exceptions raised by `loads` upon invalid input
+    """
+
+    name = None
+    decode_errors = (ValueError,)
+
+    def loads(self, data):
+        """Decodes JSON
+
+        :param data: JSON document (bytes or str)
+        :return: Python object
+        """
+
+        raise NotImplementedError
+
+    def dumps(self, obj, indent=0):
+        """Encodes a Python object into a JSON string
+
+        :param obj: Python object
+        :param indent: Indentation level, 0 for compact output
+        :return: str
+        """
+
+        return self.dumpb(obj, indent).decode("utf8")
+
+    def dumpb(self, obj, indent=0):
+        """Encodes a Python object into UTF-8 encoded JSON
+
+        :param obj: Python object
+        :param indent: Indentation level, 0 for compact output
+        :return: bytes
+        """
+
+        return self.dumps(obj, indent).encode("utf8")
+
+
+class StdlibCodec(JsonCodec):
+    name = "json"
+    decode_errors = (json.JSONDecodeError, UnicodeDecodeError)
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj, indent=0):
+        if indent:
+            return json.dumps(obj, ensure_ascii=False, indent=indent)
+
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class UjsonCodec(JsonCodec):
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self._ujson = ujson
+        self.decode_errors = (getattr(ujson, "JSONDecodeError", ValueError),)
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+    def dumps(self, obj, indent=0):
+        return self._ujson.dumps(obj, ensure_ascii=False, indent=indent)
+
+
+class OrjsonCodec(JsonCodec):
+    """Encodes directly to bytes. Note that orjson only supports an indentation level of 2"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+        self.decode_errors = (orjson.JSONDecodeError,)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+    def dumpb(self, obj, indent=0):
+        options = (self._options | self._orjson.OPT_INDENT_2) if indent else self._options
+        return self._orjson.dumps(obj, option=options)
+
+
+CODECS = {codec.name: codec for codec in [StdlibCodec, UjsonCodec, OrjsonCodec]}
+
+
+def get_codec(name):
+    """Returns a JSON codec instance
+
+    :param name: Name of a built-in codec (json, ujson, orjson), or path to a
+        custom JsonCodec class in the form of: <module>:<class>
+    :return: JsonCodec instance
+    """
+
+    if name in CODECS:
+        codec_cls = CODECS[name]
+    elif ":" in name:
+        module_name, cls_name = name.split(":", 1)
+        codec_cls = getattr(importlib.import_module(module_name), cls_name)
+    else:
+        raise Exception(f"Unknown JSON codec {name}, expected one of {list(CODECS)} or <module>:<class>")
+
+    if not issubclass(codec_cls, JsonCodec):
+        raise Exception(f"Invalid JSON codec {codec_cls}: must be subclass of {JsonCodec}")
+
+    try:
+        return codec_cls()
+    except ImportError as e:
+        raise Exception(f"JSON codec {name} is not available: {e}")
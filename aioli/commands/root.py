@@ -2,6 +2,8 @@ import click
 
 from uvicorn import run as run_server, importer
 
+from .serve import serve as run_production_server
+
 
 @click.group()
 def cli():
@@ -16,9 +18,12 @@ def cli():
 @click.option("--debug", default=True)
 @click.argument("app_path")
 def dev_server(app_path, host, port, **kwargs):
-    config = importer.import_from_string(app_path).config
+    app = importer.import_from_string(app_path)
+    config = app.config
+
     run_server(
-        app_path,
+        # Uvicorn needs the import path for reloading, otherwise pass the already imported app
+        app_path if kwargs["reload"] else app,
         host=host or config["dev_host"],
         port=port or config["dev_port"],
         loop="uvloop",
@@ -26,4 +31,19 @@ def dev_server(app_path, host, port, **kwargs):
     )
 
 
+@click.command()
+@click.option("--host", default="0.0.0.0", help="Bind socket to this host.")
+@click.option("--port", default=8000, help="Bind socket to this port.")
+@click.option("--workers", type=int, help="Number of worker processes, defaults to the number of CPUs.")
+@click.option("--reuse-port", is_flag=True, help="Set SO_REUSEPORT on the listening socket.")
+@click.option("--max-requests", default=0, help="Restart workers after this many requests, 0 to disable.")
+@click.option("--max-requests-jitter", default=0, help="Max random number of requests to add to --max-requests.")
+@click.option("--timeout", default=30, help="Restart workers silent for more than this many seconds.")
+@click.option("--graceful-timeout", default=30, help="Seconds to wait for workers to finish upon restart.")
+@click.argument("app_path")
+def serve(app_path, host, port, **kwargs):
+    run_production_server(app_path, host, port, **kwargs)
+
+
 cli.add_command(dev_server)
+cli.add_command(serve)
@@ -0,0 +1,78 @@
+import gc
+import os
+
+from gunicorn.app.base import BaseApplication
+from uvicorn import importer
+from uvicorn.workers import UvicornWorker
+
+
+class AioliWorker(UvicornWorker):
+    """Uvicorn worker for Gunicorn, picking the fastest available event loop and HTTP
+    implementation, and exiting gracefully after `max_requests` (plus jitter) requests.
+    """
+
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto"}
+
+    def __init__(self, *args, **kwargs):
+        super(AioliWorker, self).__init__(*args, **kwargs)
+
+        # Gunicorn adds a random jitter to `max_requests` for each worker, to avoid simultaneous restarts
+        self.config.limit_max_requests = self.max_requests if self.cfg.max_requests else None
+
+
+class Server(BaseApplication):
+    """Pre-forking Gunicorn server, loading the Application and its routes in the
+    master process before spawning workers.
+
+    Once loaded, objects are moved into the permanent GC generation, to keep the memory
+    pages shared between workers from being copied upon garbage collection.
+
+    :param app_path: Application path in the form of: <module>:<attribute>
+    :param options: Gunicorn settings
+    """
+
+    def __init__(self, app_path, **options):
+        self.app_path = app_path
+        self.options = options
+        super(Server, self).__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        app = importer.import_from_string(self.app_path)
+        app.preload()
+
+        # Objects loaded before forking are left out of garbage collection, sparing copy-on-write in workers
+        gc.collect()
+        gc.freeze()
+
+        return app
+
+
+def serve(app_path, host, port, workers=None, reuse_port=False, max_requests=0, max_requests_jitter=0, **options):
+    """Runs an Application using the pre-forking production server
+
+    :param app_path: Application path in the form of: <module>:<attribute>
+    :param host: Bind socket to this host
+    :param port: Bind socket to this port
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :param reuse_port: Set SO_REUSEPORT on the listening socket
+    :param max_requests: Restart workers after this many requests, 0 to disable
+    :param max_requests_jitter: Max random number of requests to add to `max_requests`
+    :param options: Other Gunicorn settings
+    """
+
+    Server(
+        app_path,
+        bind=f"{host}:{port}",
+        workers=workers or os.cpu_count() or 1,
+        worker_class=f"{AioliWorker.__module__}.{AioliWorker.__name__}",
+        reuse_port=reuse_port,
+        max_requests=max_requests,
+        max_requests_jitter=max_requests_jitter,
+        preload_app=True,
+        **options
+    ).run()
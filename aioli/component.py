@@ -20,6 +20,12 @@ class Component:
         self.log = pkg.log
         self.config = pkg.config
 
+    @property
+    def scheduler(self):
+        """Application Scheduler, for running periodic jobs, work queues and background tasks"""
+
+        return self.app.scheduler
+
     async def on_startup(self):
         """Called after the Package has been successfully attached to the Application and the Loop is available"""
 
@@ -0,0 +1,201 @@
+import asyncio
+import zlib
+
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+
+# Gzip container, see zlib.compressobj
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+# Statuses of responses without a body
+EMPTY_STATUSES = (204, 304)
+
+
+def compress(body, level):
+    """Compresses a response body using gzip
+
+    :param body: Bytes
+    :param level: Compression level, 1-9
+    :return: Compressed bytes
+    """
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressedCache:
+    """Size-bounded LRU cache of compressed bodies, keyed by request path and response ETag
+
+    :param max_size: Max total size of compressed bodies, in bytes
+
+    :var size: Current total size of compressed bodies
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        body = self._entries.get(key)
+
+        if body is not None:
+            self._entries.move_to_end(key)
+
+        return body
+
+    def set(self, key, body):
+        if len(body) > self.max_size:
+            return
+
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key))
+
+        self._entries[key] = body
+        self.size += len(body)
+
+        while self.size > self.max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """Gzip compresses responses, for clients accepting it.
+
+    Bodies smaller than `min_size`, or of content-types not matching `media_types`, are sent as-is.
+    Bodies of `offload_size` or more are compressed in a thread pool, keeping the event loop
+    free to serve other requests in the meantime. Compressed bodies of responses carrying an ETag,
+    e.g. responses of @cached handlers or static files, are kept in a cache and reused. Strong ETags
+    of compressed responses are made weak.
+
+    :param app: ASGI application
+    :param min_size: Min size in bytes of bodies to compress
+    :param level: Compression level, 1-9
+    :param offload_size: Min size in bytes of bodies compressed in a thread pool
+    :param media_types: Content-type prefixes of responses to compress
+    :param cache_size: Max total size in bytes of reused compressed bodies, 0 disables reuse
+    :param executor: Application Executor whose thread pool is used, or None for the loop's default executor
+    """
+
+    def __init__(self, app, min_size=1024, level=6, offload_size=256 * 1024,
+                 media_types=("application/json", "text/"), cache_size=0, executor=None):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.offload_size = offload_size
+        self.media_types = tuple(media_types)
+        self.cache = CompressedCache(cache_size) if cache_size else None
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("accept-encoding", ""):
+            responder = CompressionResponder(self, scope, send)
+            await self.app(scope, receive, responder.send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def compress(self, body):
+        """Compresses a body, in the executor if large
+
+        :param body: Bytes
+        :return: Compressed bytes
+        """
+
+        if len(body) < self.offload_size:
+            return compress(body, self.level)
+
+        if self.executor is not None:
+            return await self.executor.run(compress, body, self.level)
+
+        return await asyncio.get_event_loop().run_in_executor(None, compress, body, self.level)
+
+
+class CompressionResponder:
+    """Compresses a single response, as it's being sent
+
+    :param middleware: CompressionMiddleware
+    :param scope: ASGI scope
+    :param send: ASGI send callable
+    """
+
+    def __init__(self, middleware, scope, send):
+        self.middleware = middleware
+        self.scope = scope
+        self._send = send
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    def eligible(self, headers):
+        if self.start["status"] in EMPTY_STATUSES or "content-encoding" in headers:
+            return False
+
+        return headers.get("content-type", "").startswith(self.middleware.media_types)
+
+    async def send(self, message):
+        if self.passthrough:
+            await self._send(message)
+        elif message["type"] == "http.response.start":
+            # Deferred until the first body chunk is known
+            self.start = message
+        elif self.compressor is not None:
+            await self._send_chunk(message)
+        else:
+            await self._send_first(message)
+
+    async def _send_first(self, message):
+        headers = MutableHeaders(raw=list(self.start["headers"]))
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.eligible(headers) or not more_body and len(body) < self.middleware.min_size:
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        headers["content-encoding"] = "gzip"
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+
+        if etag and not etag.startswith("W/"):
+            # The compressed body isn't byte-for-byte identical to the tagged one
+            headers["etag"] = f"W/{etag}"
+
+        if more_body:
+            # Streamed response: compressed incrementally, without a content-length
+            del headers["content-length"]
+            self.compressor = zlib.compressobj(self.middleware.level, zlib.DEFLATED, GZIP_WBITS)
+            await self._send(dict(self.start, headers=headers.raw))
+            await self._send_chunk(message)
+            return
+
+        cache = self.middleware.cache
+        key = (self.scope["path"], etag)
+        compressed = cache.get(key) if cache is not None and etag else None
+
+        if compressed is None:
+            compressed = await self.middleware.compress(body)
+
+            if cache is not None and etag:
+                cache.set(key, compressed)
+
+        headers["content-length"] = str(len(compressed))
+        await self._send(dict(self.start, headers=headers.raw))
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _send_chunk(self, message):
+        more_body = message.get("more_body", False)
+        body = self.compressor.compress(message.get("body", b""))
+
+        if more_body:
+            body += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        else:
+            body += self.compressor.flush()
+
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
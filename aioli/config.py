@@ -41,6 +41,9 @@ class PackageConfigSchema(BaseConfigSchema):
     :var path: Package path, uses Package name if empty
     :var should_import_services: Setting to False skips Service registration for this Package
     :var should_import_controllers: Setting to False skips Controller registration for this Package
+    :var startup_timeout: Max number of seconds for the Package's `on_startup` hooks to complete
+    :var handler_limit: Max number of concurrent requests per route handler, unless set using @route
+    :var priority: Priority class of route handlers, unless set using @route: critical, high, normal or low
     """
 
     def __init__(self, *args, **kwargs):
@@ -50,6 +53,9 @@ class PackageConfigSchema(BaseConfigSchema):
     path = fields.String(required=False, missing=None)
     should_import_controllers = fields.Bool(missing=True)
     should_import_services = fields.Bool(missing=True)
+    startup_timeout = fields.Integer(missing=60)
+    handler_limit = fields.Integer(missing=None, validate=validate.Range(min=1))
+    priority = fields.String(missing="normal", validate=validate.OneOf(["critical", "high", "normal", "low"]))
 
 
 class ApplicationConfigSchema(BaseConfigSchema):
@@ -59,6 +65,36 @@ class ApplicationConfigSchema(BaseConfigSchema):
     :var dev_port: Development server listen port
     :var debug: Debug mode
     :var path: Application base path
+    :var json_codec: JSON codec used for requests and responses: json, ujson, orjson or <module>:<class>
+    :var cache_max_size: Max total size in bytes of responses cached using @cached
+    :var metrics: Collect request metrics for each route handler
+    :var metrics_path: Path of the Prometheus metrics endpoint, disabled if empty
+    :var max_stream_size: Max size in bytes of request bodies consumed using @takes(stream=...)
+    :var batch_path: Path of the batch endpoint relative to the Application base path, disabled if empty
+    :var batch_max_items: Max number of requests per batch
+    :var compression: Gzip compress responses for clients accepting it
+    :var compression_min_size: Min size in bytes of response bodies to compress
+    :var compression_level: Compression level, 1-9
+    :var compression_offload_size: Min size in bytes of response bodies compressed in a worker thread
+    :var compression_types: Content-type prefixes of responses to compress
+    :var compression_cache_size: Max total size in bytes of compressed bodies reused for responses with an ETag
+    :var executor_threads: Max number of threads of the Application's thread pool, defaults to the number of CPUs + 4
+    :var executor_processes: Max number of processes of the Application's process pool, defaults to the number of CPUs
+    :var offload_size: Payload size in bytes from which validation and serialization move to the thread pool, 0 disables
+    :var ws_queue_size: Max number of messages queued per WebSocket connection registered with the Hub
+    :var ws_slow_policy: What happens to messages published to WebSocket connections with full queues:
+        drop (the oldest message), coalesce (with the queued message of the same channel) or disconnect
+    :var max_concurrency: Max number of requests processed concurrently by route handlers, 0 disables
+    :var admission_queue_size: Max number of requests waiting for admission, per limit
+    :var admission_queue_timeout: Max number of seconds a request may wait for admission
+    :var access_log: Write a structured access log line, in JSON, per route handler request
+    :var access_log_sample: Fraction of requests written to the access log, server errors are always included
+    :var access_log_rate: Max number of access log lines per second, 0 for no limit
+    :var timing: Record a timeline of spans per route handler request
+    :var timing_sample: Fraction of timed requests receiving their timeline in a Server-Timing header
+    :var timing_slow_threshold: Seconds from which the timeline of a request is logged, 0 disables
+    :var radix_router: Match HTTP routes using a prefix tree, rather than testing each route in turn
+    :var shutdown_timeout: Max number of seconds to wait for requests and background tasks upon shutdown
     """
 
     def __init__(self, *args, **kwargs):
@@ -70,3 +106,32 @@ class ApplicationConfigSchema(BaseConfigSchema):
     allow_origins = fields.List(fields.String(), missing=["*"])
     debug = fields.Bool(missing=True)
     path = fields.String(missing="/api", attribute="api_base")
+    json_codec = fields.String(missing="ujson")
+    cache_max_size = fields.Integer(missing=64 * 1024 * 1024)
+    metrics = fields.Bool(missing=True)
+    metrics_path = fields.String(missing="")
+    shutdown_timeout = fields.Integer(missing=30)
+    radix_router = fields.Bool(missing=False)
+    max_stream_size = fields.Integer(missing=1024 * 1024 * 1024)
+    batch_path = fields.String(missing="")
+    batch_max_items = fields.Integer(missing=20)
+    executor_threads = fields.Integer(missing=None)
+    executor_processes = fields.Integer(missing=None)
+    offload_size = fields.Integer(missing=1024 * 1024)
+    ws_queue_size = fields.Integer(missing=100, validate=validate.Range(min=1))
+    ws_slow_policy = fields.String(missing="drop", validate=validate.OneOf(["drop", "coalesce", "disconnect"]))
+    max_concurrency = fields.Integer(missing=0, validate=validate.Range(min=0))
+    admission_queue_size = fields.Integer(missing=100, validate=validate.Range(min=0))
+    admission_queue_timeout = fields.Float(missing=1.0, validate=validate.Range(min=0))
+    access_log = fields.Bool(missing=False)
+    access_log_sample = fields.Float(missing=1.0, validate=validate.Range(min=0, max=1))
+    access_log_rate = fields.Integer(missing=0, validate=validate.Range(min=0))
+    timing = fields.Bool(missing=False)
+    timing_sample = fields.Float(missing=1.0, validate=validate.Range(min=0, max=1))
+    timing_slow_threshold = fields.Float(missing=0.0, validate=validate.Range(min=0))
+    compression = fields.Bool(missing=False)
+    compression_min_size = fields.Integer(missing=1024)
+    compression_level = fields.Integer(missing=6, validate=validate.Range(min=1, max=9))
+    compression_offload_size = fields.Integer(missing=256 * 1024)
+    compression_types = fields.List(fields.String(), missing=["application/json", "application/x-ndjson", "text/"])
+    compression_cache_size = fields.Integer(missing=16 * 1024 * 1024)
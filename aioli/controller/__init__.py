@@ -1,4 +1,4 @@
-from .base import BaseHttpController, BaseWebSocketController
-from .decorators import route, takes, returns
+from .base import BaseHttpController, BaseSseController, BaseWebSocketController
+from .decorators import route, takes, returns, cached
 from .consts import RequestProp, Method
 
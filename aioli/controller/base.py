@@ -1,26 +1,32 @@
-import re
+import asyncio
 
-from starlette.endpoints import WebSocketEndpoint
+from starlette import status
 
 from aioli.component import Component, ComponentMeta
+from aioli.utils import format_path
 
-from .registry import handlers
+from .plan import CallPlan
+from .registry import RouteEntry, collect_handlers
+from .sse import HEARTBEAT, SseClient, SseResponse, SseStream
 
 
-def format_path(*parts):
-    path = ""
-
-    for part in parts:
-        path = f"/{path}/{part}"
-
-    return re.sub(r"/+", "/", path.rstrip("/"))
+class HttpControllerMeta(ComponentMeta):
+    def __init__(cls, name, bases, namespace):
+        super(HttpControllerMeta, cls).__init__(name, bases, namespace)
 
+        # Index route handlers once, upon class creation
+        cls._handlers = collect_handlers(cls)
 
-class HttpControllerMeta(ComponentMeta):
     def __call__(cls, pkg, *args, **kwargs):
         ctrl = super(HttpControllerMeta, cls).__call__(pkg, *args, **kwargs)
         app = pkg.app
 
+        # Controllers are singletons: getting the instance again must not register its routes twice
+        if ctrl._routes_app is app:
+            return ctrl
+
+        routes = []
+
         for func, handler in ctrl.handlers:
             handler_addr = hex(id(func))
             handler_name = f"{ctrl.__class__.__name__}.{handler.name}"
@@ -37,8 +43,23 @@ class HttpControllerMeta(ComponentMeta):
 
             methods = [handler.method]
 
-            app.add_route(path_full, func, methods, handler_name)
-            handler.path_full = path_full
+            # Compile decorator metadata into a single call plan, used as the route endpoint.
+            # Handlers are shared by subclasses: per-registration state belongs to the plan and route entry.
+            plan = CallPlan(ctrl, handler, path_full)
+
+            if handler.lean:
+                # The plan is an ASGI application
+                app.add_route(path_full, plan, methods, handler_name)
+
+                if "{" not in path_full:
+                    app.lean_routes.setdefault(path_full, {})[handler.method] = plan
+            else:
+                app.add_route(path_full, plan.endpoint, methods, handler_name)
+
+            routes.append(RouteEntry(path_full, handler.method, handler_name, handler, plan, ctrl, pkg.name))
+
+        ctrl.routes = tuple(routes)
+        ctrl._routes_app = app
 
         return ctrl
 
@@ -51,19 +72,294 @@ class BaseHttpController(Component, metaclass=HttpControllerMeta):
     :var pkg: Parent Package
     :var config: Package configuration
     :var log: Controller logger
+    :var routes: Routes registered by this Controller
     """
 
+    routes = ()
+
+    # Application the routes were registered with
+    _routes_app = None
+
     async def on_request(self, *args):
         """Called on request arrival for this Controller"""
 
     @property
     def handlers(self):
-        for handler in handlers.values():
-            # Yield only if the stack belongs to the Controller being iterated on
-            if handler.func.__module__ == self.__module__:
-                yield getattr(self, handler.name), handler
+        for handler in self._handlers:
+            yield getattr(self, handler.name), handler
+
+
+class SseControllerMeta(ComponentMeta):
+    def __call__(cls, pkg, *args, **kwargs):
+        ctrl = super(SseControllerMeta, cls).__call__(pkg, *args, **kwargs)
+
+        if ctrl._routes_app is pkg.app:
+            return ctrl
+
+        if ctrl.path is not None:
+            path_full = format_path(pkg.app.config["api_base"], pkg.path, ctrl.path)
+            ctrl.log.info(f"Registering SSE Route: {path_full} => {cls.__name__}")
+            pkg.app.add_route(path_full, ctrl.endpoint, ["GET"], cls.__name__)
+
+        pkg.app.close_handlers.append(ctrl.close)
+        ctrl._routes_app = pkg.app
+
+        return ctrl
+
+
+class BaseSseController(Component, metaclass=SseControllerMeta):
+    """Server-Sent Events Controller, streaming events published to it to clients connecting to `path`.
+
+    Events are encoded once per publication, and the latest `buffer_size` events of each stream are kept
+    for clients resuming with the Last-Event-ID header. Idle clients are sent a comment every `heartbeat`
+    seconds, by a single timer shared by all connections.
+
+    :param pkg: Attach to this package
+
+    :var pkg: Parent Package
+    :var config: Package configuration
+    :var log: Controller logger
+    :var path: Path relative to the Package path, no route is registered if None
+    :var buffer_size: Number of events kept per stream for resumption
+    :var queue_size: Max number of events queued per client, slower clients are disconnected
+    :var heartbeat: Seconds between heartbeats sent to idle clients
+    :var retry: Reconnection delay in milliseconds advised to clients, or None
+    :var streams: Streams by name
+    """
+
+    path = None
+    _routes_app = None
+    buffer_size = 1000
+    queue_size = 1000
+    heartbeat = 15.0
+    retry = None
+    routes = ()
+
+    def __init__(self, pkg):
+        super(BaseSseController, self).__init__(pkg)
+        self.streams = {}
+        self._heartbeat = None
+
+    def stream(self, name="default"):
+        """Returns a stream, creating it if needed
+
+        :param name: Stream name
+        :return: SseStream
+        """
+
+        stream = self.streams.get(name)
+
+        if stream is None:
+            stream = self.streams[name] = SseStream(name, self.app.codec, self.buffer_size)
+
+        return stream
+
+    def publish(self, data, event=None, stream="default"):
+        """Publishes an event to the clients of a stream
+
+        :param data: Event data, str as-is, other objects JSON encoded
+        :param event: Event type
+        :param stream: Stream name
+        :return: Number of clients the event was queued for
+        """
+
+        return self.stream(stream).publish(data, event)
+
+    async def on_connect(self, request):
+        """Called upon connection, may raise an HTTPException to refuse it
+
+        :param request: Starlette Request
+        :return: Name of the stream to send to the client
+        """
+
+        return "default"
+
+    async def endpoint(self, request):
+        """SSE route endpoint
+
+        :param request: Starlette Request
+        :return: SseResponse
+        """
+
+        stream = self.stream(await self.on_connect(request))
+        frames = stream.replay(request.headers.get("last-event-id"))
+
+        if self.retry is not None:
+            frames.insert(0, f"retry: {self.retry}\n\n".encode())
+
+        client = SseClient(self.queue_size)
+        stream.clients.add(client)
+
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.get_event_loop().call_later(self.heartbeat, self._beat)
+
+        return SseResponse(stream, client, frames)
+
+    def _beat(self):
+        clients = 0
 
+        for stream in self.streams.values():
+            for client in list(stream.clients):
+                if not client.active:
+                    client.push(HEARTBEAT)
+
+                client.active = False
+                clients += 1
+
+        if clients:
+            self._heartbeat = asyncio.get_event_loop().call_later(self.heartbeat, self._beat)
+        else:
+            self._heartbeat = None
+
+    def close(self):
+        """Ends all connections, called once the Application starts shutting down"""
+
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+        for stream in self.streams.values():
+            for client in list(stream.clients):
+                client.close()
+
+
+class WebSocketControllerMeta(ComponentMeta):
+    def __call__(cls, pkg, *args, **kwargs):
+        ctrl = super(WebSocketControllerMeta, cls).__call__(pkg, *args, **kwargs)
+
+        if ctrl._routes_app is pkg.app:
+            return ctrl
+
+        if ctrl.path is not None:
+            path_full = format_path(pkg.app.config["api_base"], pkg.path, ctrl.path)
+            ctrl.log.info(f"Registering WebSocket Route: {path_full} => {cls.__name__}")
+            pkg.app.add_websocket_route(path_full, ctrl.endpoint, cls.__name__)
+
+        ctrl._routes_app = pkg.app
+
+        return ctrl
+
+
+class BaseWebSocketController(Component, metaclass=WebSocketControllerMeta):
+    """WebSocket API Controller, handling connections made to `path`.
+
+    Accepted connections are registered with the Application's :class:`~aioli.hub.Hub`, and can be
+    subscribed to channels, receiving payloads published to these.
+
+    :param pkg: Attach to this package
+
+    :var pkg: Parent Package
+    :var config: Package configuration
+    :var log: Controller logger
+    :var path: Path relative to the Package path, no route is registered if None
+    :var encoding: Encoding of received messages: text, bytes or json
+    :var queue_size: Max number of messages queued per connection, defaults to the *ws_queue_size* setting
+    :var policy: Slow consumer policy: drop, coalesce or disconnect, defaults to the *ws_slow_policy* setting
+    """
 
-class BaseWebSocketController(WebSocketEndpoint, Component, metaclass=ComponentMeta):
     path = None
+    _routes_app = None
     encoding = "json"
+    queue_size = None
+    policy = None
+    routes = ()
+
+    @property
+    def hub(self):
+        return self.app.hub
+
+    async def endpoint(self, websocket):
+        """WebSocket route endpoint
+
+        :param websocket: Starlette WebSocket
+        """
+
+        await self.on_connect(websocket)
+        close_code = status.WS_1000_NORMAL_CLOSURE
+
+        try:
+            while True:
+                message = await websocket.receive()
+
+                if message["type"] == "websocket.receive":
+                    await self.on_receive(websocket, await self.decode(websocket, message))
+                elif message["type"] == "websocket.disconnect":
+                    close_code = int(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+                    break
+        except Exception:
+            close_code = status.WS_1011_INTERNAL_ERROR
+            raise
+        finally:
+            closing = self.hub.disconnect(websocket)
+
+            if closing is not None:
+                await closing
+
+            await self.on_disconnect(websocket, close_code)
+
+    async def decode(self, websocket, message):
+        """Decodes a received message according to `encoding`
+
+        :param websocket: Starlette WebSocket
+        :param message: ASGI websocket.receive message
+        :return: Decoded data
+        """
+
+        text = message.get("text")
+
+        if self.encoding == "bytes" and "bytes" in message:
+            return message["bytes"]
+
+        if self.encoding == "text" and text is not None:
+            return text
+
+        if self.encoding == "json":
+            try:
+                return self.app.codec.loads(text if text is not None else message["bytes"])
+            except self.app.codec.decode_errors:
+                pass
+
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        raise RuntimeError(f"Malformed WebSocket data, expected {self.encoding}")
+
+    async def on_connect(self, websocket):
+        """Called upon connection, accepts it and registers it with the Hub
+
+        :param websocket: Starlette WebSocket
+        """
+
+        await websocket.accept()
+        self.hub.connect(websocket, self.queue_size, self.policy)
+
+    async def on_receive(self, websocket, data):
+        """Called upon receiving a message
+
+        :param websocket: Starlette WebSocket
+        :param data: Decoded data
+        """
+
+    async def on_disconnect(self, websocket, close_code):
+        """Called once disconnected, after the connection has been unregistered from the Hub
+
+        :param websocket: Starlette WebSocket
+        :param close_code: WebSocket close code
+        """
+
+    def subscribe(self, websocket, channel):
+        """Subscribes a connection to a channel
+
+        :param websocket: Starlette WebSocket
+        :param channel: Channel name
+        :raise InvalidChannelError: Invalid channel name
+        """
+
+        self.hub.subscribe(websocket, channel)
+
+    def unsubscribe(self, websocket, channel):
+        """Unsubscribes a connection from a channel
+
+        :param websocket: Starlette WebSocket
+        :param channel: Channel name
+        """
+
+        self.hub.unsubscribe(websocket, channel)
@@ -0,0 +1,148 @@
+import hashlib
+
+from collections import OrderedDict
+from time import monotonic
+
+from starlette.responses import Response
+
+
+class CacheEntry:
+    """Encoded response stored in the ResponseCache
+
+    :param body: Encoded response body
+    :param status: Response status
+    :param media_type: Response content-type
+    :param ttl: Time to live in seconds
+    """
+
+    __slots__ = ("body", "status", "media_type", "etag", "expires")
+
+    def __init__(self, body, status, media_type, ttl):
+        self.body = body
+        self.status = status
+        self.media_type = media_type
+        self.etag = '"{}"'.format(hashlib.blake2b(body, digest_size=16).hexdigest())
+        self.expires = monotonic() + ttl
+
+    def matches(self, if_none_match):
+        """Checks whether an If-None-Match header value matches this entry's ETag
+
+        :param if_none_match: Header value
+        :return: True if matching
+        """
+
+        if if_none_match.strip() == "*":
+            return True
+
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+
+            if tag.startswith("W/"):
+                tag = tag[2:]
+
+            if tag == self.etag:
+                return True
+
+        return False
+
+    def respond(self, request):
+        """Creates a Response from this entry, or a 304 if the client has a matching copy
+
+        :param request: Starlette Request
+        :return: Response
+        """
+
+        if_none_match = request.headers.get("if-none-match")
+
+        if if_none_match and self.matches(if_none_match):
+            return Response(status_code=304, headers={"etag": self.etag})
+
+        return Response(
+            content=self.body,
+            status_code=self.status,
+            headers={"content-type": self.media_type, "etag": self.etag},
+        )
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of encoded responses, used by handlers decorated with @cached.
+
+    Keys are tuples, starting with the handler's full path.
+
+    :param max_size: Max total size of cached response bodies, in bytes
+
+    :var size: Current total size of cached response bodies
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns a live entry, or None
+
+        :param key: Cache key
+        :return: CacheEntry or None
+        """
+
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        if entry.expires <= monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, body, status, media_type, ttl):
+        """Stores an encoded response, evicting the least recently used entries if needed
+
+        :param key: Cache key
+        :param body: Encoded response body
+        :param status: Response status
+        :param media_type: Response content-type
+        :param ttl: Time to live in seconds
+        :return: CacheEntry
+        """
+
+        entry = CacheEntry(body, status, media_type, ttl)
+
+        if len(body) > self.max_size:
+            return entry
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = entry
+        self.size += len(body)
+
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+        return entry
+
+    def invalidate(self, prefix=""):
+        """Removes entries of handlers whose full path equals, or is located under `prefix`
+
+        :param prefix: Path prefix, removes all entries if empty
+        :return: Number of removed entries
+        """
+
+        parent = prefix.rstrip("/") + "/"
+        keys = [key for key in self._entries if key[0] == prefix or key[0].startswith(parent)]
+
+        for key in keys:
+            self._remove(key)
+
+        return len(keys)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size -= len(entry.body)
@@ -0,0 +1,483 @@
+import math
+import re
+
+from collections.abc import Mapping
+
+from marshmallow import fields, missing, INCLUDE, RAISE
+from marshmallow.decorators import POST_DUMP, PRE_DUMP, POST_LOAD, PRE_LOAD, VALIDATES, VALIDATES_SCHEMA
+from marshmallow.error_store import ErrorStore
+from marshmallow.exceptions import ValidationError
+from marshmallow.schema import BaseSchema
+from marshmallow.utils import ensure_text_type, is_collection, set_value
+
+INT_REGEX = re.compile(r"-?[0-9]+\Z")
+
+
+class SourceBuilder:
+    """Accumulates generated source code along with the objects it references
+
+    :param prefix: Prefix used for generated names
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.lines = []
+        self.namespace = {}
+        self._count = 0
+
+    def bind(self, obj):
+        """Makes an object available to the generated code
+
+        :param obj: Any object
+        :return: Name of the object in the generated namespace
+        """
+
+        name = f"_{self.prefix}{self._count}"
+        self.namespace[name] = obj
+        self._count += 1
+        return name
+
+    def line(self, code, indent=0):
+        self.lines.append("    " * indent + code)
+
+    def build(self, func_name):
+        """Compiles the accumulated source and returns the function of the given name
+
+        :param func_name: Name of the function to return
+        :return: Generated function
+        """
+
+        source = "\n".join(self.lines)
+        exec(compile(source, f"<aioli.codegen {func_name}>", "exec"), self.namespace)
+        return self.namespace[func_name]
+
+
+def _has_hooks(schema, *tags):
+    return any(schema._has_processors(tag) for tag in tags)
+
+
+class DumperCompiler:
+    """Generates specialized dump functions for Schema instances.
+
+    Plain fields are inlined, Nested schemas and Lists are compiled recursively, while
+    other field types are serialized using their own marshmallow implementation.
+    Schemas with dump hooks or overridden serialization methods are dumped by marshmallow.
+    """
+
+    def __init__(self):
+        self._stack = []
+
+    @staticmethod
+    def is_compilable(schema):
+        schema_cls = type(schema)
+
+        return (
+            not _has_hooks(schema, PRE_DUMP, POST_DUMP)
+            and schema_cls.dump is BaseSchema.dump
+            and schema_cls._serialize is BaseSchema._serialize
+            and schema_cls.get_attribute is BaseSchema.get_attribute
+        )
+
+    def value_expr(self, src, field, var):
+        """Returns an expression serializing `var` according to `field`, or None if unsupported
+
+        :param src: SourceBuilder
+        :param field: Field instance
+        :param var: Name of the variable holding the value
+        :return: Python expression
+        """
+
+        field_type = type(field)
+
+        if field_type is fields.Raw:
+            return var
+        elif field_type is fields.String:
+            return f"None if {var} is None else ({var} if type({var}) is str else {src.bind(ensure_text_type)}({var}))"
+        elif field_type in (fields.Integer, fields.Float):
+            num_type = field.num_type.__name__
+            formatted = f"({var} if type({var}) is {num_type} else {num_type}({var}))"
+
+            if field.as_string:
+                formatted = f"str({formatted})"
+
+            return f"None if {var} is None else {formatted}"
+        elif field_type is fields.Boolean:
+            truthy, falsy = src.bind(field.truthy), src.bind(field.falsy)
+            return (
+                f"None if {var} is None else (True if {var} in {truthy} "
+                f"else (False if {var} in {falsy} else bool({var})))"
+            )
+        elif field_type is fields.Nested:
+            schema = field.schema
+            many = schema.many or field.many
+
+            if type(schema) in self._stack:
+                # Self-referencing schema, dumped by marshmallow
+                return f"None if {var} is None else {src.bind(schema.dump)}({var}, many={many})"
+
+            return f"None if {var} is None else {src.bind(self.compile(schema, many=many))}({var})"
+        elif field_type is fields.List:
+            inner = field.inner
+
+            if type(inner) is fields.Nested and not inner.many:
+                dumper = self.compile(inner.schema, many=True) if type(inner.schema) not in self._stack else None
+
+                if dumper:
+                    return f"None if {var} is None else {src.bind(dumper)}({var})"
+
+            item_var = f"{var}_"
+            item_expr = self.value_expr(src, inner, item_var)
+
+            if item_expr is None:
+                return None
+
+            return f"None if {var} is None else [{item_expr} for {item_var} in {var}]"
+
+        return None
+
+    @staticmethod
+    def _field_lines(src, attr_name, field, expr, for_dict, indent):
+        key = field.data_key if field.data_key is not None else attr_name
+        check_key = field.attribute if field.attribute is not None else attr_name
+
+        if expr is None:
+            # Unsupported field type: let marshmallow handle fetching and serialization
+            src.line(f"value = {src.bind(field)}.serialize({attr_name!r}, obj, accessor=_get_value)", indent)
+            src.line(f"if value is not _missing:", indent)
+            src.line(f"ret[{key!r}] = value", indent + 1)
+            return
+
+        if for_dict and "." not in check_key:
+            src.line(f"value = obj.get({check_key!r}, _missing)", indent)
+            src.line(f"if value is _missing:", indent)
+            src.line(f"value = getattr(obj, {check_key!r}, _missing)", indent + 1)
+        else:
+            src.line(f"value = _get_value(obj, {check_key!r}, _missing)", indent)
+
+        if field.default is not missing:
+            default = src.bind(field.default)
+            src.line(f"if value is _missing:", indent)
+            src.line(f"value = {default}() if callable({default}) else {default}", indent + 1)
+
+        src.line(f"if value is not _missing:", indent)
+        src.line(f"ret[{key!r}] = {expr}", indent + 1)
+
+    def compile(self, schema, many=None):
+        """Compiles a dump function for the given Schema instance
+
+        :param schema: Schema instance
+        :param many: Whether the function dumps a collection, defaults to `schema.many`
+        :return: Function taking an object (or collection of objects) and returning the dumped data
+        """
+
+        many = schema.many if many is None else many
+
+        if not self.is_compilable(schema):
+            return lambda obj: schema.dump(obj, many=many)
+
+        self._stack.append(type(schema))
+
+        src = SourceBuilder("d")
+        src.namespace.update(_missing=missing, _get_value=schema.get_attribute)
+        dict_class = "{}" if schema.dict_class is dict else f"{src.bind(schema.dict_class)}()"
+
+        dump_fields = [
+            (attr_name, field, self.value_expr(src, field, "value"))
+            for attr_name, field in schema.dump_fields.items()
+        ]
+
+        src.line("def dump_one(obj):")
+        src.line(f"ret = {dict_class}", 1)
+
+        # Dictionaries are by far the most common input, and get a specialized branch
+        for branch, for_dict in (("if type(obj) is dict:", True), ("else:", False)):
+            src.line(branch, 1)
+
+            if not dump_fields:
+                src.line("pass", 2)
+
+            for attr_name, field, expr in dump_fields:
+                self._field_lines(src, attr_name, field, expr, for_dict=for_dict, indent=2)
+
+        src.line("return ret", 1)
+
+        src.line("def dump_many(objs):")
+        src.line("if objs is None:", 1)
+        src.line("return dump_one(objs)", 2)
+        src.line("return [dump_one(obj) for obj in objs]", 1)
+
+        self._stack.pop()
+
+        return src.build("dump_many" if many else "dump_one")
+
+
+def compile_dumper(schema, many=None):
+    """Compiles a specialized function producing the same output as `schema.dump`
+
+    :param schema: Schema instance
+    :param many: Whether to dump a collection, defaults to `schema.many`
+    :return: Dump function
+    """
+
+    return DumperCompiler().compile(schema, many)
+
+
+class LoaderCompiler:
+    """Generates specialized load functions for Schema instances.
+
+    Values of common field types are checked and converted inline, anything else (missing required
+    values, None, invalid input) is deserialized by the field itself, resulting in the same data
+    and `ValidationError.messages` as `Schema.load`. Schemas with load hooks, field validators
+    declared with `@validates` or unsupported options are loaded by marshmallow.
+    """
+
+    def __init__(self):
+        self._stack = []
+
+    @staticmethod
+    def is_compilable(schema):
+        schema_cls = type(schema)
+        data_keys = [
+            field.data_key if field.data_key is not None else name
+            for name, field in schema.load_fields.items()
+        ]
+
+        return (
+            not _has_hooks(schema, PRE_LOAD, POST_LOAD, VALIDATES_SCHEMA)
+            and not schema._hooks[VALIDATES]
+            and schema_cls.load is BaseSchema.load
+            and schema_cls._do_load is BaseSchema._do_load
+            and schema_cls._deserialize is BaseSchema._deserialize
+            and schema_cls.handle_error is BaseSchema.handle_error
+            and schema.opts.index_errors
+            and len(data_keys) == len(set(data_keys))
+        )
+
+    @staticmethod
+    def value_check(src, field, var):
+        """Returns a condition and expression for converting `var` inline, or None if unsupported
+
+        :param src: SourceBuilder
+        :param field: Field instance
+        :param var: Name of the variable holding the value
+        :return: Tuple of (condition, expression)
+        """
+
+        field_type = type(field)
+
+        if field_type is fields.Raw:
+            return f"{var} is not None", var
+        elif field_type is fields.String:
+            return f"type({var}) is str", var
+        elif field_type is fields.Integer:
+            if field.strict:
+                return f"type({var}) is int", var
+
+            return (
+                f"type({var}) is int or (type({var}) is str and {src.bind(INT_REGEX.match)}({var}))",
+                f"{var} if type({var}) is int else int({var})",
+            )
+        elif field_type is fields.Float:
+            if field.allow_nan:
+                return f"type({var}) is float", var
+
+            return f"type({var}) is float and {src.bind(math.isfinite)}({var})", var
+        elif field_type is fields.Boolean:
+            if field.truthy and (True not in field.truthy or False not in field.falsy):
+                return None
+
+            return f"{var} is True or {var} is False", var
+
+        return None
+
+    def _validate_lines(self, src, field_ref, key, indent):
+        src.line("try:", indent)
+        src.line(f"{field_ref}._validate(value)", indent + 1)
+        src.line("except _ValidationError as error:", indent)
+        src.line(f"error_store.store_error(error.messages, {key!r}, index=index)", indent + 1)
+        src.line("value = _missing", indent + 1)
+
+    def _nested_lines(self, src, field_ref, nested, key, validators, indent):
+        src.line(f"value, errors = {src.bind(nested)}(raw)", indent)
+        src.line("if errors:", indent)
+        src.line(f"error_store.store_error(errors, {key!r}, index=index)", indent + 1)
+        src.line("value = value or _missing", indent + 1)
+
+        if validators:
+            src.line("else:", indent)
+            src.line("try:", indent + 1)
+
+            for ref in validators:
+                src.line(f"{ref}._validate(value)", indent + 2)
+
+            src.line("except _ValidationError as error:", indent + 1)
+            src.line(f"error_store.store_error(error.messages, {key!r}, index=index)", indent + 2)
+            src.line("value = _missing", indent + 2)
+
+    def _field_lines(self, src, attr_name, field):
+        key = field.data_key if field.data_key is not None else attr_name
+        attr = field.attribute or attr_name
+        field_ref = src.bind(field)
+        field_type = type(field)
+        indent = 2
+
+        src.line(f"raw = get({key!r}, _missing)", indent)
+        src.line("if raw is _missing:", indent)
+
+        if field.required:
+            src.line(f"value = _call_and_store({field_ref}, raw, {key!r}, data, error_store, index)", indent + 1)
+        elif field.missing is missing:
+            src.line("value = _missing", indent + 1)
+        else:
+            default = src.bind(field.missing)
+            src.line(f"value = {default}() if callable({default}) else {default}", indent + 1)
+
+        check = self.value_check(src, field, "raw")
+
+        if check:
+            cond, expr = check
+            src.line(f"elif {cond}:", indent)
+            src.line(f"value = {expr}", indent + 1)
+
+            if field.validators:
+                self._validate_lines(src, field_ref, key, indent + 1)
+        elif field_type is fields.Nested and type(field.schema) not in self._stack:
+            many = field.schema.many or field.many
+            nested = self.compile(field.schema, many=many, unknown=field.unknown, nested=True)
+            src.line(f"elif type(raw) is {'list' if many else 'dict'}:", indent)
+            self._nested_lines(src, field_ref, nested, key, [field_ref] if field.validators else [], indent + 1)
+        elif field_type is fields.List:
+            inner = field.inner
+            validators = [src.bind(obj) for obj in (inner, field) if obj.validators]
+
+            if type(inner) is fields.Nested and not inner.many and type(inner.schema) not in self._stack:
+                nested = self.compile(inner.schema, many=True, unknown=inner.unknown, nested=True)
+                src.line("elif type(raw) is list:", indent)
+                self._nested_lines(src, field_ref, nested, key, validators, indent + 1)
+            elif not inner.validators and self.value_check(src, inner, "item"):
+                cond, expr = self.value_check(src, inner, "item")
+                src.line(f"elif type(raw) is list and all({cond} for item in raw):", indent)
+                src.line(f"value = [{expr} for item in raw]", indent + 1)
+
+                if field.validators:
+                    self._validate_lines(src, field_ref, key, indent + 1)
+
+        src.line("else:", indent)
+        src.line(f"value = _call_and_store({field_ref}, raw, {key!r}, data, error_store, index)", indent + 1)
+        src.line("if value is not _missing:", indent)
+
+        if "." in attr:
+            src.line(f"_set_value(ret, {attr!r}, value)", indent + 1)
+        else:
+            src.line(f"ret[{attr!r}] = value", indent + 1)
+
+    def compile(self, schema, many=None, unknown=None, nested=False):
+        """Compiles a load function for the given Schema instance
+
+        :param schema: Schema instance
+        :param many: Whether the function loads a collection, defaults to `schema.many`
+        :param unknown: How to handle unknown fields, defaults to `schema.unknown`
+        :param nested: Compile for use by a Nested field; the function returns a
+            tuple of (data, errors) instead of raising `ValidationError`
+        :return: Function taking the data to deserialize
+        """
+
+        many = schema.many if many is None else many
+        unknown = unknown or schema.unknown
+
+        if nested:
+            compilable = self.is_compilable(schema)
+        else:
+            compilable = self.is_compilable(schema) and schema.partial is False
+
+        if not compilable:
+            if not nested:
+                return lambda data: schema.load(data, many=many)
+
+            def load_pair(data):
+                try:
+                    return schema.load(data, many=many, unknown=unknown, partial=False), None
+                except ValidationError as error:
+                    return error.valid_data, error.messages
+
+            return load_pair
+
+        self._stack.append(type(schema))
+
+        src = SourceBuilder("l")
+        src.namespace.update(
+            _missing=missing,
+            _Mapping=Mapping,
+            _ErrorStore=ErrorStore,
+            _ValidationError=ValidationError,
+            _call_and_store=_call_and_store,
+            _is_collection=is_collection,
+            _set_value=set_value,
+            _type_error=[schema.error_messages["type"]],
+            _unknown_error=[schema.error_messages["unknown"]],
+            _data_keys=frozenset(
+                field.data_key if field.data_key is not None else name
+                for name, field in schema.load_fields.items()
+            ),
+        )
+        dict_class = "{}" if schema.dict_class is dict else f"{src.bind(schema.dict_class)}()"
+
+        src.line("def load_one(data, error_store, index):")
+        src.line(f"ret = {dict_class}", 1)
+        src.line("if type(data) is not dict and not isinstance(data, _Mapping):", 1)
+        src.line("error_store.store_error(_type_error, index=index)", 2)
+        src.line("return ret", 2)
+        src.line("else:", 1)
+        src.line("get = data.get", 2)
+
+        for attr_name, field in schema.load_fields.items():
+            self._field_lines(src, attr_name, field)
+
+        if unknown == INCLUDE:
+            src.line("for key in set(data) - _data_keys:", 2)
+            src.line("_set_value(ret, key, data[key])", 3)
+        elif unknown == RAISE:
+            src.line("for key in set(data) - _data_keys:", 2)
+            src.line("error_store.store_error(_unknown_error, key, index)", 3)
+
+        src.line("return ret", 1)
+
+        src.line("def load_many(data, error_store, index):")
+        src.line("if not _is_collection(data):", 1)
+        src.line("error_store.store_error(_type_error, index=index)", 2)
+        src.line("return []", 2)
+        src.line("return [load_one(item, error_store, idx) for idx, item in enumerate(data)]", 1)
+
+        src.line("def load_pair(data):")
+        src.line("error_store = _ErrorStore()", 1)
+        src.line(f"ret = {'load_many' if many else 'load_one'}(data, error_store, None)", 1)
+        src.line("return ret, error_store.errors", 1)
+
+        src.line("def load(data):")
+        src.line("ret, errors = load_pair(data)", 1)
+        src.line("if errors:", 1)
+        src.line("raise _ValidationError(errors, data=data, valid_data=ret)", 2)
+        src.line("return ret", 1)
+
+        self._stack.pop()
+
+        return src.build("load_pair" if nested else "load")
+
+
+def _call_and_store(field, raw, key, data, error_store, index):
+    try:
+        return field.deserialize(raw, key, data, partial=False)
+    except ValidationError as error:
+        error_store.store_error(error.messages, key, index=index)
+        return error.valid_data or missing
+
+
+def compile_loader(schema, many=None):
+    """Compiles a specialized function producing the same output and errors as `schema.load`
+
+    :param schema: Schema instance
+    :param many: Whether to load a collection, defaults to `schema.many`
+    :return: Load function
+    """
+
+    return LoaderCompiler().compile(schema, many)
@@ -1,147 +1,139 @@
-from functools import wraps
-
-from starlette.requests import Request
-from starlette.responses import Response
-
+from aioli.admission import PRIORITIES
 from aioli.exceptions import AioliException
-from aioli.utils import jsonify
 
 from .consts import Method, RequestProp
 from .registry import Handler
 
 
-def route(path, method, description=None):
+def route(path, method, description=None, lean=False, limit=None, priority=None):
     """Prepares route registration, and performs handler injection.
 
+    Lean route handlers are dispatched directly from the ASGI scope, without a Starlette Request or
+    Response, and never receive the Request. Handlers with static paths also bypass middleware.
+
+    Requests beyond the handler's `limit`, or the Application's `max_concurrency` setting, wait for
+    admission within the `admission_queue_timeout` setting, or are rejected with 503 Service Unavailable.
+
     :param path: Handler path, relative to application and package paths
     :param method: HTTP Method
     :param description: Endpoint description
+    :param lean: Dispatch directly from the ASGI scope
+    :param limit: Max number of concurrent requests, defaults to the Package's `handler_limit` setting
+    :param priority: Priority class: critical (bypasses limits), high, normal or low, defaults to
+        the Package's `priority` setting
     :return: Route handler
     """
 
     def wrapper(fn):
-        @wraps(fn)
-        async def handler_fn(*args, **kwargs):
-            return await fn(*args, **kwargs)
-
         if not isinstance(method, Method):
             raise AioliException(
-                f"Invalid HTTP method supplied in @route for handler: {handler_fn}. "
+                f"Invalid HTTP method supplied in @route for handler: {fn}. "
                 f"Must be of type: {Method.__module__}.{Method.__name__}"
             )
 
-        handler = Handler(handler_fn)
+        if priority is not None and priority not in PRIORITIES:
+            raise AioliException(
+                f"Invalid priority supplied in @route for handler: {fn}. Must be one of: {', '.join(PRIORITIES)}"
+            )
+
+        handler = Handler(fn)
 
         # Adds the handler for registration once the loop is ready.
-        handler.register_route(path, method.value, description)
+        handler.register_route(path, method.value, description, lean)
+        handler.limit = limit
+        handler.priority = priority
 
-        return handler_fn
+        return fn
 
     return wrapper
 
 
-def takes(props=None, **schemas):
+def takes(props=None, compiled=False, strict=True, offload=None, **schemas):
     """Takes a list of schemas used to validate and transform parts of a request object.
     The selected parts are injected into the route handler as arguments.
 
+    A `stream` schema makes the route handler receive an async iterator of validated items
+    instead, parsed incrementally from a request body containing NDJSON or a JSON array.
+
     :param props: List of `Pluck` targets
+    :param compiled: Generate specialized load functions for the schemas upon registration
+    :param strict: Raise upon the first invalid `stream` item, rather than skipping it and
+        recording its errors in `ItemStream.errors`
+    :param offload: Decode and validate the body in the Application's thread pool: True or False to
+        force, None for bodies of at least the `offload_size` setting
     :param schemas: list of schemas (kwargs)
     :return: Route handler
     """
 
-    header = schemas.get("header")
-    body = schemas.get("body")
-    path = schemas.get("path")
-    query = schemas.get("query")
-
     def wrapper(fn):
-        @wraps(fn)
-        async def handler_fn(*args, **kwargs):
-            args_new = list(args)
-            request = kwargs["request"] if "request" in kwargs else args_new.pop(1)
-
-            for prop in props or []:
-                value = RequestProp(prop).value
-                assert "." in value
-
-                target = request
-
-                for member in value.split("."):
-                    target = getattr(target, member)
-
-                kwargs.update({RequestProp(prop).name: target})
-
-            if header:
-                kwargs.update({"header": header().load(request.headers)})
-
-            if path:
-                kwargs.update(path().load(request.path_params))
-
-            if body:
-                payload = await request.json()
-                kwargs.update({"body": body().load(payload)})
-
-            if query:
-                kwargs.update({"query": query().load(request.query_params)})
-
-            return await fn(*args_new, **kwargs)
-
-        handler = Handler(handler_fn)
+        handler = Handler(fn)
 
         # Add the provided schemas to the RouteStack
         handler.schemas.from_dict(**schemas)
+        handler.props = [RequestProp(prop) for prop in props or []]
+        handler.takes_compiled = compiled
+        handler.takes_strict = strict
+        handler.takes_offload = offload
+        handler.inject_request = False
 
-        return handler_fn
+        return fn
 
     return wrapper
 
 
-def returns(schema_cls=None, status=200, many=False):
+def returns(schema_cls=None, status=200, many=False, compiled=False, batch_size=100, offload=None):
     """Returns a transformed and serialized Response
 
+    With `many` set, the route handler may also return an async iterator, which is streamed
+    to the client as a JSON array, or as NDJSON if requested using the Accept header.
+
     :param schema_cls: Marshmallow.Schema class
     :param status: Return status (on success)
     :param many: Whether to return a list or single object
+    :param compiled: Generate a specialized dump function for `schema_cls` upon registration
+    :param batch_size: Number of items serialized at a time when streaming
+    :param offload: Serialize in the Application's thread pool: True or False to force, None for handlers
+        whose previous response body was at least the `offload_size` setting
     :return: Response
     """
 
-    schema = schema_cls(many=many) if schema_cls else None
-
     def wrapper(fn):
-        @wraps(fn)
-        async def handler_fn(pkg, *args, **kwargs):
-            args_new = list(args)
+        handler = Handler(fn)
 
-            # Remove `Request` object from args (in case it wasn't consumed by an `input_local`).
-            if len(args) > 1 and isinstance(args[1], Request):
-                args_new.pop(1)
+        # Add the `response` schema to this handler
+        handler.schemas.response = schema_cls
+        handler.status = status
+        handler.many = many
+        handler.batch_size = batch_size
+        handler.returns_compiled = compiled
+        handler.returns_offload = offload
+        handler.returns = True
+        handler.inject_request = False
 
-            rv = await fn(pkg, *args_new, **kwargs)
+        return fn
 
-            indent = 4 if pkg.app.config["pretty_json"] else 0
+    return wrapper
 
-            if not schema:
-                return jsonify(rv, status, indent=indent)
 
-            data = (
-                schema.dumps(rv, indent=indent, ensure_ascii=False).encode("utf8")
-                if schema
-                else rv
-            )
+def cached(ttl=60, key=None, vary=None):
+    """Caches encoded responses in the Application's ResponseCache, and responds with 304 Not Modified
+    to requests with a matching If-None-Match header, without calling the route handler.
 
-            # Return HTTP encoded JSON response
-            return Response(
-                content=data,
-                status_code=status,
-                headers={"content-type": "application/json"},
-            )
+    Cache keys are made up of the route handler's full path, the HTTP method and the parameters
+    validated using @takes (except body and header).
 
-        handler = Handler(handler_fn)
+    :param ttl: Time to live in seconds
+    :param key: Function taking the Request and returning an additional, hashable key part
+    :param vary: List of request header names to include in the key
+    :return: Route handler
+    """
 
-        # Add the `response` schema to this handler
-        handler.schemas.response = schema_cls
-        handler.status = status
+    def wrapper(fn):
+        handler = Handler(fn)
+        handler.cache_ttl = ttl
+        handler.cache_key = key
+        handler.cache_vary = tuple(name.lower() for name in vary or [])
 
-        return handler_fn
+        return fn
 
     return wrapper
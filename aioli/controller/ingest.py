@@ -0,0 +1,281 @@
+import codecs
+import json
+import re
+
+from marshmallow.exceptions import ValidationError
+
+from aioli.exceptions import DecodeError, HTTPException
+
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson")
+
+SKIP_WHITESPACE = re.compile(r"[ \t\r\n]*").match
+
+DELIMITERS = " \t\r\n,]"
+
+NUMBER_TYPES = (int, float)
+
+LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+
+def truncated(error):
+    """Tells whether a JSON decoding error may be due to the document being cut short, rather than invalid
+
+    :param error: json.JSONDecodeError
+    :return: True if more data could make the document valid
+    """
+
+    rest = error.doc[error.pos:].strip()
+
+    if not rest or error.msg.startswith("Unterminated string"):
+        return True
+
+    if error.msg == "Expecting value":
+        # Partial literal, or sign of a number
+        return any(literal.startswith(rest) for literal in LITERALS)
+
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        return len(rest) < 6
+
+    return False
+
+
+class PayloadTooLarge(HTTPException):
+    def __init__(self, max_size):
+        super(PayloadTooLarge, self).__init__(
+            status_code=413, detail=f"Request body exceeds the maximum size of {max_size} bytes"
+        )
+
+
+class NdjsonParser:
+    """Incremental parser of newline-delimited JSON
+
+    :param codec: JsonCodec used for decoding lines
+    """
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.pending = []
+        self.count = 0
+
+    def _decode(self, lines):
+        items = []
+
+        for line in lines:
+            if not line.strip():
+                continue
+
+            try:
+                items.append(self.codec.loads(line))
+            except self.codec.decode_errors:
+                raise DecodeError(f"Error decoding JSON item {self.count}")
+
+            self.count += 1
+
+        return items
+
+    def feed(self, chunk):
+        """Feeds a chunk of the document
+
+        :param chunk: Bytes
+        :return: List of decoded items
+        """
+
+        self.pending.append(chunk)
+
+        if b"\n" not in chunk:
+            return []
+
+        lines = b"".join(self.pending).split(b"\n")
+        self.pending = [lines.pop()]
+
+        return self._decode(lines)
+
+    def close(self):
+        """Ends the document
+
+        :return: List of remaining decoded items
+        """
+
+        return self._decode([b"".join(self.pending)])
+
+
+class ArrayParser:
+    """Incremental parser of a top-level JSON array, decoding items using the standard library's
+    C scanner as soon as they're complete.
+
+    Failed attempts at decoding an incomplete item are retried once its buffered data has doubled,
+    keeping the cost of large items linear. Items failing for other reasons than being incomplete are
+    rejected immediately.
+    """
+
+    START, FIRST, ITEM, SEPARATOR, DONE = range(5)
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.scanner = json.JSONDecoder()
+        self.buffer = ""
+        self.state = self.START
+        self.retry_size = 0
+        self.count = 0
+
+    def feed(self, chunk, final=False):
+        """Feeds a chunk of the document
+
+        :param chunk: Bytes
+        :param final: Whether this is the last chunk
+        :return: List of decoded items
+        """
+
+        try:
+            buffer = self.buffer + self.decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            raise DecodeError("Invalid JSON array: invalid UTF-8")
+
+        size = len(buffer)
+        pos = 0
+        items = []
+
+        while pos < size:
+            char = buffer[pos]
+
+            if char in " \t\r\n":
+                pos = SKIP_WHITESPACE(buffer, pos).end()
+                continue
+
+            if self.state == self.START:
+                if char != "[":
+                    raise DecodeError("Invalid JSON array: expected a top-level array")
+
+                self.state = self.FIRST
+                pos += 1
+            elif self.state == self.FIRST and char == "]":
+                self.state = self.DONE
+                pos += 1
+            elif self.state in (self.FIRST, self.ITEM):
+                if size - pos < self.retry_size and not final:
+                    break
+
+                try:
+                    item, end = self.scanner.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    # Invalid items are rejected right away, rather than buffered until the end of the document
+                    if final or not truncated(e):
+                        raise DecodeError(f"Error decoding JSON item {self.count}")
+
+                    # Presumably incomplete
+                    self.retry_size = 2 * (size - pos)
+                    break
+
+                # Numbers may be truncated at the end of the buffer
+                if not final and (end == size or type(item) in NUMBER_TYPES and buffer[end] not in DELIMITERS):
+                    break
+
+                items.append(item)
+                self.count += 1
+                self.retry_size = 0
+                self.state = self.SEPARATOR
+                pos = end
+            elif self.state == self.SEPARATOR and char in ",]":
+                self.state = self.ITEM if char == "," else self.DONE
+                pos += 1
+            elif self.state == self.DONE:
+                raise DecodeError("Invalid JSON array: trailing data")
+            else:
+                raise DecodeError(f"Invalid JSON array: unexpected character after item {self.count - 1}")
+
+        self.buffer = buffer[pos:]
+        return items
+
+    def close(self):
+        """Ends the document
+
+        :return: List of remaining decoded items
+        :raise DecodeError: Incomplete document
+        """
+
+        items = self.feed(b"", final=True)
+
+        if self.state != self.DONE:
+            raise DecodeError("Invalid JSON array: unexpected end of document")
+
+        return items
+
+
+class ItemStream:
+    """Async iterator of validated items, parsed incrementally from a request body containing
+    NDJSON or a top-level JSON array. The request body is read as items are consumed.
+
+    :param request: Starlette Request
+    :param loader: Item load function
+    :param codec: JsonCodec used for decoding NDJSON items
+    :param max_size: Max size of the request body in bytes
+    :param strict: Raise a ValidationError upon the first invalid item, rather than skipping it
+
+    :var count: Number of items parsed so far
+    :var errors: Validation errors of skipped items, by item index
+    """
+
+    def __init__(self, request, loader, codec, max_size, strict=True):
+        self.request = request
+        self.loader = loader
+        self.codec = codec
+        self.max_size = max_size
+        self.strict = strict
+        self.count = 0
+        self.errors = {}
+        self._items = self._iterate()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._items.__anext__()
+
+    def _parser(self):
+        content_type = self.request.headers.get("content-type", "")
+
+        if any(media_type in content_type for media_type in NDJSON_TYPES):
+            return NdjsonParser(self.codec)
+
+        return ArrayParser()
+
+    def _load(self, data):
+        index = self.count
+        self.count += 1
+
+        try:
+            return True, self.loader(data)
+        except ValidationError as e:
+            if self.strict:
+                raise ValidationError({index: e.messages}, valid_data=e.valid_data)
+
+            self.errors[index] = e.messages
+            return False, None
+
+    async def _iterate(self):
+        content_length = self.request.headers.get("content-length")
+
+        if content_length and content_length.isdigit() and int(content_length) > self.max_size:
+            raise PayloadTooLarge(self.max_size)
+
+        parser = self._parser()
+        received = 0
+
+        async for chunk in self.request.stream():
+            received += len(chunk)
+
+            if received > self.max_size:
+                raise PayloadTooLarge(self.max_size)
+
+            for item in parser.feed(chunk):
+                valid, value = self._load(item)
+
+                if valid:
+                    yield value
+
+        for item in parser.close():
+            valid, value = self._load(item)
+
+            if valid:
+                yield value
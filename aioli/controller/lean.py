@@ -0,0 +1,104 @@
+from starlette.datastructures import Address, Headers, QueryParams
+from starlette.requests import ClientDisconnect
+
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+
+
+def without_body(send):
+    """Wraps an ASGI send callable, sending empty bodies, e.g. in responses to HEAD requests
+
+    :param send: ASGI send callable
+    :return: ASGI send callable
+    """
+
+    async def _send(message):
+        if message["type"] == "http.response.body":
+            message = {"type": "http.response.body", "body": b"", "more_body": message.get("more_body", False)}
+
+        await send(message)
+
+    return _send
+
+
+class LeanRequest:
+    """Minimal stand-in for the Starlette Request, used by lean route handlers.
+
+    Only the parts of the request declared with @takes are parsed, upon access.
+
+    :param scope: ASGI scope
+    :param receive: ASGI receive callable
+    """
+
+    __slots__ = ("scope", "_receive")
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self._receive = receive
+
+    @property
+    def method(self):
+        return self.scope["method"]
+
+    @property
+    def headers(self):
+        return Headers(scope=self.scope)
+
+    @property
+    def path_params(self):
+        return self.scope.get("path_params", {})
+
+    @property
+    def query_params(self):
+        return QueryParams(self.scope["query_string"])
+
+    @property
+    def client(self):
+        host_port = self.scope.get("client")
+        return Address(*host_port) if host_port else None
+
+    async def stream(self):
+        while True:
+            message = await self._receive()
+
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnect()
+
+            chunk = message.get("body", b"")
+
+            if chunk:
+                yield chunk
+
+            if not message.get("more_body", False):
+                return
+
+    async def body(self):
+        return b"".join([chunk async for chunk in self.stream()])
+
+
+class RawResponse:
+    """Encoded response, written to the ASGI `send` callable along with pre-encoded headers
+
+    :param body: Encoded body
+    :param status_code: Response status
+    :param raw_headers: List of encoded (<name>, <value>) header tuples
+    """
+
+    __slots__ = ("body", "status_code", "raw_headers")
+
+    def __init__(self, body, status_code, raw_headers=JSON_HEADERS):
+        self.body = body
+        self.status_code = status_code
+        self.raw_headers = raw_headers
+
+    @property
+    def headers(self):
+        return Headers(raw=self.raw_headers)
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers + [(b"content-length", str(len(self.body)).encode("latin-1"))],
+        })
+        await send({"type": "http.response.body", "body": self.body})
@@ -0,0 +1,537 @@
+import inspect
+import traceback
+
+from contextvars import copy_context
+from operator import attrgetter
+from time import monotonic, perf_counter
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from aioli.admission import CRITICAL, NORMAL, Limiter, Overloaded
+from aioli.exceptions import DecodeError
+from aioli.metrics import status_of
+from aioli.timing import span
+from aioli.utils import jsonify
+
+from .codegen import compile_dumper, compile_loader
+from .ingest import NDJSON_TYPES, ItemStream
+from .lean import JSON_HEADERS, LeanRequest, RawResponse, without_body
+
+
+class CallPlan:
+    """Flat invocation plan for a route handler, compiled once upon route registration.
+
+    Schema instances, request prop getters and response settings are resolved here,
+    leaving the per-request path with a single wrapper around the handler function.
+
+    Plans of lean route handlers are ASGI applications, called without creating a Starlette
+    Request or Response.
+
+    :param ctrl: Controller instance
+    :param handler: Handler populated by the @route, @takes and @returns decorators
+    :param route_path: Full path the handler is registered with
+    """
+
+    def __init__(self, ctrl, handler, route_path):
+        schemas = handler.schemas
+
+        self.handler = handler
+        self.app = ctrl.app
+        self.route_path = route_path
+        self.func = getattr(ctrl, handler.name)
+        self.is_asyncgen = inspect.isasyncgenfunction(self.func)
+        self.lean = handler.lean
+        self.inject_request = handler.inject_request and not handler.lean
+        self.props = [(prop.name, attrgetter(prop.value)) for prop in handler.props]
+
+        self.header = self._loader(schemas.header, handler.takes_compiled)
+        self.path = self._loader(schemas.path, handler.takes_compiled)
+        self.body = self._loader(schemas.body, handler.takes_compiled)
+        self.query = self._loader(schemas.query, handler.takes_compiled)
+        self.items = self._loader(schemas.stream, handler.takes_compiled)
+        self.items_strict = handler.takes_strict
+        self.executor = ctrl.app.executor
+        self.takes_offload = handler.takes_offload
+        self.returns_offload = handler.returns_offload
+        self.dumped_size = 0
+        self.max_stream_size = ctrl.app.config["max_stream_size"]
+
+        self.returns = handler.returns
+        self.response = schemas.response(many=handler.many) if schemas.response else None
+        self.status = handler.status
+        self.streams = handler.returns and handler.many
+        self.batch_size = handler.batch_size
+        self.indent = 4 if ctrl.app.config["pretty_json"] else 0
+        self.codec = ctrl.app.codec
+        self.raw_headers = list(JSON_HEADERS)
+        self.cors_origins = None
+
+        # Lean handlers with static paths bypass the CORS middleware
+        if "*" in ctrl.app.config["allow_origins"]:
+            self.raw_headers.append((b"access-control-allow-origin", b"*"))
+        elif self.lean and "{" not in route_path:
+            self.cors_origins = frozenset(origin.encode("latin-1") for origin in ctrl.app.config["allow_origins"])
+
+        self.cache = ctrl.app.cache
+        self.cache_ttl = handler.cache_ttl
+        self.cache_key = handler.cache_key
+        self.cache_vary = handler.cache_vary
+        self.cache_excluded = {"body", "header", "stream"} | {name for name, _ in self.props}
+
+        metrics = ctrl.app.metrics
+        self.metrics = metrics.handler(self.route_path, handler.method) if metrics else None
+        self.access_log = ctrl.app.access_log
+        self.timing = ctrl.app.timing
+        self.route_name = f"{type(ctrl).__name__}.{handler.name}"
+
+        self.priority = handler.priority or ctrl.config.get("priority") or NORMAL
+        self.limiters = self._limiters(ctrl, handler)
+
+        if not self.response:
+            self.dumper = None
+        elif handler.returns_compiled:
+            self.dumper = compile_dumper(self.response)
+        else:
+            self.dumper = self.response.dump
+
+    def _limiters(self, ctrl, handler):
+        app = ctrl.app
+
+        if self.priority == CRITICAL:
+            return ()
+
+        limit = handler.limit or ctrl.config.get("handler_limit")
+        limiters = []
+
+        # Handler limits come first, sparing the global limit from requests bound to wait anyway
+        if limit:
+            limiter = Limiter(
+                f"{self.route_path} [{handler.method}]",
+                limit,
+                app.config["admission_queue_size"],
+                app.config["admission_queue_timeout"],
+            )
+
+            if app.metrics:
+                app.metrics.limiters[limiter.name] = limiter
+
+            limiters.append(limiter)
+
+        if app.admission:
+            limiters.append(app.admission)
+
+        return tuple(limiters)
+
+    @staticmethod
+    def _loader(schema_cls, compiled):
+        if not schema_cls:
+            return None
+
+        schema = schema_cls()
+        return compile_loader(schema) if compiled else schema.load
+
+    async def load(self, request):
+        """Validates and transforms the parts of a request declared with @takes
+
+        :param request: Starlette Request
+        :return: Handler keyword arguments
+        """
+
+        kwargs = {}
+
+        for name, getter in self.props:
+            kwargs[name] = getter(request)
+
+        if self.header:
+            kwargs["header"] = self.header(request.headers)
+
+        if self.path:
+            kwargs.update(self.path(request.path_params))
+
+        if self.body:
+            data = await request.body()
+
+            if self.executor.should_offload(self.takes_offload, len(data)):
+                # Run in a copy of the request context, for its spans to be recorded from the pool thread
+                kwargs["body"] = await self.executor.run(copy_context().run, self.load_body, data)
+            else:
+                kwargs["body"] = self.load_body(data)
+
+        if self.query:
+            kwargs["query"] = self.query(request.query_params)
+
+        if self.items:
+            kwargs["stream"] = ItemStream(request, self.items, self.codec, self.max_stream_size, self.items_strict)
+
+        return kwargs
+
+    def load_body(self, data):
+        """Decodes and validates a request body
+
+        :param data: Encoded request body
+        :return: Validated body
+        """
+
+        with span("decode"):
+            try:
+                decoded = self.codec.loads(data)
+            except self.codec.decode_errors:
+                raise DecodeError
+
+        with span("validate"):
+            return self.body(decoded)
+
+    def dump(self, rv):
+        """Serializes the handler's return value according to @returns
+
+        :param rv: Handler return value
+        :return: Response
+        """
+
+        if not self.returns:
+            return rv
+
+        if self.lean:
+            content = self.dumper(rv) if self.dumper else rv
+            return RawResponse(self.codec.dumpb(content, indent=self.indent), self.status, self.raw_headers)
+
+        if not self.response:
+            return jsonify(rv, self.status, indent=self.indent, codec=self.codec)
+
+        return Response(
+            content=self.codec.dumpb(self.dumper(rv), indent=self.indent),
+            status_code=self.status,
+            headers={"content-type": "application/json"},
+        )
+
+    async def _batches(self, items):
+        batch = []
+
+        async for item in items:
+            batch.append(item)
+
+            if len(batch) >= self.batch_size:
+                yield self.dumper(batch) if self.dumper else batch
+                batch = []
+
+        if batch:
+            yield self.dumper(batch) if self.dumper else batch
+
+    async def _stream_array(self, items):
+        dumpb = self.codec.dumpb
+        prefix = b"["
+
+        async for batch in self._batches(items):
+            # Strip the enclosing brackets of each encoded batch
+            yield prefix + dumpb(batch, indent=self.indent)[1:-1]
+            prefix = b","
+
+        yield b"[]" if prefix == b"[" else b"]"
+
+    async def _stream_ndjson(self, items):
+        dumpb = self.codec.dumpb
+
+        async for batch in self._batches(items):
+            yield b"".join([dumpb(item) + b"\n" for item in batch])
+
+    def stream(self, items, request):
+        """Streams an async iterator returned by a @returns(many=True) handler, serializing
+        items in batches. Sends NDJSON if requested by the client, or a JSON array otherwise.
+
+        :param items: Async iterator
+        :param request: Starlette Request
+        :return: StreamingResponse
+        """
+
+        accept = request.headers.get("accept", "")
+
+        if any(media_type in accept for media_type in NDJSON_TYPES):
+            return StreamingResponse(
+                self._stream_ndjson(items), status_code=self.status, media_type=NDJSON_TYPES[0]
+            )
+
+        return StreamingResponse(
+            self._stream_array(items), status_code=self.status, media_type="application/json"
+        )
+
+    def make_cache_key(self, request, kwargs):
+        """Creates a ResponseCache key for the given request
+
+        :param request: Starlette Request
+        :param kwargs: Validated handler arguments
+        :return: Cache key
+        """
+
+        params = sorted((name, value) for name, value in kwargs.items() if name not in self.cache_excluded)
+        headers = request.headers
+
+        return (
+            self.route_path,
+            request.method,
+            repr(params),
+            tuple(headers.get(name) for name in self.cache_vary),
+            self.cache_key(request) if self.cache_key else None,
+        )
+
+    async def cached(self, request, kwargs):
+        """Responds from the ResponseCache, calling the handler and caching its response upon miss
+
+        :param request: Starlette Request
+        :param kwargs: Validated handler arguments
+        :return: Response
+        """
+
+        key = self.make_cache_key(request, kwargs)
+        entry = self.cache.get(key)
+
+        if entry is None:
+            response = await self.call(request, kwargs)
+
+            # Only complete, successful responses are cached
+            if not 200 <= response.status_code < 300 or not hasattr(response, "body"):
+                return response
+
+            entry = self.cache.set(
+                key, response.body, response.status_code, response.headers.get("content-type"), self.cache_ttl
+            )
+
+        return entry.respond(request)
+
+    async def __call__(self, scope, receive, send):
+        """Lean ASGI entry point
+
+        :param scope: ASGI scope
+        :param receive: ASGI receive callable
+        :param send: ASGI send callable
+        """
+
+        try:
+            response = await self.endpoint(LeanRequest(scope, receive))
+        except Exception as e:
+            response = await self.handle_error(scope, receive, e)
+
+        if self.cors_origins is not None:
+            self.add_cors_headers(scope, response)
+
+        if scope["method"] == "HEAD":
+            # Headers, including content-length, are those of the GET response
+            send = without_body(send)
+
+        await response(scope, receive, send)
+
+    def add_cors_headers(self, scope, response):
+        """Adds the CORS headers of the middleware to a lean response, echoing the request origin if allowed
+
+        :param scope: ASGI scope
+        :param response: RawResponse or Response
+        """
+
+        origin = next((value for name, value in scope["headers"] if name == b"origin"), None)
+        headers = [(b"vary", b"Origin")]
+
+        if origin in self.cors_origins:
+            headers.append((b"access-control-allow-origin", origin))
+
+        # Raw headers of RawResponses are shared by responses of the handler
+        response.raw_headers = response.raw_headers + headers
+
+    async def handle_error(self, scope, receive, exc):
+        """Creates an error Response using the Application's exception handlers
+
+        :param scope: ASGI scope
+        :param receive: ASGI receive callable
+        :param exc: Exception raised while processing the request
+        :return: Response
+        """
+
+        handlers = self.app.exception_handlers
+        handler = next((handlers[cls] for cls in type(exc).__mro__ if cls in handlers), None)
+
+        if handler is None:
+            raise exc
+
+        response = await handler(Request(scope, receive), exc)
+
+        # Shed requests are expected under load, logging each of them would add to it
+        if response.status_code >= 500 and not isinstance(exc, Overloaded):
+            self.app.log.error(traceback.format_exc())
+
+        return response
+
+    async def endpoint(self, request):
+        timing = self.timing
+        timeline = timing.start(request.scope) if timing else None
+
+        if timeline is None:
+            return await self.measure(request)
+
+        response = None
+
+        try:
+            response = await self.measure(request)
+        finally:
+            server_timing = timing.finish(timeline)
+
+        if server_timing is not None:
+            if isinstance(response, RawResponse):
+                # Raw headers are shared by responses of the handler
+                response.raw_headers = response.raw_headers + [(b"server-timing", server_timing.encode("latin-1"))]
+            else:
+                response.headers["server-timing"] = server_timing
+
+        return response
+
+    async def measure(self, request):
+        metrics = self.metrics
+
+        if metrics is None and self.access_log is None:
+            return await self.admit(request)
+
+        if metrics is not None:
+            metrics.inflight += 1
+
+        started = perf_counter()
+
+        try:
+            response = await self.admit(request)
+        except Exception as e:
+            self.record(request, status_of(e), perf_counter() - started)
+            raise
+        finally:
+            if metrics is not None:
+                metrics.inflight -= 1
+
+        self.record(request, response.status_code, perf_counter() - started)
+        return response
+
+    def record(self, request, status, duration):
+        """Records a processed request in metrics and the access log
+
+        :param request: Starlette Request
+        :param status: Response status
+        :param duration: Processing time in seconds
+        """
+
+        if self.metrics is not None:
+            self.metrics.record(status, duration)
+
+        if self.access_log is not None:
+            self.access_log.record(request.scope, self.route_name, status, duration)
+
+    async def admit(self, request):
+        """Processes the request once admitted by the handler's and Application's concurrency limits
+
+        :param request: Starlette Request
+        :return: Response
+        :raise Overloaded: Request not admitted within the `admission_queue_timeout` setting
+        """
+
+        if not self.limiters:
+            return await self.process(request)
+
+        deadline = monotonic() + self.app.config["admission_queue_timeout"]
+        acquired = []
+
+        try:
+            for limiter in self.limiters:
+                await limiter.acquire(self.priority, deadline)
+                acquired.append(limiter)
+
+            return await self.process(request)
+        finally:
+            for limiter in acquired:
+                limiter.release()
+
+    async def process(self, request):
+        """Validates the request, then responds from the ResponseCache or by calling the handler
+
+        :param request: Starlette Request
+        :return: Response
+        """
+
+        with span("takes"):
+            if self.metrics is None:
+                kwargs = await self.load(request)
+            else:
+                started = perf_counter()
+
+                try:
+                    kwargs = await self.load(request)
+                finally:
+                    self.metrics.takes.observe(perf_counter() - started)
+
+        if self.cache_ttl is not None:
+            return await self.cached(request, kwargs)
+
+        return await self.call(request, kwargs)
+
+    async def invoke(self, request, kwargs):
+        """Calls the handler
+
+        :param request: Starlette Request
+        :param kwargs: Validated handler arguments
+        :return: Handler return value
+        """
+
+        if self.inject_request:
+            rv = self.func(request, **kwargs)
+        else:
+            rv = self.func(**kwargs)
+
+        # Async generator functions return their iterator directly
+        if not self.is_asyncgen:
+            rv = await rv
+
+        return rv
+
+    async def respond(self, rv, request):
+        """Creates a Response from the handler's return value
+
+        :param rv: Handler return value
+        :param request: Starlette Request
+        :return: Response
+        """
+
+        if self.streams and hasattr(rv, "__aiter__"):
+            return self.stream(rv, request)
+
+        # The size of a response is unknown until serialized, go by the handler's previous response
+        if self.executor.should_offload(self.returns_offload, self.dumped_size):
+            response = await self.executor.run(self.dump, rv)
+        else:
+            response = self.dump(rv)
+
+        if self.returns_offload is None and self.returns:
+            self.dumped_size = len(response.body)
+
+        return response
+
+    async def call(self, request, kwargs):
+        """Calls the handler and creates a Response from its return value
+
+        :param request: Starlette Request
+        :param kwargs: Validated handler arguments
+        :return: Response
+        """
+
+        if self.metrics is None and self.timing is None:
+            return await self.respond(await self.invoke(request, kwargs), request)
+
+        started = perf_counter()
+
+        with span("handler"):
+            rv = await self.invoke(request, kwargs)
+
+        called = perf_counter()
+
+        with span("returns"):
+            response = await self.respond(rv, request)
+
+        if self.metrics is None:
+            return response
+
+        self.metrics.handler.observe(called - started)
+        self.metrics.returns.observe(perf_counter() - called)
+
+        return response
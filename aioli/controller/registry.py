@@ -1,14 +1,116 @@
-handlers = {}
+from collections import namedtuple
+from types import MappingProxyType
+
+
+# Function attribute holding the Handler of a decorated route handler
+HANDLER_ATTR = "__aioli_handler__"
 
 
 class HandlerMeta(type):
     def __call__(cls, func):
-        fid = hash(func.__module__ + func.__name__)
+        handler = getattr(func, HANDLER_ATTR, None)
+
+        if handler is None:
+            handler = super(HandlerMeta, cls).__call__(func)
+            setattr(func, HANDLER_ATTR, handler)
+
+        return handler
+
+
+def collect_handlers(ctrl_cls):
+    """Collects route handlers from the namespace of a Controller class and its bases
+
+    :param ctrl_cls: Controller class
+    :return: Tuple of Handlers, in definition order
+    """
+
+    found = {}
+
+    # Walk the MRO in reverse, letting subclasses override handlers of their bases
+    for klass in reversed(ctrl_cls.__mro__):
+        for name, member in vars(klass).items():
+            handler = getattr(member, HANDLER_ATTR, None)
+
+            if handler is not None and handler.method:
+                found[name] = handler
+            elif name in found:
+                del found[name]
+
+    return tuple(found.values())
+
+
+class RouteEntry(namedtuple("RouteEntry", ["path", "method", "name", "handler", "plan", "controller", "package"])):
+    """Registered route
+
+    :var path: Full route path
+    :var method: HTTP method
+    :var name: Route name: <Controller class>.<handler name>
+    :var handler: Handler, shared by Controllers inheriting the route handler
+    :var plan: CallPlan of this route
+    :var controller: Controller instance
+    :var package: Package name
+    """
+
+    __slots__ = ()
+
+
+class RouteTable:
+    """Immutable table of routes registered by Controllers, indexed by path and method,
+    Package and Controller class.
+
+    :param entries: Iterable of RouteEntry
+    """
 
-        if fid not in handlers:
-            handlers[fid] = super(HandlerMeta, cls).__call__(func)
+    def __init__(self, entries=()):
+        self._entries = tuple(entries)
+        self._by_route = MappingProxyType({(entry.path, entry.method): entry for entry in self._entries})
+
+        by_package = {}
+        by_controller = {}
+
+        for entry in self._entries:
+            by_package.setdefault(entry.package, []).append(entry)
+            by_controller.setdefault(type(entry.controller), []).append(entry)
+
+        self._by_package = MappingProxyType({key: tuple(value) for key, value in by_package.items()})
+        self._by_controller = MappingProxyType({key: tuple(value) for key, value in by_controller.items()})
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"<RouteTable: {len(self)} routes>"
+
+    def get(self, path, method):
+        """Returns the route registered with the given path and method
+
+        :param path: Full route path
+        :param method: HTTP method
+        :return: RouteEntry or None
+        """
+
+        return self._by_route.get((path, method))
+
+    def for_package(self, name):
+        """Returns routes registered by the given Package
+
+        :param name: Package name
+        :return: Tuple of RouteEntry
+        """
+
+        return self._by_package.get(name, ())
+
+    def for_controller(self, ctrl_cls):
+        """Returns routes registered by the given Controller class
+
+        :param ctrl_cls: Controller class
+        :return: Tuple of RouteEntry
+        """
 
-        return handlers[fid]
+        return self._by_controller.get(ctrl_cls, ())
 
 
 class HandlerSchema:
@@ -17,6 +119,7 @@ class HandlerSchema:
         self.path = None
         self.header = None
         self.query = None
+        self.stream = None
         self.response = None
 
     def __iter__(self):
@@ -33,10 +136,24 @@ class Handler(metaclass=HandlerMeta):
 
     name = None
     path = None
-    path_full = None
     status = None
     method = None
     description = None
+    many = False
+    batch_size = None
+    takes_compiled = False
+    takes_strict = True
+    takes_offload = None
+    returns_compiled = False
+    returns_offload = None
+    returns = False
+    inject_request = True
+    lean = False
+    limit = None
+    priority = None
+    cache_ttl = None
+    cache_key = None
+    cache_vary = ()
     _schemas = None
 
     @property
@@ -49,18 +166,21 @@ class Handler(metaclass=HandlerMeta):
     def __init__(self, func):
         self.func = func
         self.name = func.__name__
+        self.props = []
 
     def __dict__(self):
         return self.__class__.__dict__
 
-    def register_route(self, path, method, description):
+    def register_route(self, path, method, description, lean=False):
         """Adds new route to the stack
 
         :param path: Route path
         :param method: Route method
         :param description: Endpoint description
+        :param lean: Dispatch directly from the ASGI scope
         """
 
         self.path = path
         self.method = method
         self.description = description
+        self.lean = lean
@@ -1,18 +1,34 @@
-import ujson
 import marshmallow
 
 from marshmallow import validate
 from marshmallow import *
 
+from aioli.codec import get_codec
+
 
 class JsonSerializer:
-    @staticmethod
-    def loads(data, **kwargs):
-        return ujson.loads(data, **kwargs)
+    """Render module of Schemas, used by `Schema.loads` and `Schema.dumps`, delegating to the JSON codec
+    of the Application. Keyword arguments other than `indent` are ignored.
+
+    :var codec: JsonCodec, set upon creating the Application, ujson until then
+    """
+
+    codec = None
+
+    @classmethod
+    def get_codec(cls):
+        if cls.codec is None:
+            cls.codec = get_codec("ujson")
+
+        return cls.codec
+
+    @classmethod
+    def loads(cls, data, **kwargs):
+        return cls.get_codec().loads(data)
 
-    @staticmethod
-    def dumps(data, **kwargs):
-        return ujson.dumps(data, **kwargs)
+    @classmethod
+    def dumps(cls, data, indent=0, **kwargs):
+        return cls.get_codec().dumps(data, indent=indent or 0)
 
 
 class SchemaOpts(marshmallow.schema.SchemaOpts):
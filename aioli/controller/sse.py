@@ -0,0 +1,188 @@
+import asyncio
+import os
+
+from collections import deque
+
+
+HEADERS = [
+    (b"content-type", b"text/event-stream"),
+    (b"cache-control", b"no-cache"),
+    # Disables response buffering by nginx
+    (b"x-accel-buffering", b"no"),
+]
+
+HEARTBEAT = b":\n\n"
+
+
+def encode_event(data, codec, event_id=None, event=None):
+    """Encodes an event into an SSE frame
+
+    :param data: Event data, str as-is, other objects JSON encoded
+    :param codec: JsonCodec
+    :param event_id: Event ID
+    :param event: Event type
+    :return: Bytes
+    """
+
+    if not isinstance(data, str):
+        data = codec.dumps(data)
+
+    lines = []
+
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+
+    if event is not None:
+        lines.append(f"event: {event}")
+
+    lines += [f"data: {line}" for line in data.split("\n")]
+
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+class SseClient:
+    """Connected client, with a bounded queue of frames written by the client's request
+
+    :param queue_size: Max number of queued frames, the client is closed if exceeded
+    """
+
+    __slots__ = ("queue", "queue_size", "waiter", "closed", "active")
+
+    def __init__(self, queue_size):
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.waiter = None
+        self.closed = False
+        self.active = False
+
+    def push(self, frame):
+        """Queues a frame, closing the client if its queue is full
+
+        :param frame: Encoded frame
+        :return: True if queued
+        """
+
+        if self.closed:
+            return False
+
+        if len(self.queue) >= self.queue_size:
+            # Slow client: it may reconnect, resuming from its Last-Event-ID
+            self.close()
+            return False
+
+        self.queue.append(frame)
+        self.active = True
+        self._wake()
+
+        return True
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        self._wake()
+
+    def _wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+
+class SseStream:
+    """Named stream of events, keeping the latest events in a ring buffer for resumption.
+
+    Event IDs are made of a per-stream epoch and a sequence number, letting clients resuming
+    with an ID from another process, or an earlier instance of the stream, receive the whole buffer.
+
+    :param name: Stream name
+    :param codec: JsonCodec used for encoding event data
+    :param buffer_size: Number of events kept for resumption
+
+    :var clients: Connected SseClients
+    :var last_id: Sequence number of the latest event
+    """
+
+    def __init__(self, name, codec, buffer_size):
+        self.name = name
+        self.codec = codec
+        self.epoch = os.urandom(4).hex()
+        self.buffer = deque(maxlen=buffer_size)
+        self.clients = set()
+        self.last_id = 0
+
+    def publish(self, data, event=None):
+        """Encodes an event once, and queues it for all clients
+
+        :param data: Event data, str as-is, other objects JSON encoded
+        :param event: Event type
+        :return: Number of clients the event was queued for
+        """
+
+        self.last_id += 1
+        frame = encode_event(data, self.codec, f"{self.epoch}-{self.last_id}", event)
+        self.buffer.append((self.last_id, frame))
+
+        return sum(client.push(frame) for client in list(self.clients))
+
+    def replay(self, last_event_id):
+        """Returns buffered frames following an event
+
+        :param last_event_id: Last-Event-ID sent by the client, or None
+        :return: List of frames
+        """
+
+        if not last_event_id or not self.buffer:
+            return []
+
+        epoch, _, number = last_event_id.partition("-")
+
+        if epoch != self.epoch or not number.isdigit():
+            return [frame for _, frame in self.buffer]
+
+        # Sequence numbers in the buffer are contiguous
+        start = max(int(number) - self.buffer[0][0] + 1, 0)
+
+        return [frame for _, frame in list(self.buffer)[start:]]
+
+
+class SseResponse:
+    """ASGI response streaming events of an SseStream to a client, until either side disconnects
+
+    :param stream: SseStream
+    :param client: SseClient, attached to the stream
+    :param frames: Initial frames
+    """
+
+    def __init__(self, stream, client, frames):
+        self.stream = stream
+        self.client = client
+        self.frames = frames
+
+    @staticmethod
+    async def _disconnected(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def __call__(self, scope, receive, send):
+        client = self.client
+        disconnected = asyncio.ensure_future(self._disconnected(receive))
+
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": HEADERS})
+            await send({"type": "http.response.body", "body": b"".join(self.frames), "more_body": True})
+
+            while True:
+                if not client.queue and not client.closed:
+                    client.waiter = asyncio.get_event_loop().create_future()
+                    await asyncio.wait([client.waiter, disconnected], return_when=asyncio.FIRST_COMPLETED)
+
+                if client.closed or disconnected.done():
+                    break
+
+                body = b"".join(client.queue)
+                client.queue.clear()
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+
+            if not disconnected.done():
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            disconnected.cancel()
+            self.stream.clients.discard(client)
@@ -18,6 +18,11 @@ class InvalidChannelError(HTTPException):
         )
 
 
+class DecodeError(HTTPException):
+    def __init__(self, message="Error decoding JSON"):
+        super(DecodeError, self).__init__(status_code=400, detail=message)
+
+
 class DatabaseError(HTTPException):
     def __init__(self):
         super(DatabaseError, self).__init__(status_code=500, detail="Database error")
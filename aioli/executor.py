@@ -0,0 +1,105 @@
+import asyncio
+import importlib
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+
+def call_qualified(module, qualname, *args, **kwargs):
+    """Resolves a function by its module and qualified name, then calls it. Used for calling
+    functions in the process pool, where decorated functions cannot be pickled by reference.
+
+    :param module: Module name
+    :param qualname: Qualified name, e.g. <class>.<method>
+    :param args: Positional arguments
+    :param kwargs: Keyword arguments
+    :return: Function return value
+    """
+
+    obj = importlib.import_module(module)
+
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+
+    # Unwrap @offload
+    func = getattr(obj, "func", obj)
+
+    return func(*args, **kwargs)
+
+
+class Executor:
+    """Thread and process pools owned by the Application, used for moving CPU-heavy work off the event loop.
+
+    Pools are created upon first use, i.e. in worker processes rather than before forking, and shut
+    down along with the Application.
+
+    :param threads: Max number of threads, defaults to the number of CPUs + 4 (max 32)
+    :param processes: Max number of processes, defaults to the number of CPUs
+    :param offload_size: Payload size in bytes from which route handlers offload validation and
+        serialization automatically, 0 disables automatic offloading
+    """
+
+    def __init__(self, threads=None, processes=None, offload_size=0):
+        self.threads = threads
+        self.processes = processes
+        self.offload_size = offload_size
+        self._thread_pool = None
+        self._process_pool = None
+
+    @property
+    def thread_pool(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="aioli")
+
+        return self._thread_pool
+
+    @property
+    def process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+
+        return self._process_pool
+
+    def should_offload(self, option, size):
+        """Tells whether work on a payload should be offloaded
+
+        :param option: True or False to force a decision, None for deciding by size
+        :param size: Payload size in bytes
+        :return: True if the work should be offloaded
+        """
+
+        if option is None:
+            return bool(self.offload_size) and size >= self.offload_size
+
+        return option
+
+    async def run(self, func, *args, process=False, **kwargs):
+        """Calls a synchronous function in the thread pool, or process pool
+
+        :param func: Function, must be picklable if `process` is set
+        :param args: Positional arguments
+        :param process: Use the process pool
+        :param kwargs: Keyword arguments
+        :return: Function return value
+        """
+
+        pool = self.process_pool if process else self.thread_pool
+
+        if kwargs:
+            func = partial(func, *args, **kwargs)
+            args = ()
+
+        return await asyncio.get_event_loop().run_in_executor(pool, func, *args)
+
+    def shutdown(self, wait=True):
+        """Shuts down the pools, which are recreated if used again
+
+        :param wait: Wait for pending work to complete
+        """
+
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+        self._thread_pool = None
+        self._process_pool = None
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import re
+
+from collections import deque
+
+from starlette import status
+
+from .exceptions import InvalidChannelError
+
+
+CHANNEL_REGEX = re.compile(r"^[\w.:-]{1,128}$")
+
+# Slow consumer policies: what happens when publishing to a Subscriber whose queue is full
+DROP, COALESCE, DISCONNECT = POLICIES = ("drop", "coalesce", "disconnect")
+
+
+def validate_channel(channel):
+    """Validates a channel name: 1-128 alphanumeric, underscore, dot, colon or dash characters
+
+    :param channel: Channel name
+    :return: Channel name
+    :raise InvalidChannelError: Invalid channel name
+    """
+
+    if not isinstance(channel, str) or not CHANNEL_REGEX.match(channel):
+        raise InvalidChannelError
+
+    return channel
+
+
+class Subscriber:
+    """WebSocket connection registered with the Hub, with a bounded queue of messages written by its own task.
+
+    When the queue is full, the `policy` decides what happens to a new message: with *drop*, the oldest
+    queued message is dropped; with *coalesce*, the queued message of the same channel is replaced, or the
+    oldest dropped; with *disconnect*, the connection is closed with code 1013 (Try Again Later).
+
+    :param hub: Hub
+    :param websocket: Starlette WebSocket
+    :param queue_size: Max number of queued messages
+    :param policy: Slow consumer policy: drop, coalesce or disconnect
+
+    :var channels: Subscribed channels
+    :var dropped: Number of messages dropped or replaced
+    """
+
+    def __init__(self, hub, websocket, queue_size, policy):
+        if policy not in POLICIES:
+            raise Exception(f"Invalid slow consumer policy: {policy}, expected one of: {', '.join(POLICIES)}")
+
+        self.hub = hub
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.policy = policy
+        self.channels = set()
+        self.dropped = 0
+        self.closed = False
+        self._queue = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.ensure_future(self._write())
+
+    def __len__(self):
+        return len(self._queue)
+
+    def push(self, channel, message):
+        """Queues a message, applying the slow consumer policy if the queue is full
+
+        :param channel: Channel name
+        :param message: ASGI websocket.send message
+        :return: True if queued
+        """
+
+        if self.closed:
+            return False
+
+        queue = self._queue
+
+        if len(queue) >= self.queue_size:
+            if self.policy == DISCONNECT:
+                self.hub.log.warning(f"Disconnecting slow consumer {self.websocket.client}")
+                self.hub.disconnect(self.websocket, status.WS_1013_TRY_AGAIN_LATER)
+                return False
+
+            self.dropped += 1
+            self.hub.dropped += 1
+
+            if self.policy == COALESCE:
+                stale = next((item for item in queue if item[0] == channel), None)
+
+                if stale is not None:
+                    queue.remove(stale)
+                else:
+                    queue.popleft()
+            else:
+                queue.popleft()
+
+        queue.append((channel, message))
+        self._ready.set()
+
+        return True
+
+    async def _write(self):
+        queue = self._queue
+        send = self.websocket.send
+
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+
+                while queue:
+                    _, message = queue.popleft()
+                    await send(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Connection gone
+            self.hub.log.debug(f"Error writing to {self.websocket.client}: {e}")
+            self.hub.disconnect(self.websocket)
+
+    def close(self, code=None):
+        """Stops writing, and closes the connection if `code` is given
+
+        :param code: WebSocket close code
+        :return: Task completing once the writer task is done and the connection closed, or None if already closed
+        """
+
+        if self.closed:
+            return None
+
+        self.closed = True
+        self._queue.clear()
+
+        self._writer.cancel()
+
+        return asyncio.ensure_future(self._close(code))
+
+    async def _close(self, code):
+        if code is not None:
+            try:
+                await self.websocket.close(code)
+            except Exception as e:
+                self.hub.log.debug(f"Error closing {self.websocket.client}: {e}")
+
+        # Waits for the cancelled writer, unless closing from within it
+        if self._writer is not asyncio.current_task():
+            await asyncio.wait([self._writer])
+
+
+class Hub:
+    """Channel-based publish/subscribe hub for WebSocket connections.
+
+    Published payloads are encoded once, into a single message shared by all subscribers of the channel,
+    and queued for each of them without waiting: slow consumers never hold up publishers or other
+    subscribers.
+
+    :param codec: JsonCodec used for encoding payloads
+    :param queue_size: Default max number of queued messages per connection
+    :param policy: Default slow consumer policy: drop, coalesce or disconnect
+
+    :var channels: Subscribers by channel
+    :var subscribers: Subscribers by WebSocket id
+    :var closing: Close tasks of disconnected subscribers
+    :var published: Number of published messages
+    :var dropped: Number of messages dropped or replaced by slow consumer policies
+    """
+
+    log = logging.getLogger("aioli.hub")
+
+    def __init__(self, codec, queue_size=100, policy=DROP):
+        self.codec = codec
+        self.queue_size = queue_size
+        self.policy = policy
+        self.channels = {}
+        self.subscribers = {}
+        self.closing = set()
+        self.published = 0
+        self.dropped = 0
+
+    def connect(self, websocket, queue_size=None, policy=None):
+        """Registers an accepted WebSocket connection
+
+        :param websocket: Starlette WebSocket
+        :param queue_size: Max number of queued messages, defaults to the Hub's
+        :param policy: Slow consumer policy, defaults to the Hub's
+        :return: Subscriber
+        """
+
+        subscriber = self.subscribers.get(id(websocket))
+
+        if subscriber is None:
+            subscriber = self.subscribers[id(websocket)] = Subscriber(
+                self, websocket, queue_size or self.queue_size, policy or self.policy
+            )
+
+        return subscriber
+
+    def disconnect(self, websocket, code=None):
+        """Unregisters a WebSocket connection, unsubscribing it from all channels
+
+        :param websocket: Starlette WebSocket
+        :param code: Close the connection using this code, if given
+        :return: Task completing once the Subscriber is closed, or None if not registered
+        """
+
+        subscriber = self.subscribers.pop(id(websocket), None)
+
+        if subscriber is None:
+            return None
+
+        for channel in subscriber.channels:
+            subscribers = self.channels.get(channel)
+
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+
+                if not subscribers:
+                    del self.channels[channel]
+
+        return self._closing(subscriber.close(code))
+
+    def _closing(self, task):
+        if task is not None:
+            self.closing.add(task)
+            task.add_done_callback(self.closing.discard)
+
+        return task
+
+    def subscribe(self, websocket, channel):
+        """Subscribes a WebSocket connection to a channel, registering the connection if needed
+
+        :param websocket: Starlette WebSocket
+        :param channel: Channel name
+        :raise InvalidChannelError: Invalid channel name
+        """
+
+        validate_channel(channel)
+        subscriber = self.connect(websocket)
+        subscriber.channels.add(channel)
+        self.channels.setdefault(channel, set()).add(subscriber)
+
+    def unsubscribe(self, websocket, channel):
+        """Unsubscribes a WebSocket connection from a channel
+
+        :param websocket: Starlette WebSocket
+        :param channel: Channel name
+        """
+
+        subscriber = self.subscribers.get(id(websocket))
+        subscribers = self.channels.get(channel)
+
+        if subscriber is None or subscribers is None:
+            return
+
+        subscriber.channels.discard(channel)
+        subscribers.discard(subscriber)
+
+        if not subscribers:
+            del self.channels[channel]
+
+    def encode(self, payload):
+        """Creates the ASGI message sent to subscribers
+
+        :param payload: Bytes and str are sent as-is, in binary and text frames, other objects are JSON encoded
+        :return: ASGI websocket.send message
+        """
+
+        if isinstance(payload, bytes):
+            return {"type": "websocket.send", "bytes": payload}
+
+        if not isinstance(payload, str):
+            payload = self.codec.dumps(payload)
+
+        return {"type": "websocket.send", "text": payload}
+
+    def publish(self, channel, payload):
+        """Publishes a payload to the subscribers of a channel, without waiting for it to be sent
+
+        :param channel: Channel name
+        :param payload: Payload, encoded once for all subscribers
+        :return: Number of subscribers the message was queued for
+        :raise InvalidChannelError: Invalid channel name
+        """
+
+        validate_channel(channel)
+        subscribers = self.channels.get(channel)
+
+        if not subscribers:
+            return 0
+
+        message = self.encode(payload)
+        self.published += 1
+
+        # Copied, as the disconnect policy alters the set
+        return sum(subscriber.push(channel, message) for subscriber in list(subscribers))
+
+    async def close(self, code=status.WS_1001_GOING_AWAY):
+        """Disconnects all connections, waiting for their writer tasks to finish
+
+        :param code: WebSocket close code
+        """
+
+        for subscriber in self.subscribers.values():
+            self._closing(subscriber.close(code))
+
+        self.subscribers.clear()
+        self.channels.clear()
+
+        # Includes subscribers disconnected earlier, and still closing
+        await asyncio.gather(*self.closing, return_exceptions=True)
@@ -1,4 +1,145 @@
+import copy
+import logging
+import os
+import queue
+import random
 import sys
+import time
+
+from logging.handlers import QueueHandler, QueueListener
+from time import monotonic
+
+
+class QueueStreamHandler(QueueHandler):
+    """Writes records to a stream from a background thread, keeping the event loop from blocking on slow streams.
+
+    Records are queued without waiting, and dropped if `queue_size` records are pending. Formatting happens on
+    the background thread, which is started upon the first record, and again in processes forked since.
+
+    :param stream: Stream, defaults to stderr
+    :param queue_size: Max number of pending records
+
+    :var dropped: Number of records dropped due to a full queue
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super(QueueStreamHandler, self).__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream)
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Arguments may be mutated once queued, and tracebacks released: render both, leaving the rest to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        # Called with the handler lock held
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self.queue = queue.Queue(self.queue.maxsize)
+            self.listener = QueueListener(self.queue, self.target)
+            self.listener.start()
+
+        super(QueueStreamHandler, self).emit(record)
+
+    def close(self):
+        if self.listener is not None and self._pid == os.getpid():
+            # Writes pending records
+            self.listener.stop()
+            self.listener = None
+
+        self.target.close()
+        super(QueueStreamHandler, self).close()
+
+
+class AccessLog:
+    """Structured access log, writing a JSON object per line to the *aioli.access* logger.
+
+    Requests are sampled before anything is encoded, and lines are limited to `rate` per second, keeping logging
+    cheap under load. Server errors are always sampled, and the number of lines suppressed by the rate limit
+    is included in the next line written.
+
+    :param codec: JsonCodec used for encoding lines
+    :param sample: Fraction of requests logged, from 0 to 1
+    :param rate: Max number of lines per second, 0 for no limit
+
+    :var suppressed: Number of lines suppressed by the rate limit, since the last line written
+    """
+
+    log = logging.getLogger("aioli.access")
+
+    def __init__(self, codec, sample=1.0, rate=0):
+        self.codec = codec
+        self.sample = sample
+        self.rate = rate
+        self.suppressed = 0
+        self._window = None
+        self._count = 0
+
+    def _admit(self, status):
+        if status < 500 and self.sample < 1.0 and random.random() >= self.sample:
+            return False
+
+        if not self.rate:
+            return True
+
+        window = int(monotonic())
+
+        if window != self._window:
+            self._window = window
+            self._count = 0
+
+        if self._count >= self.rate:
+            self.suppressed += 1
+            return False
+
+        self._count += 1
+        return True
+
+    def record(self, scope, handler, status, duration):
+        """Logs a request, if sampled and within the rate limit
+
+        :param scope: ASGI scope
+        :param handler: Route name
+        :param status: Response status
+        :param duration: Processing time in seconds
+        """
+
+        if not self._admit(status) or not self.log.isEnabledFor(logging.INFO):
+            return
+
+        line = {
+            "time": round(time.time(), 3),
+            "method": scope["method"],
+            "path": scope["path"],
+            "handler": handler,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+        }
+
+        if self.suppressed:
+            line["suppressed"] = self.suppressed
+            self.suppressed = 0
+
+        self.log.info(self.codec.dumps(line))
 
 LOGGING_CONFIG_DEFAULTS = dict(
     version=1,
@@ -17,30 +158,40 @@ LOGGING_CONFIG_DEFAULTS = dict(
         },
         "aioli": {"level": "DEBUG", "handlers": ["pkg_console"], "propagate": False},
         "uvicorn": {"level": "DEBUG", "handlers": ["pkg_console"], "propagate": False},
+        "aioli.access": {"level": "INFO", "handlers": ["access_json"], "propagate": False},
     },
     handlers={
         "console": {
-            "class": "logging.StreamHandler",
+            "()": QueueStreamHandler,
             "formatter": "generic",
             "stream": sys.stdout,
         },
         "request_console": {
-            "class": "logging.StreamHandler",
+            "()": QueueStreamHandler,
             "formatter": "access",
             "stream": sys.stdout,
         },
         "access_console": {
-            "class": "logging.StreamHandler",
+            "()": QueueStreamHandler,
             "formatter": "access",
             "stream": sys.stdout,
         },
         "pkg_console": {
-            "class": "logging.StreamHandler",
+            "()": QueueStreamHandler,
             "formatter": "pkg",
             "stream": sys.stdout,
         },
+        "access_json": {
+            "()": QueueStreamHandler,
+            "formatter": "json_lines",
+            "stream": sys.stdout,
+        },
     },
     formatters={
+        "json_lines": {
+            "format": "%(message)s",
+            "class": "logging.Formatter",
+        },
         "pkg": {
             "format": "[%(levelname)1.1s %(asctime)s.%(msecs)03d %(name)s] %(message)s",
             "datefmt": "%Y-%m-%d %H:%M:%S",
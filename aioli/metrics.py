@@ -0,0 +1,285 @@
+from bisect import bisect_right
+
+from marshmallow.exceptions import ValidationError
+
+
+# Upper bounds in seconds, an implicit +Inf bucket is added to each Histogram
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+PHASES = ("takes", "handler", "returns")
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Histograms are flushed every 1024 requests
+FLUSH_INTERVAL = 1023
+
+
+def status_of(exc):
+    """Returns the response status of an exception raised while processing a request
+
+    :param exc: Exception
+    :return: HTTP status code
+    """
+
+    if isinstance(exc, ValidationError):
+        return 422
+
+    return getattr(exc, "status_code", 500)
+
+
+class Histogram:
+    """Fixed-bucket histogram
+
+    Observations are appended to a pending list, and assigned to buckets when reading
+    the histogram or when flushed by its owner, keeping the cost of `observe` to a list append.
+
+    :param bounds: Sorted bucket upper bounds
+
+    :var counts: Non-cumulative count for each bucket, the last one being +Inf
+    :var sum: Sum of observed values
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "pending", "observe")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.pending = []
+        self.observe = self.pending.append
+
+    def flush(self):
+        """Assigns pending observations to buckets"""
+
+        pending = self.pending
+
+        if not pending:
+            return
+
+        # Sorting once makes bucket counts a matter of bisecting at each bound
+        pending.sort()
+        previous = 0
+
+        for idx, bound in enumerate(self.bounds):
+            position = bisect_right(pending, bound)
+            self.counts[idx] += position - previous
+            previous = position
+
+        self.counts[-1] += len(pending) - previous
+        self.sum += sum(pending)
+        pending.clear()
+
+    @property
+    def count(self):
+        self.flush()
+        return sum(self.counts)
+
+    def cumulative(self):
+        """Yields (upper bound, cumulative count) pairs, in Prometheus fashion
+
+        :return: Generator of tuples
+        """
+
+        self.flush()
+        total = 0
+
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class HandlerMetrics:
+    """Metrics of a single route handler
+
+    Values are updated without locking: each worker process has its own registry,
+    and updates are never interrupted by other coroutines on the event loop.
+
+    :param path: Full handler path
+    :param method: HTTP method
+
+    :var requests: Number of completed requests
+    :var statuses: Number of responses per status class
+    :var inflight: Number of requests being processed
+    :var latency: Total request latency Histogram
+    :var takes: Request validation latency Histogram
+    :var handler: Handler function latency Histogram
+    :var returns: Response serialization latency Histogram
+    """
+
+    __slots__ = ("path", "method", "requests", "statuses", "inflight", "latency") + PHASES
+
+    def __init__(self, path, method):
+        self.path = path
+        self.method = method
+        self.requests = 0
+        self.statuses = [0] * len(STATUS_CLASSES)
+        self.inflight = 0
+        self.latency = Histogram()
+        self.takes = Histogram()
+        self.handler = Histogram()
+        self.returns = Histogram()
+
+    @property
+    def histograms(self):
+        return [self.latency, self.takes, self.handler, self.returns]
+
+    def record(self, status, latency):
+        """Records a completed request
+
+        :param status: Response status
+        :param latency: Request latency in seconds
+        """
+
+        self.requests += 1
+        self.statuses[status // 100 - 1] += 1
+        self.latency.observe(latency)
+
+        # Bounds the size of pending histogram observations
+        if not self.requests & FLUSH_INTERVAL:
+            for histogram in self.histograms:
+                histogram.flush()
+
+
+class Metrics:
+    """Process-wide registry of HandlerMetrics, keyed by handler path and method
+
+    :var pools: Resource pools reported along with handler metrics, by name
+    :var limiters: Admission Limiters reported along with handler metrics, by name
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.pools = {}
+        self.limiters = {}
+
+    def __iter__(self):
+        return iter(self.handlers.values())
+
+    def handler(self, path, method):
+        """Returns metrics for the given handler, creating them if needed
+
+        :param path: Full handler path
+        :param method: HTTP method
+        :return: HandlerMetrics
+        """
+
+        key = (path, method)
+
+        if key not in self.handlers:
+            self.handlers[key] = HandlerMetrics(path, method)
+
+        return self.handlers[key]
+
+    @staticmethod
+    def _histogram_lines(name, labels, histogram):
+        for bound, count in histogram.cumulative():
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f'{name}_bucket{{{labels},le="{le}"}} {count}'
+
+        yield f"{name}_sum{{{labels}}} {histogram.sum!r}"
+        yield f"{name}_count{{{labels}}} {histogram.count}"
+
+    def render(self):
+        """Renders all metrics using the Prometheus text exposition format
+
+        :return: str
+        """
+
+        lines = [
+            "# HELP aioli_requests_total Number of completed requests.",
+            "# TYPE aioli_requests_total counter",
+        ]
+
+        for item in self:
+            labels = f'path="{item.path}",method="{item.method}"'
+
+            for status_class, count in zip(STATUS_CLASSES, item.statuses):
+                if count:
+                    lines.append(f'aioli_requests_total{{{labels},status="{status_class}"}} {count}')
+
+        lines += [
+            "# HELP aioli_requests_inflight Number of requests being processed.",
+            "# TYPE aioli_requests_inflight gauge",
+        ]
+
+        for item in self:
+            lines.append(f'aioli_requests_inflight{{path="{item.path}",method="{item.method}"}} {item.inflight}')
+
+        lines += [
+            "# HELP aioli_request_duration_seconds Request latency.",
+            "# TYPE aioli_request_duration_seconds histogram",
+        ]
+
+        for item in self:
+            labels = f'path="{item.path}",method="{item.method}"'
+            lines += self._histogram_lines("aioli_request_duration_seconds", labels, item.latency)
+
+        lines += [
+            "# HELP aioli_request_phase_seconds Request latency per phase: takes, handler and returns.",
+            "# TYPE aioli_request_phase_seconds histogram",
+        ]
+
+        for item in self:
+            for phase in PHASES:
+                labels = f'path="{item.path}",method="{item.method}",phase="{phase}"'
+                lines += self._histogram_lines("aioli_request_phase_seconds", labels, getattr(item, phase))
+
+        lines += self._pool_lines()
+        lines += self._limiter_lines()
+
+        return "\n".join(lines) + "\n"
+
+    def _pool_lines(self):
+        if not self.pools:
+            return []
+
+        lines = []
+        gauges = [("size", "Number of open resources."), ("idle", "Number of idle resources."),
+                  ("in_use", "Number of resources in use."), ("waiting", "Number of tasks waiting for a resource.")]
+        counters = [("created", "Number of resources created."), ("closed", "Number of resources closed."),
+                    ("acquired", "Number of acquisitions."), ("timeouts", "Number of acquisitions timing out."),
+                    ("failed_checks", "Number of resources failing health checks.")]
+
+        for name, description in gauges:
+            lines += [f"# HELP aioli_pool_{name} {description}", f"# TYPE aioli_pool_{name} gauge"]
+            lines += [f'aioli_pool_{name}{{pool="{key}"}} {getattr(pool, name)}' for key, pool in self.pools.items()]
+
+        for name, description in counters:
+            lines += [f"# HELP aioli_pool_{name}_total {description}", f"# TYPE aioli_pool_{name}_total counter"]
+            lines += [
+                f'aioli_pool_{name}_total{{pool="{key}"}} {getattr(pool.stats, name)}'
+                for key, pool in self.pools.items()
+            ]
+
+        lines += [
+            "# HELP aioli_pool_wait_seconds Time spent waiting for a resource.",
+            "# TYPE aioli_pool_wait_seconds histogram",
+        ]
+
+        for key, pool in self.pools.items():
+            lines += self._histogram_lines("aioli_pool_wait_seconds", f'pool="{key}"', pool.stats.wait)
+
+        return lines
+
+    def _limiter_lines(self):
+        if not self.limiters:
+            return []
+
+        lines = []
+        series = [
+            ("active", "gauge", "Number of admitted requests being processed."),
+            ("waiting", "gauge", "Number of requests waiting for admission."),
+            ("admitted", "counter", "Number of admitted requests."),
+            ("rejected", "counter", "Number of requests rejected with 503 Service Unavailable."),
+        ]
+
+        for name, kind, description in series:
+            metric = f"aioli_admission_{name}_total" if kind == "counter" else f"aioli_admission_{name}"
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+            lines += [
+                f'{metric}{{limiter="{key}"}} {getattr(limiter, name)}' for key, limiter in self.limiters.items()
+            ]
+
+        return lines
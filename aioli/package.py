@@ -3,6 +3,7 @@ import re
 
 from marshmallow.exceptions import ValidationError
 from aioli.config import PackageConfigSchema
+from aioli.utils import format_path
 
 
 NAME_REGEX = re.compile(r"^[a-zA-Z0-9_]*$")
@@ -29,6 +30,7 @@ class Package:
     :param controllers: List of Controller classes to register with the Package
     :param services: List of Services classes to register with the Package
     :param config: Package Configuration Schema
+    :param dependencies: List of Packages, or Package names, started before this Package
 
     :ivar app: Application instance
     :ivar log: Package logger
@@ -36,6 +38,7 @@ class Package:
     :ivar config: Package config
     :ivar controllers: List of Controllers registered with the Package
     :ivar services: List of Services registered with the Package
+    :ivar dependencies: Names of Packages started before this Package
     """
 
     class State:
@@ -66,6 +69,7 @@ class Package:
         controllers=None,
         services=None,
         config=None,
+        dependencies=None,
     ):
         assert not controllers or isinstance(controllers, list), f"{name} controllers must be a list or None"
         assert not services or isinstance(services, list), f"{name} services must be a list "
@@ -89,6 +93,11 @@ class Package:
         self._services = set(services or [])
         self._controllers = set(controllers or [])
 
+        self.dependencies = {
+            dependency if isinstance(dependency, str) else getattr(dependency, "export", dependency).name
+            for dependency in dependencies or []
+        }
+
     async def detach_services(self):
         for obj in self.services:
             await obj.on_shutdown()
@@ -101,6 +110,19 @@ class Package:
         for obj in self.controllers:
             await obj.on_startup()
 
+    async def attach(self):
+        await self.attach_controllers()
+        await self.attach_services()
+
+    def invalidate_cache(self, path=""):
+        """Removes cached responses of this Package's route handlers
+
+        :param path: Path relative to the Package path, removes all of the Package's entries if empty
+        :return: Number of removed entries
+        """
+
+        return self.app.cache.invalidate(format_path(self.app.config["api_base"], self.path, path))
+
     async def register(self, app, config):
         self.app = app
         self.log = logging.getLogger(f"aioli.pkg.{self.name}")
@@ -116,6 +138,10 @@ class Package:
 
         self.services = [svc_cls(self) for svc_cls in self._services]
 
+        if app.timing:
+            for svc in self.services:
+                app.timing.instrument(svc)
+
     @property
     def path(self):
         return self.__path
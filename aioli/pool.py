@@ -0,0 +1,389 @@
+import asyncio
+import logging
+
+from collections import deque
+from time import monotonic
+
+from .exceptions import AioliException, HTTPException
+from .metrics import FLUSH_INTERVAL, Histogram
+
+
+class PoolTimeout(AioliException):
+    def __init__(self, name, timeout):
+        super(PoolTimeout, self).__init__(
+            status=503, message=f"Timed out after {timeout} seconds waiting for a resource of pool {name}"
+        )
+
+
+class PoolClosed(AioliException):
+    def __init__(self, name):
+        super(PoolClosed, self).__init__(status=503, message=f"Pool {name} is closed")
+
+
+class PoolEntry:
+    """Resource managed by a Pool
+
+    :param resource: Resource object
+    """
+
+    __slots__ = ("resource", "created", "released")
+
+    def __init__(self, resource):
+        self.resource = resource
+        self.created = self.released = monotonic()
+
+
+class PoolStats:
+    """Pool counters
+
+    :var created: Number of resources created
+    :var closed: Number of resources closed
+    :var acquired: Number of acquisitions
+    :var timeouts: Number of acquisitions timing out
+    :var failed_checks: Number of resources discarded by health checks
+    :var failed_creates: Number of failed resource creations
+    :var wait: Histogram of acquisition wait times
+    """
+
+    __slots__ = ("created", "closed", "acquired", "timeouts", "failed_checks", "failed_creates", "wait")
+
+    def __init__(self):
+        self.created = self.closed = self.acquired = self.timeouts = 0
+        self.failed_checks = self.failed_creates = 0
+        self.wait = Histogram()
+
+
+class Pool:
+    """Async pool of reusable resources, such as database connections.
+
+    Idle resources are reused most recently released first, keeping the others eligible for idle
+    eviction. Resources idle for `check_after` seconds or more are health checked before reuse.
+    A maintenance task evicts resources idle for longer than `max_idle` or older than `max_lifetime`,
+    and replenishes the pool up to `min_size`.
+
+    :param name: Pool name, used in logs and metrics
+    :param create: Coroutine function returning a new resource
+    :param close: Coroutine function closing a resource
+    :param check: Coroutine function returning False, or raising, if a resource is unusable
+    :param min_size: Number of resources kept open
+    :param max_size: Max number of open resources
+    :param acquire_timeout: Max number of seconds to wait for a resource
+    :param max_idle: Seconds after which idle resources above `min_size` are closed, None to disable
+    :param max_lifetime: Seconds after which resources are replaced, None to disable
+    :param check_after: Idle seconds after which resources are checked before reuse, None to disable
+    :param maintenance_interval: Seconds between maintenance runs
+
+    :var size: Number of open resources, including those being created
+    :var stats: PoolStats
+    """
+
+    def __init__(self, name, create, close=None, check=None, min_size=1, max_size=10, acquire_timeout=10.0,
+                 max_idle=300.0, max_lifetime=3600.0, check_after=5.0, maintenance_interval=10.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise Exception(f"Pool {name}: invalid size bounds: min_size={min_size}, max_size={max_size}")
+
+        self.name = name
+        self.log = logging.getLogger(f"aioli.pool.{name}")
+        self._create = create
+        self._close = close
+        self._check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.maintenance_interval = maintenance_interval
+        self.size = 0
+        self.stats = PoolStats()
+        self.closed = True
+        self._idle = deque()
+        self._in_use = {}
+        self._waiters = deque()
+        self._maintenance = None
+        self._drained = None
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    @property
+    def in_use(self):
+        return len(self._in_use)
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    async def open(self):
+        """Opens `min_size` resources and starts the maintenance task"""
+
+        self.closed = False
+        await self._fill()
+        self._maintenance = asyncio.ensure_future(self._maintain())
+
+    async def close(self, timeout=None):
+        """Closes the pool: new acquisitions fail, idle resources are closed, and resources
+        in use are closed once released, or after `timeout` seconds
+
+        :param timeout: Max number of seconds to wait for resources in use, None to wait indefinitely
+        """
+
+        self.closed = True
+
+        if self._maintenance:
+            self._maintenance.cancel()
+            self._maintenance = None
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_exception(PoolClosed(self.name))
+
+        await self._close_idle(len(self._idle))
+
+        if self._in_use:
+            self._drained = asyncio.Event()
+
+            try:
+                await asyncio.wait_for(self._drained.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.log.warning(f"Closing {len(self._in_use)} resources still in use")
+
+                for entry in list(self._in_use.values()):
+                    await self._discard(entry)
+
+                self._in_use.clear()
+
+    def acquire(self):
+        """Acquires a resource, released when exiting the context
+
+        :return: Async context manager
+        """
+
+        return PoolContext(self)
+
+    async def get(self):
+        """Acquires a resource, which must be released using `release`
+
+        :return: Resource
+        :raise PoolTimeout: No resource became available within `acquire_timeout`
+        """
+
+        if self.closed:
+            raise PoolClosed(self.name)
+
+        started = monotonic()
+
+        try:
+            entry = await asyncio.wait_for(self._get(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise PoolTimeout(self.name, self.acquire_timeout)
+
+        self._in_use[id(entry.resource)] = entry
+        stats = self.stats
+        stats.acquired += 1
+        stats.wait.observe(monotonic() - started)
+
+        if not stats.acquired & FLUSH_INTERVAL:
+            stats.wait.flush()
+
+        return entry.resource
+
+    async def release(self, resource, discard=False):
+        """Returns a resource to the pool
+
+        :param resource: Resource obtained using `get`
+        :param discard: Close the resource rather than reusing it, e.g. after an error
+        """
+
+        entry = self._in_use.pop(id(resource), None)
+
+        if entry is None:
+            return
+
+        if self.closed or discard or self._expired(entry, monotonic()):
+            await self._discard(entry)
+
+            if not self.closed:
+                self._wake()
+        else:
+            entry.released = monotonic()
+            self._hand_over(entry)
+
+        if self.closed and not self._in_use and self._drained:
+            self._drained.set()
+
+    def _expired(self, entry, now):
+        return self.max_lifetime is not None and now - entry.created >= self.max_lifetime
+
+    def _hand_over(self, entry):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(entry)
+                return
+
+        self._idle.append(entry)
+
+    def _wake(self):
+        # Lets a waiter create a resource in place of a discarded one
+        while self._waiters:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _get(self):
+        while True:
+            entry = self._idle.pop() if self._idle else None
+
+            if entry is None and self.size < self.max_size:
+                entry = await self._new()
+            elif entry is None:
+                waiter = asyncio.get_event_loop().create_future()
+                self._waiters.append(waiter)
+
+                try:
+                    entry = await waiter
+                except asyncio.CancelledError:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+
+                    if waiter.done() and not waiter.cancelled() and waiter.result():
+                        # Handed over while timing out
+                        self._hand_over(waiter.result())
+
+                    raise
+
+                if entry is None:
+                    continue
+
+            try:
+                usable = await self._usable(entry)
+            except asyncio.CancelledError:
+                self._hand_over(entry)
+                raise
+
+            if usable:
+                return entry
+
+            await self._discard(entry)
+
+    async def _usable(self, entry):
+        now = monotonic()
+
+        if self._expired(entry, now):
+            return False
+
+        if self._check is None or self.check_after is None or now - entry.released < self.check_after:
+            return True
+
+        try:
+            healthy = await self._check(entry.resource) is not False
+        except Exception as e:
+            self.log.warning(f"Health check failed: {e}")
+            healthy = False
+
+        if not healthy:
+            self.stats.failed_checks += 1
+
+        return healthy
+
+    async def _new(self):
+        self.size += 1
+
+        try:
+            entry = PoolEntry(await self._create())
+        except BaseException:
+            self.size -= 1
+            self.stats.failed_creates += 1
+            self._wake()
+            raise
+
+        self.stats.created += 1
+        return entry
+
+    async def _discard(self, entry):
+        self.size -= 1
+        self.stats.closed += 1
+
+        if self._close is None:
+            return
+
+        try:
+            await self._close(entry.resource)
+        except Exception as e:
+            self.log.warning(f"Error closing resource: {e}")
+
+    async def _close_idle(self, count):
+        for _ in range(count):
+            await self._discard(self._idle.popleft())
+
+    async def _fill(self):
+        while not self.closed and self.size < self.min_size:
+            self._hand_over(await self._new())
+
+    async def maintain(self):
+        """Closes resources idle for longer than `max_idle` while above `min_size`, and expired resources,
+        then replenishes the pool up to `min_size`
+        """
+
+        now = monotonic()
+        size = self.size
+        kept = deque()
+        evicted = []
+
+        # Least recently released first
+        for entry in self._idle:
+            idle_expired = self.max_idle is not None and now - entry.released >= self.max_idle
+
+            if self._expired(entry, now) or idle_expired and size > self.min_size:
+                evicted.append(entry)
+                size -= 1
+            else:
+                kept.append(entry)
+
+        # Kept resources remain available while evicted ones are being closed
+        self._idle = kept
+
+        for entry in evicted:
+            await self._discard(entry)
+
+        await self._fill()
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+
+            try:
+                await self.maintain()
+            except Exception as e:
+                self.log.warning(f"Maintenance failed: {e}")
+
+
+class PoolContext:
+    """Async context manager acquiring a resource, and releasing it upon exit.
+    Resources are discarded if the context exits with an error, other than an HTTPException raised by
+    handler logic.
+
+    :param pool: Pool
+    """
+
+    __slots__ = ("pool", "resource")
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.resource = None
+
+    async def __aenter__(self):
+        self.resource = await self.pool.get()
+        return self.resource
+
+    async def __aexit__(self, exc_type, exc, tb):
+        discard = exc_type is not None and not issubclass(exc_type, HTTPException)
+        await self.pool.release(self.resource, discard=discard)
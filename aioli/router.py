@@ -0,0 +1,197 @@
+import re
+
+from starlette.routing import Route, Router, PARAM_REGEX, CONVERTOR_TYPES
+
+
+# Param types tried at each position, most specific first
+PARAM_ORDER = ("int", "float", "str")
+
+
+class RadixNode:
+    """Path segment node of the RadixRouter tree
+
+    :var static: Static child nodes, by segment
+    :var params: Typed param child nodes: [(<name>, <type>, <matcher or None>, <node>), ...]
+    :var catchall: Remaining path param: (<name>, <node>), or None
+    :var routes: Routes ending at this node, by method
+    """
+
+    __slots__ = ("static", "params", "catchall", "routes")
+
+    def __init__(self):
+        self.static = {}
+        self.params = []
+        self.catchall = None
+        self.routes = {}
+
+    def param_child(self, name, param_type):
+        for child_name, child_type, _, child in self.params:
+            if (child_name, child_type) == (name, param_type):
+                return child
+
+        child = RadixNode()
+        regex = CONVERTOR_TYPES[param_type].regex
+        matcher = None if param_type == "str" else re.compile(f"(?:{regex})$").match
+
+        self.params.append((name, param_type, matcher, child))
+        self.params.sort(key=lambda param: PARAM_ORDER.index(param[1]))
+
+        return child
+
+
+def parse_segment(segment):
+    """Parses a route path segment
+
+    :param segment: Path segment
+    :return: (<name>, <type>) for param segments, None for static segments
+    :raise ValueError: Unsupported segment
+    """
+
+    match = PARAM_REGEX.fullmatch(segment)
+
+    if match:
+        name, param_type = match.groups("str")
+        param_type = param_type.lstrip(":")
+
+        if param_type not in PARAM_ORDER and param_type != "path":
+            raise ValueError(f"Unsupported param type: {param_type}")
+
+        return name, param_type
+
+    if PARAM_REGEX.search(segment):
+        raise ValueError(f"Partial param segment: {segment}")
+
+    return None
+
+
+class RadixRouter(Router):
+    """Router matching HTTP routes using a prefix tree of path segments, with routes grouped by method
+    at each leaf. Matching cost depends on the number of path segments rather than the number of routes.
+
+    Static segments take precedence over params, and params are tried from the most specific type to
+    the least. Requests not fully matched by the tree, e.g. 405s, redirects, Mounts and WebSockets,
+    fall back to Starlette's sequential matching.
+
+    The tree is rebuilt lazily upon the first request following a change in the number of routes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RadixRouter, self).__init__(*args, **kwargs)
+        self.tree = None
+        self._tree_size = None
+
+    def build(self):
+        """Builds the tree from the current routes
+
+        :return: Root RadixNode
+        """
+
+        root = RadixNode()
+
+        # Iterate in reverse, letting the first of duplicate routes win, as with sequential matching
+        for route in reversed(self.routes):
+            if type(route) is not Route or route.methods is None:
+                continue
+
+            try:
+                self._insert(root, route)
+            except ValueError:
+                continue
+
+        return root
+
+    @staticmethod
+    def _insert(root, route):
+        segments = route.path.split("/")[1:]
+        parsed = [parse_segment(segment) for segment in segments]
+        node = root
+
+        for idx, (segment, param) in enumerate(zip(segments, parsed)):
+            if param is None:
+                node = node.static.setdefault(segment, RadixNode())
+            elif param[1] == "path":
+                if idx != len(segments) - 1:
+                    raise ValueError("Path params must be last")
+
+                if node.catchall is None:
+                    node.catchall = (param[0], RadixNode())
+
+                node = node.catchall[1]
+            else:
+                node = node.param_child(*param)
+
+        for method in route.methods:
+            node.routes[method] = route
+
+    def _lookup(self, node, segments, idx, method, params):
+        if idx == len(segments):
+            return node.routes.get(method)
+
+        segment = segments[idx]
+        child = node.static.get(segment)
+
+        if child is not None:
+            route = self._lookup(child, segments, idx + 1, method, params)
+
+            if route is not None:
+                return route
+
+        if segment:
+            for name, _, matcher, child in node.params:
+                if matcher is None or matcher(segment):
+                    params[name] = segment
+                    route = self._lookup(child, segments, idx + 1, method, params)
+
+                    if route is not None:
+                        return route
+
+                    del params[name]
+
+        if node.catchall is not None:
+            name, child = node.catchall
+            route = child.routes.get(method)
+
+            if route is not None:
+                params[name] = "/".join(segments[idx:])
+                return route
+
+        return None
+
+    def match(self, path, method):
+        """Looks up the route matching a path and method
+
+        :param path: Request path
+        :param method: HTTP method
+        :return: Tuple of (<Route>, <path params>), or (None, None)
+        """
+
+        if self._tree_size != len(self.routes):
+            self.tree = self.build()
+            self._tree_size = len(self.routes)
+
+        params = {}
+        route = self._lookup(self.tree, path.split("/")[1:], 0, method, params)
+
+        if route is None:
+            return None, None
+
+        convertors = route.param_convertors
+
+        return route, {name: convertors[name].convert(value) for name, value in params.items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            route, params = self.match(scope["path"], scope["method"])
+
+            if route is not None:
+                if "router" not in scope:
+                    scope["router"] = self
+
+                if "path_params" in scope:
+                    params = dict(scope["path_params"], **params)
+
+                scope.update(endpoint=route.endpoint, path_params=params)
+                await route.app(scope, receive, send)
+                return
+
+        await super(RadixRouter, self).__call__(scope, receive, send)
@@ -0,0 +1,441 @@
+import asyncio
+import logging
+import random
+import traceback
+
+from collections import deque
+from datetime import datetime, timedelta
+from time import monotonic
+
+from .exceptions import AioliException
+
+
+# Field bounds of cron expressions: minute, hour, day of month, month, day of week (0 or 7 is Sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+class QueueFull(AioliException):
+    def __init__(self, name):
+        super(QueueFull, self).__init__(status=503, message=f"Work queue {name} is full")
+
+
+class QueueClosed(AioliException):
+    def __init__(self, name):
+        super(QueueClosed, self).__init__(status=503, message=f"Work queue {name} is closed")
+
+
+def parse_cron_field(value, low, high):
+    """Parses a cron expression field: `*`, `5`, `1-5`, `*/15`, `1-30/5` or comma-separated combinations
+
+    :param value: Field value
+    :param low: Lowest allowed value
+    :param high: Highest allowed value
+    :return: Set of matching values
+    :raise ValueError: Invalid field
+    """
+
+    values = set()
+
+    for part in value.split(","):
+        part, _, step = part.partition("/")
+        step = int(step) if step else 1
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(bound) for bound in part.split("-", 1))
+        else:
+            start = end = int(part)
+
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Invalid cron field: {value}")
+
+        values.update(range(start, end + 1, step))
+
+    return values
+
+
+class CronSchedule:
+    """Cron-style schedule, in local time
+
+    :param expression: Five fields: minute, hour, day of month, month and day of week
+    :raise ValueError: Invalid expression
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression, expected 5 fields: {expression}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, *bounds) for field, bounds in zip(fields, CRON_FIELDS)
+        )
+
+        # Cron weekdays start on Sunday, Python's on Monday
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+
+        # Days are matched on either field when both are restricted
+        self.any_day = fields[2] != "*" and fields[4] != "*"
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = moment.weekday() in self.weekdays
+
+        if self.any_day:
+            return day or weekday
+
+        return (day or not self.days_restricted) and (weekday or not self.weekdays_restricted)
+
+    def next_after(self, moment):
+        """Returns the first matching minute after a moment
+
+        :param moment: datetime
+        :return: datetime
+        """
+
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                month = moment.month % 12 + 1
+                moment = moment.replace(year=moment.year + (month == 1), month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+
+        raise ValueError(f"Cron expression never matches: {self.expression}")
+
+
+class Job:
+    """Periodic job, whose runs are skipped while a previous run is still in progress
+
+    :param scheduler: Scheduler
+    :param name: Job name
+    :param func: Coroutine function
+    :param interval: Seconds between runs, or None for cron jobs
+    :param cron: CronSchedule, or None for interval jobs
+    :param jitter: Max random delay in seconds added to each run
+    :param immediate: Run interval jobs upon start
+
+    :var runs: Number of completed runs
+    :var failures: Number of failed runs
+    :var skipped: Number of runs skipped due to a run in progress
+    """
+
+    def __init__(self, scheduler, name, func, interval=None, cron=None, jitter=0.0, immediate=False):
+        self.scheduler = scheduler
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = cron
+        self.jitter = jitter
+        self.immediate = immediate
+        self.runs = self.failures = self.skipped = 0
+        self.task = None
+        self._handle = None
+        self._due = None
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def _delay(self):
+        jitter = random.uniform(0, self.jitter) if self.jitter else 0.0
+
+        if self.cron is not None:
+            now = datetime.now()
+            return (self.cron.next_after(now) - now).total_seconds() + jitter
+
+        # Scheduled from the previous due time, avoiding drift
+        now = monotonic()
+        self._due = now if self._due is None else max(self._due + self.interval, now)
+
+        return self._due - now + jitter
+
+    def start(self):
+        loop = asyncio.get_event_loop()
+
+        if self.immediate and self.cron is None:
+            self._due = monotonic()
+            self._handle = loop.call_soon(self._fire)
+        else:
+            self._handle = loop.call_later(self._delay(), self._fire)
+
+    def stop(self):
+        """Stops scheduling runs, without cancelling a run in progress"""
+
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def cancel(self):
+        """Stops scheduling runs and removes the job from the Scheduler"""
+
+        self.stop()
+        self.scheduler.jobs.pop(self.name, None)
+
+    def _fire(self):
+        if self.running:
+            self.skipped += 1
+            self.scheduler.log.warning(f"Skipping run of job {self.name}: previous run in progress")
+        else:
+            self.task = self.scheduler.app.create_task(self._run())
+
+        self._handle = asyncio.get_event_loop().call_later(self._delay(), self._fire)
+
+    async def _run(self):
+        try:
+            await self.func()
+            self.runs += 1
+        except Exception:
+            self.failures += 1
+            self.scheduler.log.error(f"Job {self.name} failed: {traceback.format_exc()}")
+
+
+class WorkQueue:
+    """Bounded queue of work items, processed by a limited number of workers.
+
+    Items are coroutine functions along with their arguments. Adding items to a full queue waits for room,
+    or raises QueueFull when not waiting, passing backpressure on to callers.
+
+    :param scheduler: Scheduler
+    :param name: Queue name
+    :param workers: Number of concurrent workers
+    :param max_size: Max number of pending items
+
+    :var processed: Number of processed items
+    :var failed: Number of failed items
+    """
+
+    def __init__(self, scheduler, name, workers=1, max_size=100):
+        self.scheduler = scheduler
+        self.name = name
+        self.workers = workers
+        self.max_size = max_size
+        self.processed = self.failed = 0
+        self.closed = False
+        self.active = 0
+        self._items = deque()
+        self._getters = deque()
+        self._putters = deque()
+
+    def __len__(self):
+        return len(self._items)
+
+    def start(self):
+        self.closed = False
+
+        for _ in range(self.workers):
+            self.scheduler.app.create_task(self._work())
+
+    def put_nowait(self, func, *args, **kwargs):
+        """Adds an item without waiting
+
+        :param func: Coroutine function
+        :param args: Positional arguments
+        :param kwargs: Keyword arguments
+        :raise QueueFull: Queue full
+        :raise QueueClosed: Application shutting down
+        """
+
+        if self.closed:
+            raise QueueClosed(self.name)
+
+        if len(self._items) >= self.max_size:
+            raise QueueFull(self.name)
+
+        self._items.append((func, args, kwargs))
+        self._wake(self._getters)
+
+    async def put(self, func, *args, timeout=None, **kwargs):
+        """Adds an item, waiting for room if the queue is full
+
+        :param func: Coroutine function
+        :param args: Positional arguments
+        :param timeout: Max number of seconds to wait for room, None to wait indefinitely
+        :param kwargs: Keyword arguments
+        :raise QueueFull: No room within `timeout`
+        :raise QueueClosed: Application shutting down
+        """
+
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while len(self._items) >= self.max_size and not self.closed:
+            waiter = asyncio.get_event_loop().create_future()
+            self._putters.append(waiter)
+
+            try:
+                await asyncio.wait_for(waiter, None if deadline is None else max(deadline - monotonic(), 0))
+            except asyncio.TimeoutError:
+                raise QueueFull(self.name)
+            finally:
+                if waiter in self._putters:
+                    self._putters.remove(waiter)
+
+        self.put_nowait(func, *args, **kwargs)
+
+    @staticmethod
+    def _wake(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _work(self):
+        while True:
+            if not self._items:
+                if self.closed:
+                    return
+
+                waiter = asyncio.get_event_loop().create_future()
+                self._getters.append(waiter)
+                await waiter
+                continue
+
+            func, args, kwargs = self._items.popleft()
+            self._wake(self._putters)
+            self.active += 1
+
+            try:
+                await func(*args, **kwargs)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                self.scheduler.log.error(f"Work queue {self.name} item failed: {traceback.format_exc()}")
+            finally:
+                self.active -= 1
+
+    def close(self):
+        """Stops accepting items, letting workers exit once pending items are processed"""
+
+        self.closed = True
+
+        while self._getters:
+            self._wake(self._getters)
+
+        while self._putters:
+            self._wake(self._putters)
+
+
+class Scheduler:
+    """Runs periodic jobs and work queues on behalf of Components, as tasks tracked by the Application.
+
+    Jobs and queues may be created before the Application starts, and are started along with it.
+    Upon shutdown, jobs stop being scheduled, queues stop accepting items, and runs in progress and
+    pending items are awaited, within the *shutdown_timeout* setting.
+
+    :param app: Application
+
+    :var jobs: Periodic jobs by name
+    :var queues: Work queues by name
+    :var started: True once started
+    """
+
+    log = logging.getLogger("aioli.scheduler")
+
+    def __init__(self, app):
+        self.app = app
+        self.jobs = {}
+        self.queues = {}
+        self.started = False
+
+    def _add_job(self, job):
+        if job.name in self.jobs:
+            raise Exception(f"Job {job.name} already exists")
+
+        self.jobs[job.name] = job
+
+        if self.started:
+            job.start()
+
+        return job
+
+    def every(self, interval, func, name=None, jitter=0.0, immediate=False):
+        """Runs a coroutine function every `interval` seconds
+
+        :param interval: Seconds between runs
+        :param func: Coroutine function, called without arguments
+        :param name: Job name, defaults to the function's qualified name
+        :param jitter: Max random delay in seconds added to each run
+        :param immediate: Run upon start, rather than after the first interval
+        :return: Job
+        """
+
+        name = name or func.__qualname__
+        return self._add_job(Job(self, name, func, interval=interval, jitter=jitter, immediate=immediate))
+
+    def cron(self, expression, func, name=None, jitter=0.0):
+        """Runs a coroutine function on a cron-style schedule, in local time
+
+        :param expression: Five fields: minute, hour, day of month, month and day of week, e.g. "*/15 * * * 1-5"
+        :param func: Coroutine function, called without arguments
+        :param name: Job name, defaults to the function's qualified name
+        :param jitter: Max random delay in seconds added to each run
+        :return: Job
+        :raise ValueError: Invalid expression
+        """
+
+        name = name or func.__qualname__
+        return self._add_job(Job(self, name, func, cron=CronSchedule(expression), jitter=jitter))
+
+    def queue(self, name, workers=1, max_size=100):
+        """Returns a work queue, creating it if needed
+
+        :param name: Queue name
+        :param workers: Number of concurrent workers
+        :param max_size: Max number of pending items
+        :return: WorkQueue
+        """
+
+        queue = self.queues.get(name)
+
+        if queue is None:
+            queue = self.queues[name] = WorkQueue(self, name, workers, max_size)
+
+            if self.started:
+                queue.start()
+
+        return queue
+
+    def spawn(self, coro):
+        """Runs a coroutine in the background, awaited upon shutdown
+
+        :param coro: Coroutine
+        :return: asyncio.Task
+        """
+
+        return self.app.create_task(coro)
+
+    def start(self):
+        """Starts jobs and queues"""
+
+        self.started = True
+
+        for job in self.jobs.values():
+            job.start()
+
+        for queue in self.queues.values():
+            queue.start()
+
+    def stop(self):
+        """Stops scheduling jobs and closes queues"""
+
+        self.started = False
+
+        for job in self.jobs.values():
+            job.stop()
+
+        for queue in self.queues.values():
+            queue.close()
@@ -1,4 +1,157 @@
+import asyncio
+
+from collections import OrderedDict
+from functools import partial, update_wrapper
+from time import monotonic
+
 from .component import Component, ComponentMeta
+from .executor import call_qualified
+from .pool import Pool
+
+
+class SingleFlight:
+    """Tracks in-flight calls and memoized results of a coalesced Service method
+
+    :param func: Bound coroutine function
+    :param ttl: Seconds to keep results for, or None to only coalesce concurrent calls
+    :param max_size: Max number of memoized results
+    """
+
+    def __init__(self, func, ttl, max_size):
+        self.func = func
+        self.ttl = ttl
+        self.max_size = max_size
+        self.inflight = {}
+        self.results = OrderedDict()
+
+    @staticmethod
+    def make_key(args, kwargs):
+        return args + tuple(sorted(kwargs.items())) if kwargs else args
+
+    def _done(self, key, task):
+        if self.inflight.get(key) is not task:
+            # Invalidated while in flight
+            return
+
+        del self.inflight[key]
+
+        if self.ttl is None or task.cancelled() or task.exception():
+            return
+
+        self.results[key] = (monotonic() + self.ttl, task.result())
+
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    async def __call__(self, *args, **kwargs):
+        key = self.make_key(args, kwargs)
+
+        try:
+            result = self.results.get(key)
+        except TypeError:
+            # Unhashable arguments: call directly
+            return await self.func(*args, **kwargs)
+
+        if result is not None:
+            expires, value = result
+
+            if expires > monotonic():
+                self.results.move_to_end(key)
+                return value
+
+            del self.results[key]
+
+        task = self.inflight.get(key)
+
+        if task is None:
+            task = self.inflight[key] = asyncio.ensure_future(self.func(*args, **kwargs))
+            task.add_done_callback(lambda t: self._done(key, t))
+
+        # Cancelling one caller must not cancel the call shared with others
+        return await asyncio.shield(task)
+
+    def invalidate(self, *args, **kwargs):
+        """Forgets the memoized result of, and detaches in-flight calls with, the given arguments"""
+
+        key = self.make_key(args, kwargs)
+        self.results.pop(key, None)
+        self.inflight.pop(key, None)
+
+    def clear(self):
+        """Forgets all memoized results and detaches all in-flight calls"""
+
+        self.results.clear()
+        self.inflight.clear()
+
+
+class coalesce:
+    """Service method decorator; concurrent calls with the same arguments are coalesced into a
+    single call, whose result is shared by all callers. Results are optionally memoized.
+
+    The returned method exposes `invalidate(*args, **kwargs)` and `clear()`, reachable through
+    :meth:`~aioli.service.BaseService.connect` from other Services.
+
+    :param ttl: Seconds to keep results for, or None to only coalesce concurrent calls
+    :param max_size: Max number of memoized results, least recently used are evicted first
+    """
+
+    def __init__(self, ttl=None, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.func = None
+
+    def __call__(self, func):
+        self.func = func
+        update_wrapper(self, func)
+        return self
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        attr = f"_coalesced_{self.func.__name__}"
+
+        if attr not in instance.__dict__:
+            bound = SingleFlight(self.func.__get__(instance, owner), self.ttl, self.max_size)
+            instance.__dict__[attr] = update_wrapper(bound, self.func)
+
+        return instance.__dict__[attr]
+
+
+class offload:
+    """Service method decorator; runs a synchronous, CPU-heavy method in the Application's thread pool,
+    or process pool, keeping the event loop free. The decorated method is awaited by callers.
+
+    Methods run in the process pool are declared without `self`, and called with picklable arguments
+    only, as the Service instance isn't available in other processes.
+
+    :param process: Use the process pool rather than the thread pool
+    """
+
+    def __init__(self, process=False):
+        self.process = process
+        self.func = None
+
+    def __call__(self, func):
+        self.func = func
+        update_wrapper(self, func)
+        return self
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        executor = instance.app.executor
+
+        if self.process:
+            func = partial(call_qualified, self.func.__module__, self.func.__qualname__)
+        else:
+            func = self.func.__get__(instance, owner)
+
+        async def offloaded(*args, **kwargs):
+            return await executor.run(func, *args, process=self.process, **kwargs)
+
+        return update_wrapper(offloaded, self.func)
 
 
 class BaseService(Component, metaclass=ComponentMeta):
@@ -34,7 +187,10 @@ class BaseService(Component, metaclass=ComponentMeta):
         """
 
         self._validate_import(svc)
-        return self._instances[svc]
+        instance = self._instances[svc]
+        self.registry.use(self.pkg, instance.pkg)
+
+        return instance
 
     def integrate(self, svc):
         """Creates a new instance of the given Service class in the context of the current Package.
@@ -44,4 +200,91 @@ class BaseService(Component, metaclass=ComponentMeta):
         """
 
         self._validate_import(svc)
+        self.registry.use(self.pkg, self._instances[svc].pkg)
+
         return svc(pkg=self.pkg, reuse_existing=False)
+
+
+class PooledService(BaseService):
+    """Base Service managing a :class:`~aioli.pool.Pool` of resources, such as connections to a remote system.
+
+    The pool is opened upon startup and drained upon shutdown: subclasses overriding `on_startup` or
+    `on_shutdown` must call the base implementation. Subclasses implement `create_resource`, and optionally
+    `close_resource` and `check_resource`, and tune the pool using the `pool_*` attributes.
+
+    :var pool: Pool, available once started
+    :var pool_min_size: Number of resources kept open
+    :var pool_max_size: Max number of open resources
+    :var pool_acquire_timeout: Max number of seconds to wait for a resource
+    :var pool_max_idle: Seconds after which idle resources above `pool_min_size` are closed
+    :var pool_max_lifetime: Seconds after which resources are replaced
+    :var pool_check_after: Idle seconds after which resources are checked before reuse
+    :var pool_close_timeout: Max number of seconds to wait for resources in use upon shutdown
+    """
+
+    pool = None
+    pool_min_size = 1
+    pool_max_size = 10
+    pool_acquire_timeout = 10.0
+    pool_max_idle = 300.0
+    pool_max_lifetime = 3600.0
+    pool_check_after = 5.0
+    pool_close_timeout = 10.0
+
+    @property
+    def pool_name(self):
+        return f"{self.pkg.name}.{self.__class__.__name__}"
+
+    async def create_resource(self):
+        """Creates a new resource
+
+        :return: Resource
+        """
+
+        raise NotImplementedError
+
+    async def close_resource(self, resource):
+        """Closes a resource
+
+        :param resource: Resource
+        """
+
+    async def check_resource(self, resource):
+        """Checks whether a resource that has been idle for a while is still usable
+
+        :param resource: Resource
+        :return: False, or raise, if the resource should be discarded
+        """
+
+        return True
+
+    def acquire(self):
+        """Acquires a resource from the pool, released when exiting the context
+
+        :return: Async context manager
+        """
+
+        return self.pool.acquire()
+
+    async def on_startup(self):
+        self.pool = Pool(
+            self.pool_name,
+            create=self.create_resource,
+            close=self.close_resource,
+            check=self.check_resource,
+            min_size=self.pool_min_size,
+            max_size=self.pool_max_size,
+            acquire_timeout=self.pool_acquire_timeout,
+            max_idle=self.pool_max_idle,
+            max_lifetime=self.pool_max_lifetime,
+            check_after=self.pool_check_after,
+        )
+
+        if self.app.metrics:
+            self.app.metrics.pools[self.pool.name] = self.pool
+
+        await self.pool.open()
+
+    async def on_shutdown(self):
+        if self.pool:
+            await self.pool.close(self.pool_close_timeout)
@@ -0,0 +1,229 @@
+import inspect
+import logging
+import random
+
+from contextlib import nullcontext
+from contextvars import ContextVar
+from functools import update_wrapper
+from time import perf_counter
+
+from .service import BaseService, PooledService, coalesce, offload
+
+
+# Span of the current task, inherited by tasks it creates
+current_span = ContextVar("aioli_span", default=None)
+
+# Context of spans recorded outside of timed requests
+NO_SPAN = nullcontext()
+
+
+class Span:
+    """Timed part of a request, with nested spans
+
+    :param name: Span name
+    :param start: Start time, from perf_counter
+    """
+
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name, start=None):
+        self.name = name
+        self.start = perf_counter() if start is None else start
+        self.end = None
+        self.children = []
+
+    @property
+    def duration(self):
+        return (self.end or perf_counter()) - self.start
+
+    def walk(self, depth=0):
+        """Yields (<depth>, <span>) tuples of nested spans, depth first"""
+
+        for child in self.children:
+            yield depth, child
+            yield from child.walk(depth + 1)
+
+
+class SpanContext:
+    """Context manager recording a Span nested in the current span, if any
+
+    :param name: Span name
+    """
+
+    __slots__ = ("name", "span", "token")
+
+    def __init__(self, name):
+        self.name = name
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        parent = current_span.get()
+
+        if parent is not None:
+            self.span = Span(self.name)
+            parent.children.append(self.span)
+            self.token = current_span.set(self.span)
+
+        return self.span
+
+    def __exit__(self, *_):
+        if self.span is not None:
+            self.span.end = perf_counter()
+            current_span.reset(self.token)
+
+
+def span(name):
+    """Records a span of the request being timed, nesting spans started within it
+
+    :param name: Span name
+    :return: Context manager
+    """
+
+    if current_span.get() is None:
+        return NO_SPAN
+
+    return SpanContext(name)
+
+
+def traced(name, func):
+    """Wraps a coroutine function, recording its calls as spans of the requests being timed
+
+    :param name: Span name
+    :param func: Coroutine function
+    :return: Coroutine function
+    """
+
+    async def wrapper(*args, **kwargs):
+        if current_span.get() is None:
+            return await func(*args, **kwargs)
+
+        with SpanContext(name):
+            return await func(*args, **kwargs)
+
+    return update_wrapper(wrapper, func)
+
+
+class Timeline:
+    """Spans of a timed request
+
+    :param root: Root Span, covering the whole request
+    :param sampled: Send the breakdown in a Server-Timing header
+    """
+
+    __slots__ = ("root", "sampled", "token")
+
+    def __init__(self, root, sampled):
+        self.root = root
+        self.sampled = sampled
+        self.token = current_span.set(root)
+
+    def server_timing(self):
+        """Formats spans as a Server-Timing header value, durations in milliseconds
+
+        :return: Header value
+        """
+
+        entries = [f"total;dur={self.root.duration * 1000:.3f}"]
+        entries += [f"{span.name};dur={span.duration * 1000:.3f}" for _, span in self.root.walk()]
+
+        return ", ".join(entries)
+
+    def format(self):
+        """Formats the span tree, one span per line
+
+        :return: str
+        """
+
+        lines = [f"{self.root.name} {self.root.duration * 1000:.3f} ms"]
+        lines += [f"{'  ' * (depth + 1)}{span.name} {span.duration * 1000:.3f} ms" for depth, span in self.root.walk()]
+
+        return "\n".join(lines)
+
+
+class Timing:
+    """Per-request timelines, sent as Server-Timing headers to sampled requests, and logged for slow requests.
+
+    Timelines contain spans for routing, the `takes` phase with body decoding and validation, the handler with
+    the Service method calls it awaits, and the `returns` phase.
+
+    :param sample: Fraction of requests receiving a Server-Timing header
+    :param slow_threshold: Seconds from which the span tree of a request is logged, 0 disables
+
+    :var slow: Number of slow requests logged
+    """
+
+    log = logging.getLogger("aioli.timing")
+
+    def __init__(self, sample=1.0, slow_threshold=0.0):
+        self.sample = sample
+        self.slow_threshold = slow_threshold
+        self.slow = 0
+
+    def start(self, scope):
+        """Starts timing a request, if sampled or when capturing slow requests
+
+        :param scope: ASGI scope
+        :return: Timeline or None
+        """
+
+        sampled = self.sample >= 1.0 or random.random() < self.sample
+
+        if not sampled and not self.slow_threshold:
+            return None
+
+        now = perf_counter()
+        received = scope.get("aioli.received", now)
+        root = Span(f"{scope['method']} {scope['path']}", received)
+
+        if received < now:
+            routing = Span("routing", received)
+            routing.end = now
+            root.children.append(routing)
+
+        return Timeline(root, sampled)
+
+    def finish(self, timeline):
+        """Stops timing a request, logging its spans if slow
+
+        :param timeline: Timeline
+        :return: Server-Timing header value, or None if not sampled
+        """
+
+        timeline.root.end = perf_counter()
+        current_span.reset(timeline.token)
+
+        if self.slow_threshold and timeline.root.duration >= self.slow_threshold:
+            self.slow += 1
+            self.log.warning(f"Slow request:\n{timeline.format()}")
+
+        return timeline.server_timing() if timeline.sampled else None
+
+    @staticmethod
+    def instrument(svc):
+        """Records calls of a Service's coroutine methods, including @offload and @coalesce methods, as spans.
+
+        Calls of @coalesce methods are recorded for every caller, including those served a memoized result
+        or joining an in-flight call.
+
+        :param svc: Service instance
+        """
+
+        base_names = set(dir(PooledService)) | set(dir(BaseService))
+        cls = type(svc)
+
+        for name in dir(cls):
+            if name.startswith("_") or name in base_names or name in svc.__dict__:
+                continue
+
+            member = inspect.getattr_static(cls, name)
+
+            if inspect.iscoroutinefunction(member) or isinstance(member, (offload, coalesce)):
+                method = getattr(svc, name)
+                wrapper = traced(f"{cls.__name__}.{name}", method)
+
+                if isinstance(member, coalesce):
+                    wrapper.invalidate, wrapper.clear = method.invalidate, method.clear
+
+                # Shadows the class attribute, leaving the class untouched
+                svc.__dict__[name] = wrapper
@@ -1,12 +1,33 @@
-import ujson
+import re
 
 from starlette.responses import Response
 
+from .codec import UjsonCodec
+
+DEFAULT_CODEC = UjsonCodec()
+
+
+def jsonify(content, status=200, indent=0, codec=None):
+    """Creates a JSON Response
+
+    :param content: Object to encode
+    :param status: Response status
+    :param indent: Indentation level, 0 for compact output
+    :param codec: JsonCodec to encode with, ujson is used if not provided
+    :return: Response
+    """
 
-def jsonify(content, status=200, **kwargs):
     return Response(
-        content=ujson.dumps(content, ensure_ascii=False, **kwargs).encode("utf8"),
+        content=(codec or DEFAULT_CODEC).dumpb(content, indent=indent),
         status_code=status,
         headers={"content-type": "application/json"},
     )
 
+
+def format_path(*parts):
+    path = ""
+
+    for part in parts:
+        path = f"/{path}/{part}"
+
+    return re.sub(r"/+", "/", path.rstrip("/"))
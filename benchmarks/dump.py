@@ -0,0 +1,60 @@
+"""Compares compiled dump functions with plain `Schema.dumps`.
+
+Usage: python -m benchmarks.dump [rows]
+"""
+
+import sys
+import timeit
+
+from aioli.controller.codegen import compile_dumper
+from aioli.controller.schemas import Schema, fields
+
+
+class Tag(Schema):
+    id = fields.Integer()
+    label = fields.String()
+
+
+class Entry(Schema):
+    id = fields.Integer()
+    name = fields.String()
+    email = fields.String()
+    score = fields.Float()
+    active = fields.Boolean()
+    tags = fields.List(fields.Nested(Tag))
+    owner = fields.Nested(Tag)
+
+
+def make_rows(count):
+    return [
+        {
+            "id": idx,
+            "name": f"name-{idx}",
+            "email": f"user{idx}@example.com",
+            "score": idx / 3,
+            "active": bool(idx % 2),
+            "tags": [{"id": tag, "label": f"tag-{tag}"} for tag in range(3)],
+            "owner": {"id": idx, "label": "owner"},
+        }
+        for idx in range(count)
+    ]
+
+
+def main(count=5000, repeat=5):
+    rows = make_rows(count)
+    schema = Entry(many=True)
+    dumper = compile_dumper(schema)
+    render = schema.opts.render_module.dumps
+
+    assert schema.dumps(rows) == render(dumper(rows))
+
+    plain = min(timeit.repeat(lambda: schema.dumps(rows), number=1, repeat=repeat))
+    compiled = min(timeit.repeat(lambda: render(dumper(rows)), number=1, repeat=repeat))
+
+    print(f"rows: {count}")
+    print(f"Schema.dumps: {plain * 1000:.2f} ms")
+    print(f"compiled:     {compiled * 1000:.2f} ms ({plain / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,77 @@
+"""Compares lean route handlers with regular route handlers, calling the Application directly.
+
+Usage: python -m benchmarks.lean [requests]
+"""
+
+import asyncio
+import sys
+import time
+import types
+
+from aioli import Application, Package
+from aioli.controller import BaseHttpController, Method, route, returns
+
+
+class Controller(BaseHttpController):
+    @route("/regular", Method.GET)
+    @returns()
+    async def regular(self):
+        return {"ok": True}
+
+    @route("/lean", Method.GET, lean=True)
+    @returns()
+    async def lean(self):
+        return {"ok": True}
+
+
+def make_app():
+    module = types.ModuleType("lean_bench")
+    module.export = Package(name="lean_bench", description="Lean benchmark", version="0.1.0", controllers=[Controller])
+
+    app = Application(packages=[module], config={"aioli_core": {"debug": False}})
+    app.preload()
+
+    return app
+
+
+async def run(app, path, count):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"origin", b"http://example.com")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 80),
+        "scheme": "http",
+        "root_path": "",
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+
+    return time.perf_counter() - started
+
+
+def main(count=20000):
+    app = make_app()
+    loop = asyncio.get_event_loop()
+
+    regular = loop.run_until_complete(run(app, "/api/lean_bench/regular", count))
+    lean = loop.run_until_complete(run(app, "/api/lean_bench/lean", count))
+
+    print(f"requests: {count}")
+    print(f"regular: {regular / count * 1e6:.2f} us/request")
+    print(f"lean:    {lean / count * 1e6:.2f} us/request ({regular / lean:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,58 @@
+"""Compares compiled load functions with plain `Schema.load`.
+
+Usage: python -m benchmarks.load [rows]
+"""
+
+import sys
+import timeit
+
+from aioli.controller.codegen import compile_loader
+from aioli.controller.schemas import Schema, fields, validate
+
+
+class Tag(Schema):
+    id = fields.Integer(required=True)
+    label = fields.String(validate=validate.Length(max=32))
+
+
+class Entry(Schema):
+    id = fields.Integer(required=True)
+    name = fields.String(required=True)
+    email = fields.String()
+    score = fields.Float()
+    active = fields.Boolean(missing=True)
+    tags = fields.List(fields.Nested(Tag))
+    owner = fields.Nested(Tag)
+
+
+def make_rows(count):
+    return [
+        {
+            "id": idx,
+            "name": f"name-{idx}",
+            "email": f"user{idx}@example.com",
+            "score": idx / 3,
+            "tags": [{"id": tag, "label": f"tag-{tag}"} for tag in range(3)],
+            "owner": {"id": idx, "label": "owner"},
+        }
+        for idx in range(count)
+    ]
+
+
+def main(count=5000, repeat=5):
+    rows = make_rows(count)
+    schema = Entry(many=True)
+    loader = compile_loader(schema)
+
+    assert schema.load(rows) == loader(rows)
+
+    plain = min(timeit.repeat(lambda: schema.load(rows), number=1, repeat=repeat))
+    compiled = min(timeit.repeat(lambda: loader(rows), number=1, repeat=repeat))
+
+    print(f"rows: {count}")
+    print(f"Schema.load: {plain * 1000:.2f} ms")
+    print(f"compiled:    {compiled * 1000:.2f} ms ({plain / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,56 @@
+"""Compares RadixRouter lookups with Starlette's sequential route matching.
+
+Usage: python -m benchmarks.router [routes]
+"""
+
+import random
+import sys
+import timeit
+
+from starlette.routing import Match, Route, Router
+
+from aioli.router import RadixRouter
+
+
+async def endpoint(request):
+    pass
+
+
+def make_paths(count):
+    templates = ["/items", "/items/{item_id:int}", "/items/{item_id:int}/tags/{tag}", "/search/{query}"]
+    return [f"/api/pkg_{idx // len(templates)}{templates[idx % len(templates)]}" for idx in range(count)]
+
+
+def make_request(path):
+    return path.replace("{item_id:int}", "123").replace("{tag}", "red").replace("{query}", "term")
+
+
+def sequential(router, scope):
+    for route in router.routes:
+        match, child_scope = route.matches(scope)
+
+        if match == Match.FULL:
+            return route, child_scope["path_params"]
+
+
+def main(count=1000, lookups=2000):
+    paths = make_paths(count)
+    routes = [Route(path, endpoint, methods=["GET"]) for path in paths]
+    plain, radix = Router(routes), RadixRouter(routes)
+
+    requests = [make_request(path) for path in random.Random(0).choices(paths, k=lookups)]
+    scopes = [{"type": "http", "path": path, "method": "GET"} for path in requests]
+
+    for path, scope in zip(requests, scopes):
+        assert radix.match(path, "GET") == sequential(plain, scope)
+
+    seq = min(timeit.repeat(lambda: [sequential(plain, scope) for scope in scopes], number=1, repeat=3))
+    tree = min(timeit.repeat(lambda: [radix.match(path, "GET") for path in requests], number=1, repeat=3))
+
+    print(f"routes: {count}")
+    print(f"sequential: {seq / lookups * 1e6:.2f} us/lookup")
+    print(f"radix:      {tree / lookups * 1e6:.2f} us/lookup ({seq / tree:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -1,5 +1,9 @@
+import asyncio
+
 import pytest
 
+from aioli import Application
+
 
 class MockRequest:
     def __init__(self, **kwargs):
@@ -36,3 +40,32 @@ def mock_request():
 def logger():
     import logging
     return logging.getLogger("jet-test")
+
+
+@pytest.fixture(scope="module")
+def app_start():
+    """Starts Applications, shutting them down once the tests of the module are done, unless already shut down"""
+
+    loop = asyncio.get_event_loop()
+    started = []
+
+    def _loaded(app):
+        loop.run_until_complete(app.router.lifespan.startup())
+        started.append(app)
+        return app
+
+    yield _loaded
+
+    for app in reversed(started):
+        if not app.closing:
+            loop.run_until_complete(app.router.lifespan.shutdown())
+
+
+@pytest.fixture(scope="module")
+def app_make(request, app_start):
+    """Creates started Applications of the test module's Package, given `aioli_core` settings"""
+
+    def _loaded(**config):
+        return app_start(Application(packages=[request.module], config={"aioli_core": config}))
+
+    return _loaded
@@ -0,0 +1,41 @@
+from aioli.controller.cache import ResponseCache
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_size=10)
+    cache.set(("/a", "GET"), b"12345", 200, "application/json", 60)
+    cache.set(("/b", "GET"), b"12345", 200, "application/json", 60)
+
+    assert cache.get(("/a", "GET"))
+
+    cache.set(("/c", "GET"), b"12345", 200, "application/json", 60)
+
+    assert cache.get(("/b", "GET")) is None
+    assert cache.get(("/a", "GET")) and cache.get(("/c", "GET"))
+    assert cache.size == 10
+
+
+def test_expiry():
+    cache = ResponseCache(max_size=10)
+    cache.set(("/a", "GET"), b"1", 200, "application/json", 0)
+
+    assert cache.get(("/a", "GET")) is None
+    assert cache.size == 0
+
+
+def test_invalidate_prefix():
+    cache = ResponseCache(max_size=100)
+
+    for path in ["/api/pkg", "/api/pkg/items", "/api/pkg2/items"]:
+        cache.set((path, "GET"), b"1", 200, "application/json", 60)
+
+    assert cache.invalidate("/api/pkg") == 2
+    assert len(cache) == 1
+
+
+def test_etag_match():
+    entry = ResponseCache(max_size=100).set(("/a", "GET"), b"1", 200, "application/json", 60)
+
+    assert entry.matches(f'W/"other", {entry.etag}')
+    assert entry.matches("*")
+    assert not entry.matches('"other"')
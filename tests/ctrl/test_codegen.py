@@ -0,0 +1,137 @@
+import pytest
+
+from marshmallow import ValidationError, post_dump, validates
+
+from aioli.controller.codegen import compile_dumper, compile_loader
+from aioli.controller.schemas import Schema, HttpParams, fields, validate
+
+
+class Tag(Schema):
+    label = fields.String()
+    weight = fields.Float(as_string=True)
+
+
+class Item(Schema):
+    id = fields.Integer()
+    name = fields.String(data_key="title")
+    active = fields.Boolean(default=True)
+    price = fields.Decimal(as_string=True)
+    tags = fields.List(fields.Nested(Tag))
+    tag = fields.Nested(Tag, only=("label",))
+    names = fields.List(fields.String())
+    nested = fields.Integer(attribute="a.b")
+    kind = fields.Method("get_kind")
+
+    def get_kind(self, obj):
+        return "item"
+
+
+class Node(Schema):
+    name = fields.String()
+    children = fields.List(fields.Nested("self"))
+
+
+class Wrapped(Schema):
+    value = fields.Integer()
+
+    @post_dump(pass_many=True)
+    def wrap(self, data, many, **_):
+        return {"data": data}
+
+
+class Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+ITEMS = [
+    {
+        "id": "3",
+        "name": "name",
+        "price": 1.5,
+        "tags": [{"label": "a", "weight": 1}],
+        "tag": {"label": "b", "weight": 2},
+        "names": ["a", 1, None],
+        "a": {"b": 5},
+    },
+    Obj(id=1, name=None, active="no", tags=None, tag=None),
+    {},
+]
+
+
+@pytest.mark.parametrize("item", ITEMS)
+def test_dump_equal(item):
+    schema = Item()
+    assert compile_dumper(schema)(item) == schema.dump(item)
+
+
+def test_dump_many_equal():
+    schema = Item(many=True)
+    assert compile_dumper(schema)(ITEMS) == schema.dump(ITEMS)
+
+
+def test_self_nested():
+    tree = {"name": "root", "children": [{"name": "leaf", "children": []}]}
+    assert compile_dumper(Node())(tree) == Node().dump(tree)
+
+
+def test_hooks_fallback():
+    schema = Wrapped(many=True)
+    assert compile_dumper(schema)([{"value": 1}]) == {"data": [{"value": 1}]}
+
+
+class Entry(Schema):
+    id = fields.Integer(required=True, validate=validate.Range(min=0))
+    name = fields.String(data_key="title", missing="")
+    active = fields.Boolean()
+    tags = fields.List(fields.Nested(Tag, only=("label",)), validate=validate.Length(max=2))
+    tag = fields.Nested(Tag)
+    names = fields.List(fields.String())
+
+
+class Checked(Schema):
+    value = fields.Integer()
+
+    @validates("value")
+    def validate_value(self, value):
+        if value > 5:
+            raise ValidationError("Too large.")
+
+
+def load_result(loader, data):
+    try:
+        return loader(data)
+    except ValidationError as error:
+        return error.messages, error.valid_data
+
+
+ENTRIES = [
+    {"id": 1, "title": "a", "active": True, "tags": [{"label": "a"}], "tag": {"label": "b", "weight": 1.5}},
+    {"id": "2", "names": ["a", "b"], "unknown": 1},
+    {"id": -1, "title": None, "active": "maybe", "tags": [{"label": 1}, {}, {}], "tag": [], "names": ["a", 1]},
+    {"tags": "a", "tag": {"weight": "heavy"}},
+    [],
+]
+
+
+@pytest.mark.parametrize("entry", ENTRIES)
+def test_load_equal(entry):
+    schema = Entry()
+    assert load_result(compile_loader(schema), entry) == load_result(schema.load, entry)
+
+
+def test_load_many_equal():
+    schema = Entry(many=True)
+    assert load_result(compile_loader(schema), ENTRIES) == load_result(schema.load, ENTRIES)
+
+
+def test_load_query_params():
+    from starlette.datastructures import QueryParams
+
+    schema = HttpParams()
+    params = QueryParams("limit=10&offset=-1&sort=name")
+    assert load_result(compile_loader(schema), params) == load_result(schema.load, params)
+
+
+def test_validates_fallback():
+    assert load_result(compile_loader(Checked()), {"value": 6}) == ({"value": ["Too large."]}, {})
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, route, takes, returns
+from aioli.codec import StdlibCodec
+from aioli.controller.ingest import ArrayParser, NdjsonParser
+from aioli.controller.schemas import Schema, fields
+from aioli.exceptions import DecodeError
+
+
+class Item(Schema):
+    id = fields.Integer(required=True)
+    name = fields.String()
+
+
+class Controller(BaseHttpController):
+    @route("/", Method.POST)
+    @takes(stream=Item)
+    @returns()
+    async def items_ingest(self, stream):
+        return {"ids": [item["id"] async for item in stream]}
+
+    @route("/lenient", Method.POST)
+    @takes(stream=Item, strict=False)
+    @returns()
+    async def items_ingest_lenient(self, stream):
+        ids = [item["id"] async for item in stream]
+        return {"ids": ids, "count": stream.count, "errors": stream.errors}
+
+
+export = Package(name="ingest_test", description="Ingest test", version="0.1.0", controllers=[Controller])
+
+
+@pytest.fixture(scope="module")
+def client(app_make):
+    return TestClient(app_make(max_stream_size=1000))
+
+
+def feed(parser, document, size):
+    items = []
+
+    for pos in range(0, len(document), size):
+        items += parser.feed(document[pos:pos + size])
+
+    return items + parser.close()
+
+
+def test_array_parser():
+    items = [{"a": "x,]}\"[{ü\u2603", "b": [1, {"c": None}]}, "\\", 1.5, 12345, -2, True, [], {}]
+    document = json.dumps(items).encode()
+
+    for size in [1, 3, len(document)]:
+        assert feed(ArrayParser(), document, size) == items
+
+    assert feed(ArrayParser(), b" [ ] ", 1) == []
+
+    for invalid in [b'{"a": 1}', b"[1,]", b"[1, 2", b"[1] 2", b"[,1]"]:
+        with pytest.raises(DecodeError):
+            feed(ArrayParser(), invalid, 2)
+
+
+def test_array_parser_rejects_invalid_items_early():
+    parser = ArrayParser()
+
+    with pytest.raises(DecodeError):
+        parser.feed(b'[{"id": 1}, {bad json}' + b" " * 1000)
+
+    # Syntax errors are told apart from items cut short
+    parser = ArrayParser()
+    assert parser.feed(b'[{"id": 1, "name": "a\\u26') == []
+    assert parser.feed(b'03", "ok": tr') == []
+    assert parser.feed(b"ue}]") + parser.close() == [{"id": 1, "name": "a\u2603", "ok": True}]
+
+
+def test_ndjson_parser():
+    document = b'{"a": 1}\n\n[2]\r\n"3"'
+    assert feed(NdjsonParser(StdlibCodec()), document, 2) == [{"a": 1}, [2], "3"]
+
+
+def test_ingest_array(client):
+    response = client.post("/api/ingest_test", data=json.dumps([{"id": 1}, {"id": 2, "name": "two"}]))
+    assert response.json() == {"ids": [1, 2]}
+
+
+def test_ingest_ndjson(client):
+    response = client.post(
+        "/api/ingest_test",
+        data=b'{"id": 1}\n{"id": 2}\n',
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.json() == {"ids": [1, 2]}
+
+
+def test_ingest_invalid(client):
+    response = client.post("/api/ingest_test", data=json.dumps([{"id": 1}, {"name": "x"}]))
+    assert response.status_code == 422
+    assert response.json() == {"message": {"1": {"id": ["Missing data for required field."]}}}
+
+    response = client.post("/api/ingest_test", data=b'[{"id": 1}, {]')
+    assert response.status_code == 400
+
+
+def test_ingest_lenient(client):
+    response = client.post("/api/ingest_test/lenient", data=json.dumps([{"id": 1}, {"name": "x"}, {"id": 3}]))
+    assert response.json() == {
+        "ids": [1, 3],
+        "count": 3,
+        "errors": {"1": {"id": ["Missing data for required field."]}},
+    }
+
+
+def test_ingest_max_size(client):
+    response = client.post("/api/ingest_test", data=json.dumps([{"id": idx} for idx in range(200)]))
+    assert response.status_code == 413
@@ -0,0 +1,57 @@
+import types
+
+import pytest
+
+from starlette.testclient import TestClient
+
+from aioli import Application, Package
+from aioli.controller import BaseHttpController, Method, route, returns, cached
+
+
+class KindController(BaseHttpController):
+    @route("/kind", Method.GET)
+    @cached(ttl=60)
+    @returns()
+    async def kind_get(self):
+        return {"kind": self.pkg.name[-1]}
+
+
+class FirstKindController(KindController):
+    pass
+
+
+class SecondKindController(KindController):
+    pass
+
+
+def make_module(name, controller):
+    module = types.ModuleType(name)
+    module.export = Package(name=name, description=name, version="0.1.0", controllers=[controller])
+    return module
+
+
+@pytest.fixture(scope="module")
+def client(app_start):
+    app = Application(
+        packages=[make_module("pkg_a", FirstKindController), make_module("pkg_b", SecondKindController)]
+    )
+    return TestClient(app_start(app))
+
+
+def test_cached_per_package(client):
+    assert client.get("/api/pkg_a/kind").json() == {"kind": "a"}
+    assert client.get("/api/pkg_b/kind").json() == {"kind": "b"}
+    assert client.get("/api/pkg_b/kind").json() == {"kind": "b"}
+
+
+def test_metrics_per_package(client):
+    assert {handler.path for handler in client.app.metrics} >= {"/api/pkg_a/kind", "/api/pkg_b/kind"}
+
+
+def test_route_entries_per_package(client):
+    table = client.app.route_table
+    first, second = table.get("/api/pkg_a/kind", "GET"), table.get("/api/pkg_b/kind", "GET")
+
+    assert first.handler is second.handler
+    assert (first.plan.route_path, second.plan.route_path) == ("/api/pkg_a/kind", "/api/pkg_b/kind")
+    assert first.plan.func.__self__.pkg.name == "pkg_a"
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, RequestProp, route, takes, returns
+from aioli.controller.schemas import Schema, HttpParams, fields
+
+
+class Counter(Schema):
+    name = fields.String()
+    value = fields.Integer()
+
+
+class CounterPath(Schema):
+    name = fields.String()
+
+
+class CounterBody(Schema):
+    value = fields.Integer(required=True)
+
+
+class Controller(BaseHttpController):
+    counters = {"visits": 1}
+
+    @route("/health", Method.GET, lean=True)
+    @returns()
+    async def health(self):
+        return {"ok": True}
+
+    @route("/counters/{name}", Method.GET, lean=True)
+    @takes(path=CounterPath, query=HttpParams, props=[RequestProp.client_addr])
+    @returns(Counter)
+    async def counter_get(self, name, query, client_addr):
+        return {"name": f"{name}@{client_addr}", "value": self.counters.get(name, 0) + query["offset"]}
+
+    @route("/counters", Method.POST, lean=True)
+    @takes(body=CounterBody)
+    @returns(Counter, status=201)
+    async def counter_create(self, body):
+        return {"name": "new", "value": body["value"]}
+
+    @route("/fail", Method.GET, lean=True)
+    @returns()
+    async def fail(self):
+        raise ValueError("Failing on purpose")
+
+    @route("/broken", Method.GET, lean=True)
+    @returns()
+    async def broken(self):
+        raise BrokenError
+
+
+class BrokenError(Exception):
+    pass
+
+
+async def broken_handler(request, exc):
+    raise RuntimeError("Failing exception handler")
+
+
+export = Package(name="lean_test", description="Lean test", version="0.1.0", controllers=[Controller])
+
+
+@pytest.fixture(scope="module")
+def app(app_make):
+    app = app_make()
+    app.add_exception_handler(BrokenError, broken_handler)
+    return app
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_static_dispatch(app, client):
+    assert set(app.lean_routes) == {
+        "/api/lean_test/health", "/api/lean_test/counters", "/api/lean_test/fail", "/api/lean_test/broken"
+    }
+
+    response = client.get("/api/lean_test/health")
+    assert response.json() == {"ok": True}
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["content-length"] == "11"
+    assert response.headers["access-control-allow-origin"] == "*"
+
+
+@pytest.mark.parametrize("path", ["/api/lean_test/health", "/api/lean_test/counters/visits"])
+def test_head(app, client, path):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "HEAD", "path": path, "query_string": b"", "headers": [], "root_path": "",
+        "client": ("testclient", 50000),
+    }
+    asyncio.get_event_loop().run_until_complete(app(scope, receive, send))
+
+    headers = dict(messages[0]["headers"])
+    assert messages[0]["status"] == 200 and messages[1]["body"] == b""
+    assert headers[b"content-length"] == client.get(path).headers["content-length"].encode()
+
+
+def test_takes_returns(client):
+    response = client.get("/api/lean_test/counters/visits?offset=1")
+    assert response.json() == {"name": "visits@testclient", "value": 2}
+
+    response = client.post("/api/lean_test/counters", json={"value": 5})
+    assert response.status_code == 201
+    assert response.json() == {"name": "new", "value": 5}
+
+
+def test_errors(client):
+    response = client.post("/api/lean_test/counters", json={})
+    assert response.status_code == 422
+    assert response.json() == {"message": {"value": ["Missing data for required field."]}}
+
+    response = client.post("/api/lean_test/counters", data="{bad")
+    assert response.status_code == 400
+
+    response = client.get("/api/lean_test/fail")
+    assert response.status_code == 500
+    assert response.json() == {"message": "Internal server error"}
+
+    # Errors escaping exception handlers
+    response = client.get("/api/lean_test/broken")
+    assert response.status_code == 500
+    assert response.json() == {"message": "Internal server error"}
+
+
+def test_route_table_and_metrics(app, client):
+    client.get("/api/lean_test/health")
+
+    entry = app.route_table.get("/api/lean_test/health", "GET")
+    assert entry.handler.lean
+
+    metrics = app.metrics.handler("/api/lean_test/health", "GET")
+    assert metrics.requests >= 1
+    assert metrics.statuses[1] == metrics.requests
@@ -0,0 +1,46 @@
+import pytest
+
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, route, returns
+
+
+class Controller(BaseHttpController):
+    @route("/lean", Method.GET, lean=True)
+    @returns()
+    async def lean(self):
+        return {"lean": True}
+
+    @route("/regular", Method.GET)
+    @returns()
+    async def regular(self):
+        return {"lean": False}
+
+
+export = Package(name="lean_cors_test", description="Lean CORS test", version="0.1.0", controllers=[Controller])
+
+
+@pytest.fixture(scope="module")
+def client(app_make):
+    return TestClient(app_make(allow_origins=["https://good.example"]))
+
+
+@pytest.mark.parametrize("path", ["/api/lean_cors_test/lean", "/api/lean_cors_test/regular"])
+def test_restricted_origins(client, path):
+    allowed = client.get(path, headers={"origin": "https://good.example"})
+    assert allowed.headers["access-control-allow-origin"] == "https://good.example"
+    assert allowed.headers["vary"] == "Origin"
+
+    denied = client.get(path, headers={"origin": "https://evil.example"})
+    assert "access-control-allow-origin" not in denied.headers
+
+
+def test_preflight(client):
+    response = client.options("/api/lean_cors_test/lean", headers={
+        "origin": "https://good.example", "access-control-request-method": "GET"
+    })
+
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "https://good.example"
+    assert "Origin" in response.headers["vary"]
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from marshmallow import post_dump, post_load
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, route, takes, returns
+from aioli.controller.schemas import Schema, fields
+
+
+threads = []
+
+
+class Document(Schema):
+    name = fields.String(required=True)
+    text = fields.String()
+
+    @post_load
+    def track_load(self, data, **_):
+        threads.append(threading.current_thread())
+        return data
+
+    @post_dump
+    def track_dump(self, data, **_):
+        threads.append(threading.current_thread())
+        return data
+
+
+class Controller(BaseHttpController):
+    @route("/", Method.POST)
+    @takes(body=Document)
+    @returns(status=201)
+    async def document_create(self, body):
+        return {"size": len(body["text"])}
+
+    @route("/", Method.GET)
+    @returns(Document, offload=True)
+    async def document_get(self):
+        return {"name": "doc", "text": "text"}
+
+
+export = Package(name="offload_test", description="Offload test", version="0.1.0", controllers=[Controller])
+
+
+@pytest.fixture(scope="module")
+def client(app_make):
+    return TestClient(app_make(offload_size=1000))
+
+
+def test_takes_offload(client):
+    assert client.post("/api/offload_test", json={"name": "doc", "text": "x"}).status_code == 201
+    assert threads.pop() is threading.main_thread()
+
+    response = client.post("/api/offload_test", json={"name": "doc", "text": "x" * 1000})
+    assert response.json() == {"size": 1000}
+    assert threads.pop() is not threading.main_thread()
+
+    # Errors raised in the thread pool are handled as usual
+    assert client.post("/api/offload_test", data=b"{" + b" " * 1000).status_code == 400
+    assert client.post("/api/offload_test", json={"text": "x" * 1000}).status_code == 422
+
+
+def test_returns_offload(client):
+    assert client.get("/api/offload_test").json() == {"name": "doc", "text": "text"}
+    assert threads.pop() is not threading.main_thread()
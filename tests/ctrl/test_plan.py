@@ -0,0 +1,134 @@
+import json
+
+import pytest
+
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, RequestProp, route, takes, returns, cached
+from aioli.controller.schemas import Schema, HttpParams, fields
+
+
+class Item(Schema):
+    id = fields.Integer()
+    name = fields.String()
+
+
+class ItemCreate(Schema):
+    name = fields.String(required=True)
+
+
+class ItemPath(Schema):
+    item_id = fields.Integer()
+
+
+class Controller(BaseHttpController):
+    calls = 0
+
+    @route("/", Method.GET)
+    @takes(query=HttpParams, props=[RequestProp.client_addr])
+    @returns(Item, many=True)
+    async def items_get(self, query, client_addr):
+        return [{"id": idx, "name": client_addr} for idx in range(query["limit"])]
+
+    @route("/{item_id}", Method.POST)
+    @takes(path=ItemPath, body=ItemCreate, compiled=True)
+    @returns(Item, status=201, compiled=True)
+    async def item_create(self, item_id, body):
+        return dict(id=item_id, **body)
+
+    @route("/stream", Method.GET)
+    @takes(query=HttpParams)
+    @returns(Item, many=True, batch_size=2)
+    async def items_stream(self, query):
+        for idx in range(query["limit"]):
+            yield {"id": idx, "name": str(idx)}
+
+    @route("/cached", Method.GET)
+    @cached(ttl=60)
+    @takes(query=HttpParams)
+    @returns(Item, many=True)
+    async def items_cached(self, query):
+        Controller.calls += 1
+        return [{"id": idx, "name": "cached"} for idx in range(query["limit"])]
+
+    @route("/raw", Method.GET)
+    async def raw_get(self, request):
+        from aioli.utils import jsonify
+        return jsonify({"path": request.url.path})
+
+
+export = Package(name="plan_test", description="Call plan test", version="0.1.0", controllers=[Controller])
+
+
+@pytest.fixture(scope="module")
+def client(app_make):
+    return TestClient(app_make())
+
+
+def test_plan_compiled(client):
+    plans = {entry.handler.name: entry.plan for entry in client.app.route_table.for_controller(Controller)}
+
+    assert plans["items_get"].query is not None
+    assert plans["items_get"].props[0][0] == "client_addr"
+    assert plans["raw_get"].inject_request
+
+    # Getting the Controller singleton again doesn't register its routes twice
+    routes = len(client.app.routes)
+    assert Controller(export).routes == client.app.route_table.for_controller(Controller)
+    assert len(client.app.routes) == routes
+
+
+def test_takes_returns_many(client):
+    response = client.get("/api/plan_test?limit=2")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 0, "name": "testclient"}, {"id": 1, "name": "testclient"}]
+
+
+def test_path_and_body(client):
+    response = client.post("/api/plan_test/5", json={"name": "test"})
+    assert response.status_code == 201
+    assert response.json() == {"id": 5, "name": "test"}
+
+
+def test_validation_error(client):
+    response = client.post("/api/plan_test/5", json={})
+    assert response.status_code == 422
+    assert response.json() == {"message": {"name": ["Missing data for required field."]}}
+
+
+def test_request_injected(client):
+    response = client.get("/api/plan_test/raw")
+    assert response.json() == {"path": "/api/plan_test/raw"}
+
+
+def test_stream_array(client):
+    response = client.get("/api/plan_test/stream?limit=5")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [{"id": idx, "name": str(idx)} for idx in range(5)]
+
+    assert client.get("/api/plan_test/stream?limit=0").json() == []
+
+
+def test_stream_ndjson(client):
+    response = client.get("/api/plan_test/stream?limit=3", headers={"accept": "application/x-ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": idx, "name": str(idx)} for idx in range(3)
+    ]
+
+
+def test_cached(client):
+    first = client.get("/api/plan_test/cached?limit=2")
+    etag = first.headers["etag"]
+
+    assert client.get("/api/plan_test/cached?limit=2").json() == first.json()
+    assert Controller.calls == 1
+
+    assert client.get("/api/plan_test/cached?limit=2", headers={"if-none-match": etag}).status_code == 304
+    assert client.get("/api/plan_test/cached?limit=3").json() != first.json()
+    assert Controller.calls == 2
+
+    assert export.invalidate_cache("/cached") == 2
+    client.get("/api/plan_test/cached?limit=2")
+    assert Controller.calls == 3
@@ -1,5 +1,65 @@
-import pytest
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, route, returns
+from aioli.controller.registry import RouteTable
+
+
+class FirstController(BaseHttpController):
+    @route("/first", Method.GET)
+    @returns()
+    async def index(self):
+        return {"controller": "first"}
+
+    @route("/first", Method.POST)
+    @returns()
+    async def create(self):
+        return {}
+
+
+class SecondController(BaseHttpController):
+    @route("/second", Method.GET)
+    @returns()
+    async def index(self):
+        return {"controller": "second"}
+
+
+class ChildController(SecondController):
+    @route("/child", Method.GET)
+    @returns()
+    async def index(self):
+        return {"controller": "child"}
+
+
+export = Package(
+    name="register_test",
+    description="Registration test",
+    version="0.1.0",
+    controllers=[FirstController, SecondController],
+)
 
 
 def test_dummy():
     pass
+
+
+def test_handlers_indexed_by_class():
+    assert [handler.name for handler in FirstController._handlers] == ["index", "create"]
+    assert [handler.path for handler in SecondController._handlers] == ["/second"]
+
+    # Subclasses override handlers of their bases
+    assert [handler.path for handler in ChildController._handlers] == ["/child"]
+
+
+def test_route_table(app_make):
+    app = app_make()
+
+    table = app.route_table
+    assert len(table) == 3
+    assert table.get("/api/register_test/second", "GET").name == "SecondController.index"
+    assert table.get("/api/register_test/second", "POST") is None
+    assert [entry.method for entry in table.for_controller(FirstController)] == ["GET", "POST"]
+    assert len(table.for_package("register_test")) == 3
+    assert table.for_package("missing") == ()
+
+
+def test_route_table_empty():
+    assert len(RouteTable()) == 0
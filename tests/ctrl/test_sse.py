@@ -0,0 +1,123 @@
+import asyncio
+
+from aioli import Package
+from aioli.codec import get_codec
+from aioli.controller import BaseSseController
+from aioli.controller.sse import SseClient, SseStream, encode_event
+
+
+class Controller(BaseSseController):
+    path = "/events"
+    buffer_size = 3
+    heartbeat = 0.02
+    retry = 1000
+
+    async def on_connect(self, request):
+        return request.query_params.get("stream", "default")
+
+
+export = Package(name="sse_test", description="SSE test", version="0.1.0", controllers=[Controller])
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_encode_event():
+    codec = get_codec("json")
+
+    assert encode_event({"a": 1}, codec, "x-1", "update") == b'id: x-1\nevent: update\ndata: {"a":1}\n\n'
+    assert encode_event("line 1\nline 2", codec) == b"data: line 1\ndata: line 2\n\n"
+
+
+def test_replay():
+    stream = SseStream("default", get_codec("json"), buffer_size=3)
+
+    for idx in range(5):
+        stream.publish(idx)
+
+    assert stream.replay(None) == []
+    assert stream.replay(f"{stream.epoch}-3") == [b"id: %s-%d\ndata: %d\n\n" % (stream.epoch.encode(), n, n - 1)
+                                                  for n in (4, 5)]
+    assert stream.replay(f"{stream.epoch}-5") == []
+    assert len(stream.replay(f"{stream.epoch}-1")) == 3
+    assert len(stream.replay("other-4")) == 3
+
+
+def test_slow_client():
+    client = SseClient(queue_size=2)
+
+    assert client.push(b"1") and client.push(b"2")
+    assert not client.push(b"3")
+    assert client.closed and not client.queue
+
+
+class Connection:
+    def __init__(self, app, query_string=b"", headers=()):
+        self.app = app
+        self.scope = {
+            "type": "http", "method": "GET", "path": "/api/sse_test/events", "root_path": "",
+            "query_string": query_string, "headers": list(headers), "scheme": "http", "http_version": "1.1",
+        }
+        self.messages = []
+        self.disconnect = asyncio.Event()
+        self.requested = False
+        self.task = asyncio.ensure_future(app(self.scope, self.receive, self.send))
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    @property
+    def body(self):
+        return b"".join(message.get("body", b"") for message in self.messages[1:])
+
+
+def test_stream(app_make):
+    app = app_make()
+    ctrl = Controller(export)
+
+    # Getting the Controller singleton again doesn't register its route and close handler twice
+    assert app.close_handlers.count(ctrl.close) == 1 and len(app.routes) == 1
+
+    async def scenario():
+        first = Connection(app)
+        other = Connection(app, b"stream=other")
+        await asyncio.sleep(0.005)
+
+        assert ctrl.publish({"n": 1}, event="update") == 1
+        assert ctrl.publish({"n": 2}) == 1
+        await asyncio.sleep(0.005)
+
+        stream = ctrl.stream()
+        assert first.messages[0]["headers"][0] == (b"content-type", b"text/event-stream")
+        assert first.body == b"retry: 1000\n\n" + b"".join(frame for _, frame in stream.buffer)
+        assert other.body == b"retry: 1000\n\n"
+
+        # Resuming
+        resumed = Connection(app, headers=[(b"last-event-id", f"{stream.epoch}-1".encode())])
+        await asyncio.sleep(0.005)
+        assert resumed.body.endswith(stream.buffer[-1][1])
+        assert stream.buffer[0][1] not in resumed.body
+
+        # Idle clients receive heartbeats
+        await asyncio.sleep(0.05)
+        assert other.body.endswith(b":\n\n")
+
+        other.disconnect.set()
+        await asyncio.wait_for(other.task, 1)
+        assert not ctrl.stream("other").clients
+
+        await app.router.lifespan.shutdown()
+        await asyncio.wait_for(asyncio.gather(first.task, resumed.task), 1)
+
+        assert first.messages[-1] == {"type": "http.response.body", "body": b""}
+
+    run(scenario())
@@ -0,0 +1,71 @@
+import asyncio
+
+from aioli.service import coalesce
+
+
+class Remote:
+    def __init__(self):
+        self.calls = 0
+
+    @coalesce()
+    async def fetch(self, key):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"key": key}
+
+    @coalesce(ttl=60, max_size=2)
+    async def fetch_cached(self, key):
+        self.calls += 1
+        return key
+
+    @coalesce()
+    async def fail(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_coalesce_concurrent():
+    remote = Remote()
+    results = run(asyncio.gather(*[remote.fetch(1) for _ in range(50)], remote.fetch(2)))
+
+    assert remote.calls == 2
+    assert results[0] is results[49]
+
+    run(remote.fetch(1))
+    assert remote.calls == 3
+
+
+def test_coalesce_errors():
+    remote = Remote()
+    results = run(asyncio.gather(remote.fail(), remote.fail(), return_exceptions=True))
+
+    assert remote.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_memoize():
+    remote = Remote()
+
+    for key in [1, 1, 2, 1, 3, 1, 2]:
+        run(remote.fetch_cached(key))
+
+    # 2 is evicted when 3 is added, 1 is kept as recently used
+    assert remote.calls == 4
+
+    remote.fetch_cached.invalidate(1)
+    run(remote.fetch_cached(1))
+    assert remote.calls == 5
+
+    remote.fetch_cached.clear()
+    run(remote.fetch_cached(3))
+    assert remote.calls == 6
+
+
+def test_unhashable_arguments():
+    remote = Remote()
+    assert run(remote.fetch_cached(["a"])) == ["a"]
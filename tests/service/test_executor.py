@@ -0,0 +1,60 @@
+import asyncio
+import os
+import threading
+
+from aioli.executor import Executor
+from aioli.service import offload
+
+
+class App:
+    executor = Executor(threads=2, processes=1)
+
+
+class Renderer:
+    app = App()
+
+    def __init__(self):
+        self.calls = 0
+
+    @offload()
+    def render(self, text, upper=False):
+        self.calls += 1
+        return threading.current_thread(), text.upper() if upper else text
+
+    @offload(process=True)
+    def pid(value):
+        return os.getpid(), value
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_thread_offload():
+    renderer = Renderer()
+    thread, text = run(renderer.render("text", upper=True))
+
+    assert text == "TEXT"
+    assert thread is not threading.main_thread()
+    assert renderer.calls == 1
+    assert renderer.render.__name__ == "render"
+
+
+def test_process_offload():
+    pid, value = run(Renderer().pid([1, 2]))
+
+    assert value == [1, 2]
+    assert pid != os.getpid()
+
+    App.executor.shutdown()
+    assert App.executor._process_pool is None
+
+
+def test_should_offload():
+    executor = Executor(offload_size=10)
+
+    assert executor.should_offload(None, 10)
+    assert not executor.should_offload(None, 9)
+    assert executor.should_offload(True, 0)
+    assert not executor.should_offload(False, 100)
+    assert not Executor(offload_size=0).should_offload(None, 100)
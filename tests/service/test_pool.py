@@ -0,0 +1,234 @@
+import asyncio
+
+import pytest
+
+from aioli import Package
+from aioli.exceptions import AioliException
+from aioli.pool import Pool, PoolClosed, PoolTimeout
+from aioli.service import PooledService
+
+
+class Connection:
+    def __init__(self, number):
+        self.number = number
+        self.healthy = True
+        self.closed = False
+
+
+class Server:
+    def __init__(self):
+        self.connections = []
+
+    async def connect(self):
+        await asyncio.sleep(0)
+        connection = Connection(len(self.connections))
+        self.connections.append(connection)
+        return connection
+
+    async def disconnect(self, connection):
+        connection.closed = True
+
+    async def ping(self, connection):
+        return connection.healthy
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def make_pool(server, **options):
+    return Pool("test", create=server.connect, close=server.disconnect, check=server.ping, **options)
+
+
+def test_reuse_and_bounds():
+    server = Server()
+    pool = make_pool(server, min_size=2, max_size=3, acquire_timeout=0.05)
+
+    async def scenario():
+        await pool.open()
+        assert (pool.size, pool.idle) == (2, 2)
+
+        async with pool.acquire() as first:
+            pass
+
+        # Most recently released first
+        async with pool.acquire() as second:
+            assert second is first
+
+        held = [await pool.get() for _ in range(3)]
+        assert pool.size == 3 and pool.in_use == 3
+
+        with pytest.raises(PoolTimeout):
+            await pool.get()
+
+        # Waiters are handed released resources
+        waiter = asyncio.ensure_future(pool.get())
+        await asyncio.sleep(0.01)
+        assert pool.waiting == 1
+
+        await pool.release(held[0])
+        assert await waiter is held[0]
+
+        for connection in held[1:] + [held[0]]:
+            await pool.release(connection)
+
+        await pool.close()
+
+    run(scenario())
+
+    assert len(server.connections) == 3
+    assert all(connection.closed for connection in server.connections)
+    assert pool.stats.timeouts == 1
+    assert pool.stats.created == pool.stats.closed == 3
+
+
+def test_health_checks_and_errors():
+    server = Server()
+    pool = make_pool(server, check_after=0)
+
+    async def scenario():
+        await pool.open()
+
+        async with pool.acquire() as connection:
+            connection.healthy = False
+
+        async with pool.acquire() as replacement:
+            assert replacement is not connection
+
+        with pytest.raises(ValueError):
+            async with pool.acquire() as broken:
+                raise ValueError
+
+        async with pool.acquire() as replacement:
+            assert replacement is not broken
+
+        # HTTP errors raised by handler logic leave the resource usable
+        with pytest.raises(AioliException):
+            async with pool.acquire() as kept:
+                raise AioliException(status=404, message="Not found")
+
+        async with pool.acquire() as reused:
+            assert reused is kept and not kept.closed
+
+        await pool.close()
+        return connection, broken
+
+    connection, broken = run(scenario())
+
+    assert pool.stats.failed_checks == 1
+    assert connection.closed and broken.closed
+    assert len(server.connections) == 3
+
+
+def test_maintenance():
+    server = Server()
+    pool = make_pool(server, min_size=1, max_size=5, max_idle=0, maintenance_interval=3600)
+
+    async def scenario():
+        await pool.open()
+        held = [await pool.get() for _ in range(4)]
+
+        for connection in held:
+            await pool.release(connection)
+
+        assert pool.idle == 4
+
+        await pool.maintain()
+        assert pool.size == pool.idle == 1
+
+        pool.max_lifetime = 0
+        await pool.maintain()
+        assert pool.size == 1 and pool.stats.created == 5
+
+        await pool.close()
+
+    run(scenario())
+
+
+class SlowServer(Server):
+    async def disconnect(self, connection):
+        await asyncio.sleep(0.01)
+        connection.closed = True
+
+
+def test_maintenance_keeps_resources_available():
+    server = SlowServer()
+    pool = make_pool(server, max_size=5, max_lifetime=60, maintenance_interval=3600)
+
+    async def scenario():
+        await pool.open()
+        kept, expired = [await pool.get() for _ in range(2)]
+
+        await pool.release(kept)
+        await pool.release(expired)
+        pool._idle[-1].created -= 120
+
+        maintenance = asyncio.ensure_future(pool.maintain())
+        await asyncio.sleep(0)
+
+        # The kept resource is reused while the expired one is being closed
+        connection = await pool.get()
+        assert connection is kept and pool.stats.created == 2
+
+        await pool.release(connection)
+        await maintenance
+        assert expired.closed and pool.idle == 1
+
+        await pool.close()
+
+    run(scenario())
+
+
+def test_close_drains():
+    server = Server()
+    pool = make_pool(server)
+
+    async def scenario():
+        await pool.open()
+        connection = await pool.get()
+        closing = asyncio.ensure_future(pool.close())
+        await asyncio.sleep(0.01)
+
+        assert not closing.done() and not connection.closed
+
+        with pytest.raises(PoolClosed):
+            await pool.get()
+
+        await pool.release(connection)
+        await closing
+
+        assert connection.closed
+
+    run(scenario())
+
+
+class ConnectionService(PooledService):
+    pool_min_size = 2
+    server = Server()
+
+    async def create_resource(self):
+        return await self.server.connect()
+
+    async def close_resource(self, resource):
+        await self.server.disconnect(resource)
+
+
+export = Package(name="pool_test", description="Pool test", version="0.1.0", services=[ConnectionService])
+
+
+def test_pooled_service(app_make):
+    app = app_make()
+
+    service = ConnectionService(export)
+    assert service.pool.name == "pool_test.ConnectionService"
+    assert service.pool.idle == 2
+
+    async def use():
+        async with service.acquire() as connection:
+            return connection
+
+    run(use())
+    assert 'aioli_pool_acquired_total{pool="pool_test.ConnectionService"} 1' in app.metrics.render()
+
+    run(app.router.lifespan.shutdown())
+    assert all(connection.closed for connection in ConnectionService.server.connections)
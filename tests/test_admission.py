@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from aioli import Package
+from aioli.admission import HIGH, LOW, Limiter, Overloaded
+from aioli.controller import BaseHttpController, Method, route, returns
+
+
+release = None
+
+
+class Controller(BaseHttpController):
+    @route("/slow", Method.GET, limit=1)
+    @returns(status=200)
+    async def slow(self):
+        await release.wait()
+        return {"done": True}
+
+    @route("/health", Method.GET, priority="critical")
+    @returns(status=200)
+    async def health(self):
+        await release.wait()
+        return {"healthy": True}
+
+
+export = Package(name="admission_test", description="Admission test", version="0.1.0", controllers=[Controller])
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+async def request(app, path):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": [], "root_path": ""}
+    await app(scope, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    return messages[0]["status"], headers
+
+
+def test_limiter_admits_up_to_limit():
+    async def scenario():
+        limiter = Limiter("test", 2, queue_size=0)
+
+        await limiter.acquire()
+        await limiter.acquire()
+
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+
+        limiter.release()
+        await limiter.acquire()
+
+        return limiter
+
+    limiter = run(scenario())
+    assert (limiter.active, limiter.admitted, limiter.rejected) == (2, 3, 1)
+
+
+def test_limiter_queue_timeout():
+    async def scenario():
+        limiter = Limiter("test", 1, queue_size=10, queue_timeout=0.01)
+        await limiter.acquire()
+
+        with pytest.raises(Overloaded) as exc:
+            await limiter.acquire()
+
+        return limiter, exc.value
+
+    limiter, exc = run(scenario())
+    assert exc.status_code == 503 and exc.retry_after == 1
+    assert limiter.waiting == 0 and limiter.rejected == 1
+
+
+def test_limiter_priority_order():
+    async def scenario():
+        limiter = Limiter("test", 1)
+        admitted = []
+
+        async def enter(name, priority):
+            await limiter.acquire(priority)
+            admitted.append(name)
+
+        await limiter.acquire()
+        tasks = [asyncio.ensure_future(enter("low", LOW)), asyncio.ensure_future(enter("high", HIGH))]
+        await asyncio.sleep(0)
+
+        limiter.release()
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+        return admitted
+
+    assert run(scenario()) == ["high", "low"]
+
+
+def test_limiter_skips_cancelled_waiters():
+    async def scenario():
+        limiter = Limiter("test", 1)
+        await limiter.acquire()
+
+        cancelled = asyncio.ensure_future(limiter.acquire())
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        limiter.release()
+        await waiting
+
+        return limiter
+
+    limiter = run(scenario())
+    assert limiter.active == 1 and limiter.waiting == 0
+
+
+def test_route_limits(app_make):
+    app = app_make(admission_queue_size=0, admission_queue_timeout=2.5)
+
+    async def scenario():
+        global release
+
+        release = asyncio.Event()
+
+        first = asyncio.ensure_future(request(app, "/api/admission_test/slow"))
+        await asyncio.sleep(0.01)
+
+        rejected = await request(app, "/api/admission_test/slow")
+        health = [asyncio.ensure_future(request(app, "/api/admission_test/health")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        release.set()
+        return rejected, await first, await asyncio.gather(*health)
+
+    rejected, first, health = run(scenario())
+
+    assert rejected[0] == 503 and rejected[1][b"retry-after"] == b"3"
+    assert first[0] == 200
+    assert [status for status, _ in health] == [200] * 3
+    assert b'aioli_admission_rejected_total{limiter="/api/admission_test/slow [GET]"} 1' in app.metrics.render().encode()
@@ -0,0 +1,30 @@
+import sys
+
+from starlette.testclient import TestClient
+
+from aioli import Application, Package
+from aioli.controller import BaseHttpController, Method, route, returns
+
+
+class Controller(BaseHttpController):
+    @route("/", Method.GET)
+    @returns()
+    async def index(self):
+        return {"ok": True}
+
+
+export = Package(name="app_test", description="Application test", version="0.1.0", controllers=[Controller])
+
+
+def test_preload(app_start):
+    app = Application(packages=[sys.modules[__name__]])
+    app.preload()
+
+    assert app.registry.registered
+    assert export.app is app
+
+    app_start(app)
+
+    # Packages are registered once
+    assert app.registry.imported.count(sys.modules[__name__]) == 1
+    assert TestClient(app).get("/api/app_test").json() == {"ok": True}
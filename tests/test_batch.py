@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from starlette.responses import Response
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, BaseSseController, Method, route, takes, returns
+from aioli.controller.schemas import Schema, HttpParams, fields
+
+
+class Item(Schema):
+    id = fields.Integer()
+    name = fields.String(required=True)
+
+
+class ItemPath(Schema):
+    item_id = fields.Integer()
+
+
+class Controller(BaseHttpController):
+    items = {}
+    running = 0
+    max_running = 0
+
+    async def _track(self):
+        Controller.running += 1
+        Controller.max_running = max(Controller.max_running, Controller.running)
+        await asyncio.sleep(0.01)
+        Controller.running -= 1
+
+    @route("/", Method.GET)
+    @takes(query=HttpParams)
+    @returns(Item, many=True)
+    async def items_get(self, query):
+        await self._track()
+        return list(self.items.values())[query["offset"]:]
+
+    @route("/", Method.POST)
+    @takes(body=Item)
+    @returns(Item, status=201)
+    async def item_create(self, body):
+        item = dict(id=len(self.items) + 1, **body)
+        self.items[item["id"]] = item
+        return item
+
+    @route("/raw/malformed", Method.GET)
+    async def malformed(self, request):
+        return Response(b'{"truncated', media_type="application/json")
+
+    @route("/{item_id}", Method.GET)
+    @takes(path=ItemPath)
+    @returns(Item)
+    async def item_get(self, item_id):
+        await self._track()
+        return self.items[item_id]
+
+
+class Events(BaseSseController):
+    path = "/live/events"
+
+
+export = Package(name="batch_test", description="Batch test", version="0.1.0", controllers=[Controller, Events])
+
+
+@pytest.fixture(scope="module")
+def app(app_make):
+    return app_make(batch_path="/batch", batch_max_items=5)
+
+
+@pytest.fixture
+def client(app):
+    Controller.items.clear()
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_batch(client):
+    response = client.post("/api/batch", json=[
+        {"method": "POST", "path": "/api/batch_test", "body": {"name": "first"}},
+        {"method": "POST", "path": "/api/batch_test", "body": {}},
+        {"path": "/api/batch_test/1", "depends_on": [0]},
+        {"path": "/api/batch_test/1", "depends_on": [1]},
+        {"path": "/api/batch_test?offset=0", "query": {"limit": 10}, "depends_on": [0]},
+    ])
+
+    assert response.status_code == 200
+    created, invalid, fetched, failed, listed = response.json()
+
+    assert created["status"] == 201
+    assert created["body"] == {"id": 1, "name": "first"}
+    assert created["headers"]["content-type"] == "application/json"
+    assert invalid["status"] == 422
+    assert fetched["body"] == {"id": 1, "name": "first"}
+    assert failed["status"] == 424
+    assert listed["body"] == [{"id": 1, "name": "first"}]
+
+    # Independent items run concurrently
+    assert Controller.max_running == 2
+
+
+def test_batch_errors(client):
+    assert client.post("/api/batch", json={"path": "/"}).status_code == 422
+    assert client.post("/api/batch", json=[{"path": "/"}] * 6).status_code == 422
+    assert client.post("/api/batch", json=[{"path": "/api/batch"}]).status_code == 422
+    assert client.post("/api/batch", json=[{"path": "/", "depends_on": [0]}]).status_code == 422
+
+    response = client.post("/api/batch", json=[{"path": "/api/batch_test/5"}, {"path": "/missing"}])
+    assert [item["status"] for item in response.json()] == [500, 404]
+
+    # Malformed JSON sub-responses are returned as text
+    response = client.post("/api/batch", json=[{"path": "/api/batch_test/raw/malformed"}, {"path": "/api/batch_test"}])
+    malformed, listed = response.json()
+
+    assert response.status_code == 200 and listed["status"] == 200
+    assert malformed == {"status": 200, "headers": {"content-type": "application/json"}, "body": '{"truncated'}
+
+
+def test_batch_stream(client):
+    response = client.post("/api/batch", json=[{"path": "/api/batch_test/live/events"}, {"path": "/api/batch_test/1"}])
+    streamed, _ = response.json()
+
+    assert streamed["status"] == 200
+    assert streamed["headers"]["content-type"] == "text/event-stream"
@@ -0,0 +1,53 @@
+import pytest
+
+from aioli import Application
+from aioli.codec import JsonCodec, StdlibCodec, get_codec
+from aioli.controller.schemas import Schema, fields
+
+
+@pytest.mark.parametrize("name", ["json", "ujson", "orjson"])
+def test_roundtrip(name):
+    try:
+        codec = get_codec(name)
+    except Exception:
+        pytest.skip(f"{name} not installed")
+
+    obj = {"text": "åäö", "items": [1, 2.5, None, True]}
+
+    assert codec.loads(codec.dumpb(obj)) == obj
+    assert codec.loads(codec.dumps(obj, indent=4)) == obj
+    assert isinstance(codec.dumpb(obj), bytes)
+
+
+@pytest.mark.parametrize("name", ["json", "ujson", "orjson"])
+def test_decode_errors(name):
+    try:
+        codec = get_codec(name)
+    except Exception:
+        pytest.skip(f"{name} not installed")
+
+    with pytest.raises(codec.decode_errors):
+        codec.loads(b"{invalid")
+
+
+def test_custom_codec():
+    assert isinstance(get_codec("aioli.codec:StdlibCodec"), JsonCodec)
+
+    with pytest.raises(Exception):
+        get_codec("aioli.config:ApplicationConfigSchema")
+
+    with pytest.raises(Exception):
+        get_codec("unknown")
+
+
+class Item(Schema):
+    name = fields.String()
+
+
+def test_schema_codec():
+    app = Application(packages=[], config={"aioli_core": {"json_codec": "json"}})
+
+    assert isinstance(app.codec, StdlibCodec)
+    assert Item().dumps({"name": "åäö"}) == '{"name":"åäö"}'
+    assert Item().dumps({"name": "x"}, indent=2) == '{\n  "name": "x"\n}'
+    assert Item().loads('{"name": "x"}') == {"name": "x"}
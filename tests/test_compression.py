@@ -0,0 +1,133 @@
+import gzip
+import threading
+
+import pytest
+
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.testclient import TestClient
+
+from aioli import Application, compression
+from aioli.compression import CompressionMiddleware, CompressedCache
+
+
+BODY = b'{"items": [' + b",".join(b'{"id": %d}' % idx for idx in range(500)) + b"]}"
+
+
+def make_client(**options):
+    app = Starlette()
+
+    @app.route("/json")
+    async def json_body(request):
+        return Response(BODY, media_type="application/json")
+
+    @app.route("/small")
+    async def small_body(request):
+        return Response(b"{}", media_type="application/json")
+
+    @app.route("/binary")
+    async def binary_body(request):
+        return Response(BODY, media_type="application/octet-stream")
+
+    @app.route("/etag")
+    async def etag_body(request):
+        return Response(BODY, media_type="application/json", headers={"etag": '"abc"'})
+
+    @app.route("/stream")
+    async def stream_body(request):
+        async def chunks():
+            for idx in range(100):
+                yield b'{"id": %d}\n' % idx
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return TestClient(CompressionMiddleware(app, **options))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    compress = compression.compress
+
+    def tracked(body, level):
+        calls.append(threading.current_thread())
+        return compress(body, level)
+
+    monkeypatch.setattr(compression, "compress", tracked)
+    return calls
+
+
+def test_thresholds():
+    client = make_client(media_types=["application/json", "application/x-ndjson"])
+
+    response = client.get("/json")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.content == BODY
+
+    for path in ["/small", "/binary"]:
+        assert "content-encoding" not in client.get(path).headers
+
+    assert "content-encoding" not in client.get("/json", headers={"accept-encoding": "identity"}).headers
+
+
+def test_streaming():
+    response = make_client(media_types=["application/x-ndjson"]).get("/stream")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content.count(b"\n") == 100
+
+
+def test_offload(calls):
+    client = make_client(offload_size=len(BODY))
+
+    client.get("/small")
+    assert not calls
+
+    client.get("/json")
+    assert calls.pop() is not threading.main_thread()
+
+    client = make_client(offload_size=len(BODY) + 1)
+    client.get("/json")
+    assert calls.pop() is threading.main_thread()
+
+
+def test_reuse(calls):
+    client = make_client(cache_size=1024 * 1024)
+
+    for _ in range(3):
+        response = client.get("/etag")
+        assert response.content == BODY and response.headers["etag"] == 'W/"abc"'
+        assert client.get("/json").content == BODY
+
+    # Uncompressed responses keep their strong ETag
+    assert client.get("/etag", headers={"accept-encoding": "identity"}).headers["etag"] == '"abc"'
+
+    # Only responses with an ETag are reused
+    assert len(calls) == 4
+
+
+def test_cache_eviction():
+    cache = CompressedCache(max_size=10)
+    cache.set(("/a", '"1"'), b"12345")
+    cache.set(("/b", '"1"'), b"12345")
+    cache.get(("/a", '"1"'))
+    cache.set(("/c", '"1"'), b"12345")
+
+    assert cache.get(("/b", '"1"')) is None
+    assert cache.size == 10
+    assert len(cache) == 2
+
+    cache.set(("/d", '"1"'), b"x" * 11)
+    assert len(cache) == 2
+
+
+def test_gzip_format():
+    assert gzip.decompress(compression.compress(BODY, 6)) == BODY
+
+
+def test_application_config():
+    app = Application(packages=[], config={"aioli_core": {"compression": True, "compression_min_size": 10}})
+    assert [middleware.cls for middleware in app.user_middleware][0] is CompressionMiddleware
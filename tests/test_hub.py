@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.codec import get_codec
+from aioli.controller import BaseWebSocketController
+from aioli.exceptions import InvalidChannelError
+from aioli.hub import Hub
+
+
+class FakeWebSocket:
+    client = ("127.0.0.1", 1234)
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.closed = None
+        self.unblocked = asyncio.Event()
+
+        if not blocked:
+            self.unblocked.set()
+
+    async def send(self, message):
+        await self.unblocked.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_publish_encodes_once():
+    async def scenario():
+        hub = Hub(get_codec("json"))
+        sockets = [FakeWebSocket() for _ in range(3)]
+
+        for websocket in sockets[:2]:
+            hub.subscribe(websocket, "prices")
+
+        hub.subscribe(sockets[2], "news")
+
+        assert hub.publish("prices", {"price": 1}) == 2
+        assert hub.publish("empty", {"price": 1}) == 0
+        await asyncio.sleep(0)
+
+        assert sockets[0].sent == [{"type": "websocket.send", "text": '{"price":1}'}]
+        assert sockets[0].sent[0] is sockets[1].sent[0]
+        assert not sockets[2].sent
+
+        hub.publish("news", b"raw")
+        hub.unsubscribe(sockets[2], "news")
+        hub.publish("news", b"raw")
+        await asyncio.sleep(0)
+
+        assert sockets[2].sent == [{"type": "websocket.send", "bytes": b"raw"}]
+
+        with pytest.raises(InvalidChannelError):
+            hub.publish("no spaces", {})
+
+        with pytest.raises(InvalidChannelError):
+            hub.subscribe(sockets[0], "")
+
+        await hub.close()
+        await asyncio.sleep(0)
+
+        assert sockets[0].closed == 1001
+        assert not hub.channels and not hub.subscribers
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("policy,expected", [
+    ("drop", ["a1", "a2", "a3"]),
+    ("coalesce", ["b1", "a2", "a3"]),
+])
+def test_slow_consumer_queueing(policy, expected):
+    async def scenario():
+        hub = Hub(get_codec("json"), queue_size=3, policy=policy)
+        slow = FakeWebSocket(blocked=True)
+        fast = FakeWebSocket()
+
+        for websocket in [slow, fast]:
+            hub.subscribe(websocket, "a")
+            hub.subscribe(websocket, "b")
+
+        # The first message is taken by the writer, blocked on sending it
+        hub.publish("a", "a0")
+        await asyncio.sleep(0)
+
+        for channel, payload in [("b", "b1"), ("a", "a1"), ("a", "a2"), ("a", "a3")]:
+            hub.publish(channel, payload)
+            await asyncio.sleep(0)
+
+        assert len(fast.sent) == 5
+
+        slow.unblocked.set()
+        await asyncio.sleep(0.01)
+
+        assert [message["text"] for message in slow.sent] == ["a0"] + expected
+        assert hub.dropped == 1
+
+        writers = [subscriber._writer for subscriber in hub.subscribers.values()]
+        await hub.close()
+
+        assert all(writer.done() for writer in writers) and not hub.closing
+
+    run(scenario())
+
+
+def test_slow_consumer_disconnect():
+    async def scenario():
+        hub = Hub(get_codec("json"), queue_size=1, policy="disconnect")
+        slow = FakeWebSocket(blocked=True)
+        hub.subscribe(slow, "a")
+
+        assert hub.publish("a", 0) == 1
+        await asyncio.sleep(0)
+
+        assert [hub.publish("a", idx) for idx in range(1, 4)] == [1, 0, 0]
+        await asyncio.sleep(0)
+
+        assert slow.closed == 1013
+        assert not hub.subscribers and not hub.channels
+
+        # The writer, still blocked on sending, is cancelled and waited for
+        await hub.close()
+        assert not hub.closing
+
+    run(scenario())
+
+
+class Controller(BaseWebSocketController):
+    path = "/live"
+
+    async def on_receive(self, websocket, data):
+        try:
+            if "subscribe" in data:
+                self.subscribe(websocket, data["subscribe"])
+            else:
+                self.hub.publish(data["channel"], data["payload"])
+        except InvalidChannelError:
+            await websocket.send_json({"error": "invalid channel"})
+
+
+export = Package(name="hub_test", description="Hub test", version="0.1.0", controllers=[Controller])
+
+
+def test_websocket_controller(app_make):
+    app = app_make()
+    client = TestClient(app)
+
+    # Getting the Controller singleton again doesn't register its route twice
+    Controller(export)
+    assert len(app.routes) == 1
+
+    with client.websocket_connect("/api/hub_test/live") as websocket:
+        websocket.send_json({"subscribe": "invalid channel"})
+        assert websocket.receive_json() == {"error": "invalid channel"}
+
+        websocket.send_json({"subscribe": "dashboard"})
+        websocket.send_json({"channel": "dashboard", "payload": {"visits": 1}})
+        assert websocket.receive_json() == {"visits": 1}
+
+    assert not app.hub.subscribers
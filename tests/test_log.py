@@ -0,0 +1,109 @@
+import io
+import json
+import logging
+import os
+
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.codec import get_codec
+from aioli.controller import BaseHttpController, Method, route, returns
+from aioli.log import AccessLog, QueueStreamHandler
+
+
+class Controller(BaseHttpController):
+    @route("/", Method.GET)
+    @returns(status=200)
+    async def index(self):
+        return {"ok": True}
+
+
+export = Package(name="log_test", description="Log test", version="0.1.0", controllers=[Controller])
+
+
+class Lines(logging.Handler):
+    def __init__(self):
+        super(Lines, self).__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(record.getMessage()))
+
+
+def capture():
+    lines = Lines()
+    logger = logging.getLogger("aioli.access")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(lines)
+    return lines
+
+
+def test_queue_stream_handler():
+    stream = io.StringIO()
+    handler = QueueStreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    logger = logging.getLogger("aioli.test_queue")
+    logger.addHandler(handler)
+
+    items = ["a"]
+    logger.warning("items: %s", items)
+    items.append("b")
+    handler.close()
+    logger.removeHandler(handler)
+
+    assert stream.getvalue() == "WARNING items: ['a']\n"
+
+
+def test_queue_stream_handler_drops_when_full():
+    handler = QueueStreamHandler(io.StringIO(), queue_size=1)
+    handler.listener = object()
+    handler._pid = os.getpid()
+
+    for _ in range(3):
+        handler.handle(logging.makeLogRecord({"msg": "message"}))
+
+    assert handler.dropped == 2
+
+    handler.listener = None
+    handler.close()
+
+
+def test_access_log_rate_limit():
+    lines = capture()
+    access_log = AccessLog(get_codec("json"), rate=2)
+    scope = {"method": "GET", "path": "/"}
+
+    for status in (200, 200, 200, 500):
+        access_log.record(scope, "Controller.index", status, 0.001)
+
+    assert len(lines.lines) == 2 and access_log.suppressed == 2
+
+    access_log._window -= 1
+    access_log.record(scope, "Controller.index", 200, 0.001)
+
+    assert lines.lines[-1]["suppressed"] == 2 and access_log.suppressed == 0
+    logging.getLogger("aioli.access").removeHandler(lines)
+
+
+def test_access_log_sampling():
+    lines = capture()
+    access_log = AccessLog(get_codec("json"), sample=0)
+    scope = {"method": "GET", "path": "/"}
+
+    access_log.record(scope, "Controller.index", 200, 0.001)
+    access_log.record(scope, "Controller.index", 503, 0.001)
+
+    assert [line["status"] for line in lines.lines] == [503]
+    logging.getLogger("aioli.access").removeHandler(lines)
+
+
+def test_access_log_requests(app_make):
+    app = app_make(access_log=True)
+    lines = capture()
+
+    assert TestClient(app).get("/api/log_test?q=1").status_code == 200
+
+    line = lines.lines.pop()
+    assert line["method"] == "GET" and line["path"] == "/api/log_test"
+    assert line["handler"] == "Controller.index" and line["status"] == 200 and line["duration_ms"] >= 0
+    logging.getLogger("aioli.access").removeHandler(lines)
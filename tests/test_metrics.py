@@ -0,0 +1,64 @@
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, route, takes, returns
+from aioli.controller.schemas import Schema, fields
+from aioli.metrics import Histogram, Metrics
+
+
+class ItemPath(Schema):
+    item_id = fields.Integer()
+
+
+class Controller(BaseHttpController):
+    @route("/{item_id}", Method.GET)
+    @takes(path=ItemPath)
+    @returns()
+    async def item_get(self, item_id):
+        return {"id": item_id}
+
+
+export = Package(name="metrics_test", description="Metrics test", version="0.1.0", controllers=[Controller])
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value)
+
+    histogram.flush()
+    assert histogram.counts == [2, 1, 1]
+    assert list(histogram.cumulative()) == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == 2.65
+
+
+def test_handler_metrics(app_make):
+    app = app_make(metrics_path="/metrics")
+    client = TestClient(app)
+
+    assert client.get("/api/metrics_test/1").status_code == 200
+    assert client.get("/api/metrics_test/2").status_code == 200
+    assert client.get("/api/metrics_test/invalid").status_code == 422
+
+    item = app.metrics.handler("/api/metrics_test/{item_id}", "GET")
+    assert item.requests == 3
+    assert item.statuses == [0, 2, 0, 1, 0]
+    assert item.inflight == 0
+    assert item.latency.count == 3
+    assert item.takes.count == 3
+    assert item.handler.count == item.returns.count == 2
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    labels = 'path="/api/metrics_test/{item_id}",method="GET"'
+    assert f'aioli_requests_total{{{labels},status="2xx"}} 2' in response.text
+    assert f'aioli_requests_total{{{labels},status="4xx"}} 1' in response.text
+    assert f'aioli_request_duration_seconds_count{{{labels}}} 3' in response.text
+    assert f'aioli_request_phase_seconds_count{{{labels},phase="handler"}} 2' in response.text
+
+
+def test_render_empty():
+    assert Metrics().render().startswith("# HELP aioli_requests_total")
@@ -0,0 +1,107 @@
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from aioli import Application
+from aioli.router import RadixRouter
+
+
+async def endpoint(request):
+    return JSONResponse({"route": request.scope["endpoint"].__name__, "params": request.path_params})
+
+
+def make_endpoint(name):
+    async def _endpoint(request):
+        return await endpoint(request)
+
+    _endpoint.__name__ = name
+    return _endpoint
+
+
+ROUTES = [
+    ("/items", ["GET"], "items_get"),
+    ("/items", ["POST"], "items_post"),
+    ("/items/{item_id:int}", ["GET"], "item_get_int"),
+    ("/items/{slug}", ["GET"], "item_get_str"),
+    ("/items/{price:float}/price", ["GET"], "item_price"),
+    ("/items/latest", ["GET"], "item_latest"),
+    ("/items/{item_id:int}/tags/{tag}", ["GET"], "item_tag"),
+    ("/files/{path:path}", ["GET"], "files"),
+    ("/dup", ["GET"], "dup_first"),
+    ("/dup", ["GET"], "dup_second"),
+    ("/partial-{name}", ["GET"], "partial"),
+]
+
+
+def make_router():
+    return RadixRouter([Route(path, make_endpoint(name), methods=methods) for path, methods, name in ROUTES])
+
+
+def match(router, path, method="GET"):
+    route, params = router.match(path, method)
+    return (route.endpoint.__name__, params) if route else None
+
+
+def test_match():
+    router = make_router()
+
+    assert match(router, "/items") == ("items_get", {})
+    assert match(router, "/items", "POST") == ("items_post", {})
+    assert match(router, "/items", "HEAD") == ("items_get", {})
+    assert match(router, "/items/5") == ("item_get_int", {"item_id": 5})
+    assert match(router, "/items/five") == ("item_get_str", {"slug": "five"})
+    assert match(router, "/items/latest") == ("item_latest", {})
+    assert match(router, "/items/1.5/price") == ("item_price", {"price": 1.5})
+    assert match(router, "/items/3/tags/red") == ("item_tag", {"item_id": 3, "tag": "red"})
+    assert match(router, "/files/a/b/c.txt") == ("files", {"path": "a/b/c.txt"})
+    assert match(router, "/dup") == ("dup_first", {})
+
+
+def test_no_match():
+    router = make_router()
+
+    assert match(router, "/items", "DELETE") is None
+    assert match(router, "/items/five/tags/red") is None
+    assert match(router, "/items/") is None
+    assert match(router, "/missing") is None
+
+    # Not supported by the tree, matched sequentially
+    assert match(router, "/partial-test") is None
+
+
+def test_fallback(app_start):
+    app = app_start(Application(packages=[], config={"aioli_core": {"radix_router": True}}))
+    assert isinstance(app.router, RadixRouter)
+
+    for path, methods, name in ROUTES:
+        app.add_route(path, make_endpoint(name), methods)
+
+    client = TestClient(app)
+    assert client.get("/items/5").json() == {"route": "item_get_int", "params": {"item_id": 5}}
+    assert client.get("/partial-test").json() == {"route": "partial", "params": {"name": "test"}}
+    assert client.delete("/items").status_code == 405
+    assert client.get("/missing").status_code == 404
+
+    # Routes added after the first request are picked up
+    app.add_route("/late", make_endpoint("late"), ["GET"])
+    assert client.get("/late").json() == {"route": "late", "params": {}}
+
+
+def test_lifespan_handlers():
+    called = []
+
+    async def on_startup():
+        called.append("startup")
+
+    async def on_shutdown():
+        called.append("shutdown")
+
+    app = Application(
+        packages=[], config={"aioli_core": {"radix_router": True}}, on_startup=[on_startup], on_shutdown=[on_shutdown]
+    )
+    assert isinstance(app.router, RadixRouter)
+
+    with TestClient(app):
+        assert called == ["startup"]
+
+    assert called == ["startup", "shutdown"]
@@ -0,0 +1,109 @@
+import asyncio
+
+from datetime import datetime
+
+import pytest
+
+from aioli import Package
+from aioli.scheduler import CronSchedule, QueueClosed, QueueFull
+from aioli.service import BaseService
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.mark.parametrize("expression,after,expected", [
+    ("*/15 * * * *", datetime(2024, 1, 1, 10, 7, 30), datetime(2024, 1, 1, 10, 15)),
+    ("0 3 * * *", datetime(2024, 1, 1, 3, 0), datetime(2024, 1, 2, 3, 0)),
+    ("30 9 * * 1-5", datetime(2024, 1, 5, 12, 0), datetime(2024, 1, 8, 9, 30)),
+    ("0 0 29 2 *", datetime(2024, 3, 1), datetime(2028, 2, 29)),
+    ("0 12 1 * 0", datetime(2024, 1, 2), datetime(2024, 1, 7, 12, 0)),
+    ("0,30 8-9 * 12 *", datetime(2024, 6, 1), datetime(2024, 12, 1, 8, 0)),
+])
+def test_cron(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *", "a * * * *"])
+def test_cron_invalid(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+class Service(BaseService):
+    ticks = 0
+    processed = []
+    running = 0
+    max_running = 0
+
+    async def on_startup(self):
+        self.scheduler.every(0.01, self.tick, immediate=True)
+        self.scheduler.every(0.01, self.slow, jitter=0.001)
+        self.emails = self.scheduler.queue("emails", workers=2, max_size=3)
+
+    async def tick(self):
+        Service.ticks += 1
+
+    async def slow(self):
+        await asyncio.sleep(0.05)
+
+    async def send(self, address):
+        Service.running += 1
+        Service.max_running = max(Service.max_running, Service.running)
+        await asyncio.sleep(0.01)
+        Service.running -= 1
+        Service.processed.append(address)
+
+
+export = Package(name="scheduler_test", description="Scheduler test", version="0.1.0", services=[Service])
+
+
+def test_scheduler(app_make):
+    app = app_make()
+    service = Service(export)
+
+    async def scenario():
+        queue = service.emails
+
+        for idx in range(3):
+            queue.put_nowait(service.send, f"{idx}@example.com")
+
+        # Workers took the first two items
+        await asyncio.sleep(0)
+        queue.put_nowait(service.send, "3@example.com")
+        queue.put_nowait(service.send, "4@example.com")
+
+        with pytest.raises(QueueFull):
+            queue.put_nowait(service.send, "5@example.com")
+
+        with pytest.raises(QueueFull):
+            await queue.put(service.send, "5@example.com", timeout=0.001)
+
+        # Waits for room
+        await queue.put(service.send, "5@example.com")
+        await queue.put(service.send, "6@example.com")
+        await asyncio.sleep(0.1)
+
+        assert Service.ticks >= 5
+        assert 0 < app.scheduler.jobs["Service.slow"].runs < Service.ticks
+        assert app.scheduler.jobs["Service.slow"].skipped
+
+        # Pending items are processed upon shutdown
+        for idx in range(7, 10):
+            queue.put_nowait(service.send, f"{idx}@example.com")
+
+        await app.router.lifespan.shutdown()
+
+        with pytest.raises(QueueClosed):
+            queue.put_nowait(service.send, "late@example.com")
+
+        ticks = Service.ticks
+        await asyncio.sleep(0.03)
+        assert Service.ticks == ticks
+
+    run(scenario())
+
+    assert Service.processed == [f"{idx}@example.com" for idx in range(10)]
+    assert Service.max_running == 2
+    assert not app.tasks
@@ -0,0 +1,126 @@
+import asyncio
+import types
+
+from starlette.testclient import TestClient
+
+from aioli import Application, Package
+from aioli.service import BaseService
+
+
+events = []
+
+
+class ServiceA(BaseService):
+    async def on_shutdown(self):
+        await asyncio.sleep(0.05)
+        events.append(("stop", self.pkg.name))
+
+
+class ServiceB(BaseService):
+    async def on_shutdown(self):
+        await asyncio.sleep(0.05)
+        events.append(("stop", self.pkg.name))
+
+
+class ServiceC(BaseService):
+    async def on_shutdown(self):
+        events.append(("stop", self.pkg.name))
+
+
+class PeerService(BaseService):
+    async def on_startup(self):
+        self.peer = self.connect(OtherPeerService)
+
+    async def on_shutdown(self):
+        events.append(("stop", self.pkg.name))
+
+
+class OtherPeerService(BaseService):
+    async def on_startup(self):
+        self.peer = self.connect(PeerService)
+
+    async def on_shutdown(self):
+        events.append(("stop", self.pkg.name))
+
+
+class FailingService(BaseService):
+    async def on_shutdown(self):
+        raise ValueError("Failing on purpose")
+
+
+def make_module(name, **kwargs):
+    module = types.ModuleType(name)
+    module.export = Package(name=name, description=name, version="0.1.0", **kwargs)
+    return module
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+async def background(seconds):
+    await asyncio.sleep(seconds)
+    events.append(("task", seconds))
+
+
+def test_shutdown_order():
+    events.clear()
+
+    pkg_a = make_module("shutdown_a", services=[ServiceA])
+    pkg_b = make_module("shutdown_b", services=[ServiceB], dependencies=[pkg_a])
+    pkg_c = make_module("shutdown_c", services=[ServiceC])
+    pkg_failing = make_module("shutdown_failing", services=[FailingService])
+
+    app = Application(packages=[pkg_a, pkg_b, pkg_c, pkg_failing])
+    run(app.router.lifespan.startup())
+
+    app.create_task(background(0.05))
+    run(app.router.lifespan.shutdown())
+
+    # Background tasks complete first, then dependents are stopped before their dependencies
+    assert events == [("task", 0.05), ("stop", "shutdown_c"), ("stop", "shutdown_b"), ("stop", "shutdown_a")]
+    assert not app.tasks
+    assert app.registry.started == set()
+
+
+def test_shutdown_connected_packages():
+    events.clear()
+
+    pkg_a = make_module("shutdown_peer_a", services=[PeerService])
+    pkg_b = make_module("shutdown_peer_b", services=[OtherPeerService])
+
+    app = Application(packages=[pkg_a, pkg_b])
+    run(app.router.lifespan.startup())
+    run(app.executor.run(sum, [1, 2]))
+
+    # Dependencies changed after startup don't affect the shutdown order
+    pkg_a.export.dependencies.add("shutdown_peer_b")
+    pkg_b.export.dependencies.add("shutdown_peer_a")
+    run(app.router.lifespan.shutdown())
+
+    assert sorted(events) == [("stop", "shutdown_peer_a"), ("stop", "shutdown_peer_b")]
+    assert app.executor._thread_pool is None
+    assert app.registry.started == set()
+
+
+def test_shutdown_deadline():
+    events.clear()
+
+    app = Application(packages=[], config={"aioli_core": {"shutdown_timeout": 0}})
+    run(app.router.lifespan.startup())
+
+    task = app.create_task(background(10))
+    run(app.router.lifespan.shutdown())
+    run(asyncio.sleep(0))
+
+    assert task.cancelled()
+    assert events == []
+
+
+def test_closing():
+    app = Application(packages=[])
+    app.closing = True
+
+    response = TestClient(app).get("/")
+    assert response.status_code == 503
+    assert response.json() == {"message": "Service unavailable"}
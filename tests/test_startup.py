@@ -0,0 +1,112 @@
+import asyncio
+import types
+
+import pytest
+
+from aioli import Application, Package
+from aioli.service import BaseService
+
+
+events = []
+
+
+class SlowService(BaseService):
+    async def on_startup(self):
+        events.append(("start", self.pkg.name))
+        await asyncio.sleep(0.2)
+        events.append(("end", self.pkg.name))
+
+
+class ServiceA(SlowService):
+    pass
+
+
+class ServiceB(SlowService):
+    pass
+
+
+class ServiceC(BaseService):
+    async def on_startup(self):
+        self.a = self.connect(ServiceA)
+        events.append(("start", self.pkg.name))
+
+
+class PingService(BaseService):
+    async def on_startup(self):
+        self.peer = self.connect(PongService)
+
+
+class PongService(BaseService):
+    async def on_startup(self):
+        self.peer = self.connect(PingService)
+
+
+class HangingService(BaseService):
+    async def on_startup(self):
+        await asyncio.sleep(10)
+
+
+def make_module(name, **kwargs):
+    module = types.ModuleType(name)
+    module.export = Package(name=name, description=name, version="0.1.0", **kwargs)
+    return module
+
+
+def start(*modules, config=None):
+    app = Application(packages=list(modules), config=config or {})
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    loop.run_until_complete(app.registry.attach_to(app))
+    return app, loop.time() - started
+
+
+def test_concurrent_startup():
+    events.clear()
+
+    pkg_a = make_module("startup_a", services=[ServiceA])
+    pkg_b = make_module("startup_b", services=[ServiceB])
+    pkg_c = make_module("startup_c", services=[ServiceC], dependencies=[pkg_a])
+
+    app, elapsed = start(pkg_a, pkg_b, pkg_c)
+
+    # Independent Packages start concurrently
+    assert elapsed < 0.35
+    assert events.index(("start", "startup_b")) < events.index(("end", "startup_a"))
+
+    # Dependent Packages start once their dependencies have started
+    assert events.index(("start", "startup_c")) > events.index(("end", "startup_a"))
+    assert app.registry.started == {"startup_a", "startup_b", "startup_c"}
+
+
+def test_dependency_graph_errors():
+    pkg_x = make_module("startup_x", dependencies=["startup_y"])
+    pkg_y = make_module("startup_y", dependencies=["startup_x"])
+
+    with pytest.raises(Exception, match="Circular dependency"):
+        start(pkg_x, pkg_y)
+
+    with pytest.raises(Exception, match="unregistered Packages"):
+        start(make_module("startup_z", dependencies=["startup_missing"]))
+
+
+def test_usage_not_declared():
+    pkg_ping = make_module("startup_ping", services=[PingService])
+    pkg_pong = make_module("startup_pong", services=[PongService])
+
+    app, _ = start(pkg_ping, pkg_pong)
+
+    # Runtime usage doesn't alter the declared dependencies, allowing restarts
+    assert app.registry.usage == {"startup_ping": {"startup_pong"}, "startup_pong": {"startup_ping"}}
+    assert not pkg_ping.export.dependencies and not pkg_pong.export.dependencies
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(app.registry.detach_from(app))
+    loop.run_until_complete(app.registry.attach_to(app))
+    assert app.registry.started == {"startup_ping", "startup_pong"}
+
+
+def test_startup_timeout():
+    pkg = make_module("startup_hanging", services=[HangingService])
+
+    with pytest.raises(Exception, match="failed to start within 0 seconds"):
+        start(pkg, config={"startup_hanging": {"startup_timeout": 0}})
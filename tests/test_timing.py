@@ -0,0 +1,142 @@
+import asyncio
+import logging
+
+import pytest
+
+from starlette.testclient import TestClient
+
+from aioli import Package
+from aioli.controller import BaseHttpController, Method, route, takes, returns
+from aioli.controller.schemas import Schema, fields
+from aioli.service import BaseService, coalesce
+from aioli.timing import Timing
+
+
+class Item(Schema):
+    name = fields.String(required=True)
+
+
+class ItemService(BaseService):
+    async def create(self, item):
+        await self.store(item)
+        return item
+
+    async def store(self, item):
+        await asyncio.sleep(0)
+
+    @coalesce(ttl=60)
+    async def count(self):
+        return 1
+
+
+class Controller(BaseHttpController):
+    def __init__(self, pkg):
+        super(Controller, self).__init__(pkg)
+        self.items = ItemService(pkg)
+
+    @route("/", Method.POST)
+    @takes(body=Item)
+    @returns(status=201)
+    async def item_create(self, body):
+        return await self.items.create(body)
+
+    @route("/offloaded", Method.POST)
+    @takes(body=Item, offload=True)
+    @returns(status=201)
+    async def item_create_offloaded(self, body):
+        return body
+
+    @route("/count", Method.GET)
+    @returns(status=200)
+    async def count(self):
+        return {"count": await self.items.count()}
+
+    @route("/lean", Method.GET, lean=True)
+    @returns(status=200)
+    async def lean(self):
+        return {"lean": True}
+
+
+export = Package(
+    name="timing_test", description="Timing test", version="0.1.0", controllers=[Controller], services=[ItemService]
+)
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super(Records, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture(scope="module")
+def client(app_make):
+    return TestClient(app_make(timing=True))
+
+
+def names(header):
+    return [entry.split(";")[0] for entry in header.split(", ")]
+
+
+def test_server_timing(client):
+    response = client.post("/api/timing_test", json={"name": "item"})
+
+    assert response.status_code == 201
+    assert names(response.headers["server-timing"]) == [
+        "total", "routing", "takes", "decode", "validate", "handler", "ItemService.create", "ItemService.store",
+        "returns",
+    ]
+
+    # Recorded from the thread pool
+    response = client.post("/api/timing_test/offloaded", json={"name": "item"})
+    assert names(response.headers["server-timing"]) == ["total", "routing", "takes", "decode", "validate", "handler",
+                                                        "returns"]
+
+    response = client.get("/api/timing_test/lean")
+    assert names(response.headers["server-timing"]) == ["total", "routing", "takes", "handler", "returns"]
+
+    # Shared raw headers are left untouched
+    assert "server-timing" not in str(client.app.lean_routes["/api/timing_test/lean"]["GET"].raw_headers)
+
+
+def test_slow_requests(client):
+    records = Records()
+    timing = client.app.timing
+    timing.sample, timing.slow_threshold = 0.0, 0.000001
+    timing.log.addHandler(records)
+
+    try:
+        response = client.post("/api/timing_test", json={"name": "item"})
+    finally:
+        timing.sample, timing.slow_threshold = 1.0, 0.0
+        timing.log.removeHandler(records)
+
+    assert "server-timing" not in response.headers
+    assert timing.slow == 1
+
+    lines = records.messages[-1].splitlines()
+    assert lines[1].startswith("POST /api/timing_test ")
+    assert [line.split()[0] for line in lines[2:]] == [
+        "routing", "takes", "decode", "validate", "handler", "ItemService.create", "ItemService.store", "returns"
+    ]
+    assert lines[8].startswith("      ItemService.store")
+
+
+def test_coalesced_methods(client):
+    for _ in range(2):
+        response = client.get("/api/timing_test/count")
+        assert names(response.headers["server-timing"]) == ["total", "routing", "takes", "handler",
+                                                            "ItemService.count", "returns"]
+
+    # Still exposes invalidate and clear
+    items = ItemService(export)
+    assert "count" in items.__dict__ and items.count.clear.__self__ is items._coalesced_count
+
+    items.count.invalidate()
+    items.count.clear()
+
+
+def test_disabled():
+    assert Timing(sample=0.0).start({"method": "GET", "path": "/"}) is None